@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal
 import os
 
 
@@ -7,9 +8,52 @@ class Settings(BaseSettings):
     """应用配置"""
     mongodb_url: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     database_name: str = "thoughtflow"
+    
+    # 存储后端：mongo 支持全部功能；sqlite 为内嵌数据库（sqlite_path 为文件路径），适合单机部署，
+    # 只支持卡片增删改查、回收站、编辑历史和时间线，其余接口返回 501，缓存失效与变更推送只在本进程内生效
+    storage_backend: Literal["mongo", "sqlite"] = "mongo"
+    sqlite_path: str = "thoughtflow.db"
     cors_origins: str = "http://localhost:5173,http://localhost:3000,http://localhost:3089,http://localhost:80"
     environment: str = os.getenv("ENVIRONMENT", "development")
     
+    # 读缓存配置，多 worker 部署时 cache_invalidation 设为 mongo 以保持各进程缓存一致
+    cache_enabled: bool = True
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: float = 30.0
+    cache_invalidation: Literal["local", "mongo"] = "local"
+    
+    # 变更推送配置，多 worker 部署时 event_source 设为 change_stream（需要副本集）
+    event_source: Literal["local", "change_stream"] = "local"
+    event_queue_size: int = 256
+    event_max_subscribers: int = 1000
+    event_heartbeat_seconds: float = 15.0
+    
+    # 运行指标，关闭后不记录请求和 MongoDB 命令指标，/metrics 仍可访问
+    metrics_enabled: bool = True
+    
+    # 按需性能分析，开启后携带 X-Profile 请求头的请求在 cProfile 下执行；profiling_dir 为保存目录
+    profiling_enabled: bool = False
+    profiling_dir: str = ""
+    
+    # 慢操作日志，耗时超过阈值（毫秒）的 MongoDB 命令记录过滤条件和执行计划，0 表示关闭
+    slow_op_threshold_ms: float = 200.0
+    slow_op_explain: bool = True
+    
+    # 编辑历史保留策略：每张卡片最新 N 条或最近 D 天内的记录保留为热数据，其余由后台任务压缩归档；
+    # 整理间隔（秒）为 0 时不启动后台任务
+    history_hot_entries: int = 100
+    history_hot_days: float = 90.0
+    history_compaction_interval_seconds: float = 3600.0
+    
+    # 回收站保留期限（天），删除超过期限的卡片由后台任务移入归档；清理间隔（秒）为 0 时不启动
+    trash_retention_days: float = 30.0
+    trash_sweep_interval_seconds: float = 3600.0
+    
+    # 响应压缩（gzip / br），小于 compression_min_size 字节的响应不压缩，0 表示关闭压缩
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    
     @property
     def cors_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.cors_origins.split(",")]
@@ -1,5 +1,9 @@
+import asyncio
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.config import get_settings
+from app.services.metrics import mongo_event_listeners
+from app.services.profiling import slow_operation_listeners
 
 settings = get_settings()
 
@@ -9,16 +13,16 @@ db: AsyncIOMotorDatabase = None
 
 
 async def connect_to_mongo():
-    """连接到 MongoDB"""
+    """连接到 MongoDB（索引由 python -m app.migrate 维护，这里不再创建）"""
     global client, db
-    client = AsyncIOMotorClient(settings.mongodb_url)
+    slow_ops = slow_operation_listeners(settings.slow_op_threshold_ms, settings.slow_op_explain)
+    client = AsyncIOMotorClient(
+        settings.mongodb_url,
+        event_listeners=[*mongo_event_listeners(settings.metrics_enabled), *slow_ops],
+    )
+    for listener in slow_ops:
+        listener.attach(client, asyncio.get_running_loop())
     db = client[settings.database_name]
-    
-    # 创建索引
-    await db.idea_cards.create_index("is_deleted")
-    await db.idea_cards.create_index("create_time")
-    await db.idea_cards.create_index("update_time")
-    
     print(f"Connected to MongoDB: {settings.database_name}")
 
 
@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
+from dataclasses import asdict
+
 from app.config import get_settings
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routers import idea_cards
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.repositories import BackendNotSupported, close_repository, configure_repository
+from app.routers import backup, events, idea_cards
+from app.services.cache import configure_cache, read_cache, shutdown_cache
+from app.services.compression import CompressionMiddleware
+from app.services.events import configure_events, shutdown_events
+from app.services.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
+from app.services.migrations import check_schema_version
+from app.services.profiling import ProfilingMiddleware
+from app.services.retention import configure_retention, shutdown_retention
 
 settings = get_settings()
 
@@ -13,10 +24,43 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时连接数据库
-    await connect_to_mongo()
+    repository = await configure_repository(settings.storage_backend, settings.sqlite_path)
+    mongo = repository.name == "mongo"
+    if mongo:
+        await connect_to_mongo()
+        # 只校验结构版本，索引与回填由部署时执行的 python -m app.migrate up 完成
+        await check_schema_version(get_database())
+    # 其他存储后端只能单进程部署，缓存失效与变更推送使用本进程通道
+    await configure_cache(
+        get_database(),
+        settings.cache_enabled,
+        settings.cache_max_entries,
+        settings.cache_ttl_seconds,
+        settings.cache_invalidation if mongo else "local",
+    )
+    await configure_events(
+        get_database(),
+        settings.event_source if mongo else "local",
+        settings.event_queue_size,
+        settings.event_max_subscribers,
+    )
+    if mongo:
+        await configure_retention(
+            get_database(),
+            settings.history_compaction_interval_seconds,
+            settings.history_hot_entries,
+            settings.history_hot_days,
+            settings.trash_sweep_interval_seconds,
+            settings.trash_retention_days,
+        )
     yield
     # 关闭时断开连接
-    await close_mongo_connection()
+    await shutdown_retention()
+    await shutdown_events()
+    await shutdown_cache()
+    await close_repository()
+    if mongo:
+        await close_mongo_connection()
 
 
 # 创建 FastAPI 应用
@@ -38,8 +82,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩，位于性能分析与指标中间件之内，指标记录压缩后的大小
+if settings.compression_min_size > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+
+# 按需性能分析（请求头 X-Profile）
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware, directory=settings.profiling_dir)
+
+# 记录每个请求的路由、延迟和大小
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(BackendNotSupported)
+async def backend_not_supported(request: Request, exc: BackendNotSupported):
+    """只支持 MongoDB 的接口在其他存储后端下返回 501"""
+    return JSONResponse(status_code=501, content={"detail": f"当前存储后端（{exc}）不支持该接口"})
+
+
 # 注册路由
 app.include_router(idea_cards.router)
+app.include_router(backup.router)
+app.include_router(events.router)
 
 
 @app.get("/", tags=["health"])
@@ -52,3 +121,21 @@ async def root():
 async def health_check():
     """健康检查端点"""
     return {"status": "healthy", "service": "ThoughtFlow API"}
+
+
+@app.get("/cache/stats", tags=["health"])
+async def cache_stats():
+    """读缓存命中、未命中、淘汰等计数，用于调整缓存容量和过期时间"""
+    return {
+        **asdict(read_cache.stats),
+        "size": len(read_cache),
+        "max_entries": read_cache.max_entries,
+        "ttl_seconds": read_cache.ttl_seconds,
+        "enabled": read_cache.enabled,
+    }
+
+
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+async def metrics():
+    """Prometheus 文本格式的运行指标"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,86 @@
+"""
+数据库结构迁移
+
+用法（在 backend 目录下执行）：
+    python -m app.migrate status            # 当前版本与待执行的迁移
+    python -m app.migrate up                # 执行全部待执行的迁移
+    python -m app.migrate up --to 2         # 只执行到指定版本
+    python -m app.migrate up --check        # 每个迁移完成后检查其热点查询的执行计划，未通过时停止
+    python -m app.migrate check             # 检查已执行迁移的全部热点查询，出现 COLLSCAN 时以非零状态退出
+
+API 服务启动时只校验版本，版本低于代码要求时拒绝启动；部署新版本前先执行 up。
+"""
+import argparse
+import asyncio
+import sys
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.migrations import SCHEMA_VERSION
+from app.services.migrations import (
+    SchemaVersionError,
+    apply_migrations,
+    current_schema_version,
+    explain_checks,
+    pending_migrations,
+)
+
+
+async def status(db) -> int:
+    version = await current_schema_version(db)
+    print(f"Schema version {version}, code requires {SCHEMA_VERSION}")
+    for migration in pending_migrations(version):
+        print(f"  pending {migration.version:>3} {migration.name}")
+    return 0
+
+
+async def up(db, target, verify: bool) -> int:
+    try:
+        applied = await apply_migrations(db, target, verify)
+    except SchemaVersionError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    for migration, summary in applied:
+        print(f"Applied {migration.version:>3} {migration.name}" + (f": {summary}" if summary else ""))
+    print(f"Schema version {await current_schema_version(db)}")
+    return 0
+
+
+async def check(db) -> int:
+    reports = await explain_checks(db)
+    print(f"{'ver':>3} {'check':<30} {'result':<6} plan")
+    for report in reports:
+        plan = " > ".join(report.stages)
+        if report.indexes:
+            plan += f" ({', '.join(report.indexes)})"
+        print(f"{report.migration:>3} {report.check:<30} {'ok' if report.ok else 'FAIL':<6} {plan}")
+    failed = sum(not report.ok for report in reports)
+    if failed:
+        print(f"{failed} of {len(reports)} hot queries do not use the expected index", file=sys.stderr)
+        return 1
+    return 0
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="数据库结构迁移")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="查看当前版本与待执行的迁移")
+    up_parser = commands.add_parser("up", help="执行待执行的迁移")
+    up_parser.add_argument("--to", type=int, default=None, help="目标版本，默认为最新版本")
+    up_parser.add_argument("--check", action="store_true", help="每个迁移完成后检查热点查询的执行计划")
+    commands.add_parser("check", help="检查热点查询是否使用索引")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        if args.command == "status":
+            return await status(db)
+        if args.command == "up":
+            return await up(db, args.to, args.check)
+        return await check(db)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,27 @@
+"""
+数据库结构迁移
+
+索引定义和文档回填按版本组织在本包中，由 python -m app.migrate 执行（见 app.services.migrations），
+当前版本记录在 meta 集合中。API 服务启动时只校验版本，不再创建索引。
+
+新增迁移：添加 vNNN_<name>.py 模块定义 MIGRATION，并追加到 MIGRATIONS 末尾。
+"""
+from app.migrations.base import Migration, QueryCheck
+from app.migrations import (
+    v001_baseline_indexes,
+    v002_backfill_documents,
+    v003_history_compaction_index,
+    v004_history_version_order,
+)
+
+MIGRATIONS: list[Migration] = [
+    v001_baseline_indexes.MIGRATION,
+    v002_backfill_documents.MIGRATION,
+    v003_history_compaction_index.MIGRATION,
+    v004_history_version_order.MIGRATION,
+]
+
+# 代码要求的数据库结构版本
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+__all__ = ["MIGRATIONS", "SCHEMA_VERSION", "Migration", "QueryCheck"]
@@ -0,0 +1,44 @@
+"""
+迁移定义
+
+每个迁移依次创建索引、删除索引、执行文档回填，并声明热点查询的执行计划检查：
+python -m app.migrate check 对全部已执行迁移的检查执行 explain，获胜计划中出现 COLLSCAN
+或未使用预期索引时判定失败，防止后续迁移删掉热点查询依赖的索引。
+查询形状改变、原索引被替换时，新迁移通过 retire_checks 停用早期迁移中对应的检查。
+"""
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+
+
+@dataclass(frozen=True)
+class QueryCheck:
+    """
+    热点查询的执行计划检查
+
+    filter / sort 与业务代码中的查询形状一致（取值可以是任意代表值）；
+    indexes 为允许的索引名称，为空时只要求不出现 COLLSCAN。
+    """
+    name: str
+    collection: str
+    filter: dict
+    sort: Optional[dict] = None
+    indexes: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class Migration:
+    """一个结构版本，version 从 1 开始连续递增，已发布的迁移不再修改"""
+    version: int
+    name: str
+    # (集合名称, 索引)，同名同定义的索引已存在时跳过
+    create_indexes: tuple[tuple[str, IndexModel], ...] = ()
+    # (集合名称, 索引名称)，索引不存在时跳过
+    drop_indexes: tuple[tuple[str, str], ...] = ()
+    # 文档回填（须可重复执行），返回结果摘要
+    backfill: Optional[Callable[[AsyncIOMotorDatabase], Awaitable[str]]] = None
+    checks: tuple[QueryCheck, ...] = field(default=())
+    # 停用的早期迁移检查名称（对应的查询已改为使用本迁移创建的索引）
+    retire_checks: tuple[str, ...] = ()
@@ -0,0 +1,104 @@
+"""
+v1：基线索引
+
+与引入迁移之前 connect_to_mongo 在启动时创建的索引完全一致，已有部署执行时不会重建索引。
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from app.migrations.base import Migration, QueryCheck
+from app.models.activity import ACTIVITY_COLLECTION_NAME
+from app.models.card_archive import TOMBSTONE_COLLECTION_NAME
+from app.models.card_history import HISTORY_ARCHIVE_COLLECTION_NAME, HISTORY_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME
+from app.models.search_index import SEARCH_INDEX_COLLECTION_NAME
+from app.models.timeline_event import TIMELINE_COLLECTION_NAME
+from app.services.trash import expired_trash_filter
+
+# 检查中使用的代表值
+_TIME = datetime(2024, 1, 1)
+_CARD_ID = ObjectId("000000000000000000000000")
+_NEWEST_FIRST = {"update_time": -1, "_id": -1}
+
+MIGRATION = Migration(
+    version=1,
+    name="baseline_indexes",
+    create_indexes=(
+        (COLLECTION_NAME, IndexModel([("is_deleted", ASCENDING), ("update_time", DESCENDING), ("_id", DESCENDING)])),
+        # 部分索引只包含未删除的卡片，正常卡片列表不扫描回收站
+        (COLLECTION_NAME, IndexModel(
+            [("update_time", DESCENDING), ("_id", DESCENDING)],
+            name="active_update_time",
+            partialFilterExpression={"is_deleted": False},
+        )),
+        (COLLECTION_NAME, IndexModel(
+            "deleted_at", name="trash_deleted_at", partialFilterExpression={"is_deleted": True}
+        )),
+        (COLLECTION_NAME, IndexModel("create_time")),
+        (COLLECTION_NAME, IndexModel("update_time")),
+        (COLLECTION_NAME, IndexModel([("change_seq", ASCENDING), ("_id", ASCENDING)])),
+        (TIMELINE_COLLECTION_NAME, IndexModel([("event_time", DESCENDING), ("_id", DESCENDING)])),
+        (TIMELINE_COLLECTION_NAME, IndexModel(
+            [("event_type", ASCENDING), ("event_time", DESCENDING), ("_id", DESCENDING)]
+        )),
+        (HISTORY_COLLECTION_NAME, IndexModel(
+            [("card_id", ASCENDING), ("edit_time", DESCENDING), ("_id", DESCENDING)]
+        )),
+        (HISTORY_ARCHIVE_COLLECTION_NAME, IndexModel(
+            [("card_id", ASCENDING), ("newest_time", DESCENDING), ("_id", DESCENDING)]
+        )),
+        (SEARCH_INDEX_COLLECTION_NAME, IndexModel([("terms", ASCENDING), ("is_deleted", ASCENDING)])),
+        (ACTIVITY_COLLECTION_NAME, IndexModel("day")),
+        (TOMBSTONE_COLLECTION_NAME, IndexModel([("change_seq", ASCENDING), ("_id", ASCENDING)])),
+    ),
+    checks=(
+        QueryCheck(
+            "cards_active", COLLECTION_NAME, {"is_deleted": False}, _NEWEST_FIRST,
+            ("active_update_time", "is_deleted_1_update_time_-1__id_-1"),
+        ),
+        QueryCheck(
+            "cards_deleted", COLLECTION_NAME, {"is_deleted": True}, _NEWEST_FIRST,
+            ("is_deleted_1_update_time_-1__id_-1",),
+        ),
+        QueryCheck(
+            "sync", COLLECTION_NAME, {"change_seq": {"$lte": 100}}, {"change_seq": 1, "_id": 1},
+            ("change_seq_1__id_1",),
+        ),
+        QueryCheck(
+            "change_seq_pending", COLLECTION_NAME, {"change_seq": {"$exists": True, "$eq": None}}, None,
+            ("change_seq_1__id_1",),
+        ),
+        QueryCheck("trash_sweep", COLLECTION_NAME, expired_trash_filter(_TIME)),
+        QueryCheck(
+            "sync_tombstones", TOMBSTONE_COLLECTION_NAME, {"change_seq": {"$lte": 100}}, {"change_seq": 1, "_id": 1},
+            ("change_seq_1__id_1",),
+        ),
+        QueryCheck(
+            "timeline", TIMELINE_COLLECTION_NAME, {"event_time": {"$gte": _TIME}}, {"event_time": -1, "_id": -1},
+            ("event_time_-1__id_-1",),
+        ),
+        QueryCheck(
+            "timeline_by_type", TIMELINE_COLLECTION_NAME,
+            {"event_type": {"$in": ["card_created", "card_deleted"]}}, {"event_time": -1, "_id": -1},
+            ("event_type_1_event_time_-1__id_-1",),
+        ),
+        QueryCheck(
+            "history_page", HISTORY_COLLECTION_NAME, {"card_id": _CARD_ID}, {"edit_time": -1, "_id": -1},
+            ("card_id_1_edit_time_-1__id_-1",),
+        ),
+        QueryCheck(
+            "history_archive_page", HISTORY_ARCHIVE_COLLECTION_NAME, {"card_id": _CARD_ID},
+            {"newest_time": -1, "_id": -1}, ("card_id_1_newest_time_-1__id_-1",),
+        ),
+        QueryCheck(
+            "search", SEARCH_INDEX_COLLECTION_NAME, {"terms": {"$all": ["idea"]}, "is_deleted": False}, None,
+            ("terms_1_is_deleted_1",),
+        ),
+        QueryCheck(
+            "activity_range", ACTIVITY_COLLECTION_NAME, {"day": {"$gte": _TIME, "$lt": datetime(2024, 4, 1)}}, None,
+            ("day_1",),
+        ),
+    ),
+)
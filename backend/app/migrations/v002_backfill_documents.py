@@ -0,0 +1,31 @@
+"""
+v2：回填旧数据
+
+依次执行原先需要手动运行的数据维护脚本（均可重复执行，新部署上为空操作）：
+内嵌编辑历史迁移到 card_history、补充 change_seq、回填时间线事件、重建全文检索索引、重新计算活动统计。
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.migrations.base import Migration
+from app.services.activity import rebuild_activity
+from app.services.changes import backfill_change_seq, record_change
+from app.services.history import migrate_embedded_history
+from app.services.search import rebuild_search_index
+from app.services.timeline import backfill_timeline_events
+
+
+async def backfill(db: AsyncIOMotorDatabase) -> str:
+    migrated = await migrate_embedded_history(db)
+    stamped = await backfill_change_seq(db)
+    events = await backfill_timeline_events(db)
+    indexed = await rebuild_search_index(db)
+    rollups = await rebuild_activity(db)
+    # 递增变更序号，使各接口的 ETag 与读缓存失效
+    await record_change(db, None)
+    return (
+        f"migrated history of {migrated} cards, stamped {stamped} cards, "
+        f"backfilled {events} timeline events, indexed {indexed} cards, rebuilt {rollups} rollups"
+    )
+
+
+MIGRATION = Migration(version=2, name="backfill_documents", backfill=backfill)
@@ -0,0 +1,35 @@
+"""
+v3：编辑历史整理索引，删除无用的单字段索引
+
+- compact_histories 按 edit_time 查找存在过期记录的卡片，(edit_time, card_id) 索引使其成为覆盖查询，
+  不再扫描整个 card_history
+- idea_cards 的 create_time / update_time 单字段索引没有查询使用（列表走 (is_deleted, update_time, _id)
+  和 active_update_time），只增加写入开销
+"""
+from datetime import datetime
+
+from pymongo import ASCENDING, IndexModel
+
+from app.migrations.base import Migration, QueryCheck
+from app.models.card_history import HISTORY_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME
+
+MIGRATION = Migration(
+    version=3,
+    name="history_compaction_index",
+    create_indexes=(
+        (HISTORY_COLLECTION_NAME, IndexModel(
+            [("edit_time", ASCENDING), ("card_id", ASCENDING)], name="history_edit_time"
+        )),
+    ),
+    drop_indexes=(
+        (COLLECTION_NAME, "create_time_1"),
+        (COLLECTION_NAME, "update_time_1"),
+    ),
+    checks=(
+        QueryCheck(
+            "history_compaction_candidates", HISTORY_COLLECTION_NAME, {"edit_time": {"$lt": datetime(2024, 1, 1)}},
+            None, ("history_edit_time",),
+        ),
+    ),
+)
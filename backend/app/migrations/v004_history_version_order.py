@@ -0,0 +1,51 @@
+"""
+v4：编辑历史按版本号排序
+
+- 编辑时间在原子更新之前取得，并发写入时与提交顺序不一致，增量记录按编辑时间还原会得到错误的内容；
+  记录改为保存修改后的卡片版本号，分页与还原按 (card_id, version, _id) 排序，归档按 newest_version 排序
+- 回填早于本迁移的记录与归档的版本号（按编辑时间顺序编号），并删除被替换的编辑时间索引
+"""
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from app.migrations.base import Migration, QueryCheck
+from app.models.card_history import HISTORY_ARCHIVE_COLLECTION_NAME, HISTORY_COLLECTION_NAME
+from app.services.history import backfill_history_versions
+
+_CARD_ID = ObjectId("000000000000000000000000")
+
+
+async def backfill(db: AsyncIOMotorDatabase) -> str:
+    versioned = await backfill_history_versions(db)
+    return f"assigned history versions of {versioned} cards"
+
+
+MIGRATION = Migration(
+    version=4,
+    name="history_version_order",
+    create_indexes=(
+        (HISTORY_COLLECTION_NAME, IndexModel(
+            [("card_id", ASCENDING), ("version", DESCENDING), ("_id", DESCENDING)]
+        )),
+        (HISTORY_ARCHIVE_COLLECTION_NAME, IndexModel(
+            [("card_id", ASCENDING), ("newest_version", DESCENDING), ("_id", DESCENDING)]
+        )),
+    ),
+    drop_indexes=(
+        (HISTORY_COLLECTION_NAME, "card_id_1_edit_time_-1__id_-1"),
+        (HISTORY_ARCHIVE_COLLECTION_NAME, "card_id_1_newest_time_-1__id_-1"),
+    ),
+    backfill=backfill,
+    checks=(
+        QueryCheck(
+            "history_page_by_version", HISTORY_COLLECTION_NAME, {"card_id": _CARD_ID}, {"version": -1, "_id": -1},
+            ("card_id_1_version_-1__id_-1",),
+        ),
+        QueryCheck(
+            "history_archive_page_by_version", HISTORY_ARCHIVE_COLLECTION_NAME, {"card_id": _CARD_ID},
+            {"newest_version": -1, "_id": -1}, ("card_id_1_newest_version_-1__id_-1",),
+        ),
+    ),
+    retire_checks=("history_page", "history_archive_page"),
+)
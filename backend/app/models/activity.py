@@ -0,0 +1,39 @@
+"""
+活动统计日汇总数据模型
+
+每个（UTC 日期，操作人）对应一个汇总文档，写操作以 $inc upsert 累加计数，
+统计接口按日期范围读取，查询代价与天数成正比，与事件数量无关。
+
+MongoDB 文档结构：
+{
+  "_id": str,              # "YYYY-MM-DD|operator"
+  "day": datetime,         # 当天 00:00（UTC）
+  "operator": str,
+  "created": int,          # 新建卡片
+  "deleted": int,          # 删除卡片
+  "recovered": int,        # 恢复卡片
+  "edited": int,           # 编辑次数（每条编辑历史计一次，含待办事项操作）
+  "todo_added": int,
+  "todo_updated": int,
+  "todo_completed": int,   # 待办事项由未完成变为已完成
+  "todo_deleted": int
+}
+
+单张卡片的新建、删除、恢复接口不携带操作人，计入 "anonymous"。
+汇总可由 python -m app.scripts.rebuild_activity 从卡片、编辑历史和时间线事件重新计算。
+"""
+
+# 集合名称
+ACTIVITY_COLLECTION_NAME = "activity_daily"
+
+# 计数字段
+ACTIVITY_COUNTERS = (
+    "created",
+    "deleted",
+    "recovered",
+    "edited",
+    "todo_added",
+    "todo_updated",
+    "todo_completed",
+    "todo_deleted",
+)
@@ -0,0 +1,21 @@
+"""
+已清除卡片的归档与同步墓碑
+
+回收站中超过保留期限的卡片由后台任务移出 idea_cards：
+卡片文档原样写入 idea_cards_archive（附加 archived_at），编辑历史全部移入 card_history_archive，
+并在 card_tombstones 中保留墓碑，使尚未同步到删除的客户端仍能通过 /api/sync 得知。
+
+idea_cards_archive 文档结构：idea_cards 的卡片文档 + {"archived_at": datetime}
+
+card_tombstones 文档结构：
+{
+  "_id": ObjectId,         # 卡片ID
+  "change_seq": int,       # 卡片清除前的变更序号
+  "deleted_at": datetime,
+  "archived_at": datetime
+}
+"""
+
+# 集合名称
+CARD_ARCHIVE_COLLECTION_NAME = "idea_cards_archive"
+TOMBSTONE_COLLECTION_NAME = "card_tombstones"
@@ -0,0 +1,43 @@
+"""
+卡片编辑历史数据模型
+
+编辑历史独立存储，不再内嵌在卡片文档的 edit_history 数组中。
+
+MongoDB 文档结构：
+{
+  "_id": str,              # history_id
+  "card_id": ObjectId,     # 所属卡片
+  "edit_time": datetime,
+  "version": int,          # 该次修改后的卡片版本号，同一张卡片内唯一，排序与还原以其为准
+  "operator": str,
+  "change_content": {
+    "title": {"old": str, "new": str},
+    "content": {"patch": list},        # 或完整的 {"old": str, "new": str}
+    "card_style": {"old": dict, "new": dict},
+    "todos": {"ops": list}             # 或完整的 {"old": list, "new": list}
+  },
+  "edit_note": str
+}
+
+content / todos 的增量格式见 app.services.delta。
+早于版本号排序的记录由迁移 v4 按编辑时间顺序补充版本号，可能为 0 或负数。
+
+超出保留策略（每张卡片最新 N 条或最近 D 天）的记录由后台整理任务移入 card_history_archive，
+每个归档文档保存一张卡片连续的一段记录，压缩存储：
+{
+  "_id": str,              # "card_id:段内最新一条的 history_id"
+  "card_id": ObjectId,
+  "newest_version": int,   # 段内最新一条的 version
+  "oldest_version": int,   # 段内最早一条的 version
+  "newest_time": datetime, # 段内最新一条的 edit_time
+  "oldest_time": datetime, # 段内最早一条的 edit_time
+  "count": int,
+  "data": Binary           # zlib 压缩的 BSON {"items": [编辑历史记录项, ...]}，按版本号倒序
+}
+
+归档的记录项保存完整的新旧值（不再依赖更新的记录还原），同一张卡片的归档记录总是早于其热数据。
+"""
+
+# 集合名称
+HISTORY_COLLECTION_NAME = "card_history"
+HISTORY_ARCHIVE_COLLECTION_NAME = "card_history_archive"
@@ -22,23 +22,17 @@ MongoDB 文档结构：
     }
   ],
   "is_deleted": bool,
+  "deleted_at": datetime,  # 删除时间，恢复后移除；回收站保留期限从此时起算，见 app.models.card_archive
   "create_time": datetime,
   "update_time": datetime,
-  "edit_history": [
-    {
-      "history_id": str,
-      "edit_time": datetime,
-      "operator": str,
-      "change_content": {
-        "title": {"old": str, "new": str},
-        "content": {"old": str, "new": str},
-        "card_style": {"old": dict, "new": dict},
-        "todos": {"old": list, "new": list}
-      },
-      "edit_note": str
-    }
-  ]
+  "edit_count": int,       # 编辑次数，编辑历史见 card_history 集合
+  "version": int,          # 内容版本号，每次编辑递增，用于乐观并发控制
+  "history_archived": int, # 已移入归档的编辑历史条数，整理编辑历史时累加，参与卡片详情的 ETag
+  "change_seq": int | None # 最近一次写入的变更序号，写入进行中为 None，见 app.services.changes
 }
+
+早期版本将编辑历史内嵌在 "edit_history" 数组中，
+可通过 python -m app.scripts.migrate_history 迁移到 card_history 集合。
 """
 
 # 默认卡片样式预设
@@ -56,3 +50,25 @@ DEFAULT_CARD_STYLE = DEFAULT_CARD_STYLES[0]
 
 # 集合名称
 COLLECTION_NAME = "idea_cards"
+
+# 卡片摘要投影：不返回内嵌的 edit_history，仅返回编辑次数
+# 未迁移的旧文档没有 edit_count 字段时由服务端按 edit_history 长度计算
+CARD_SUMMARY_PROJECTION = {
+    "title": 1,
+    "content": 1,
+    "card_style": 1,
+    "todos": 1,
+    "is_deleted": 1,
+    "deleted_at": 1,
+    "create_time": 1,
+    "update_time": 1,
+    "version": 1,
+    "edit_count": {"$ifNull": ["$edit_count", {"$size": {"$ifNull": ["$edit_history", []]}}]},
+}
+
+
+def version_filter(version: int) -> dict:
+    """构建匹配指定版本号的查询条件，没有 version 字段的旧文档视为版本 0"""
+    if version == 0:
+        return {"$or": [{"version": 0}, {"version": {"$exists": False}}]}
+    return {"version": version}
@@ -0,0 +1,34 @@
+"""
+元数据集合
+
+MongoDB 文档结构：
+{
+  "_id": str,      # 计数器名称
+  "seq": int       # 单调递增的序号
+}
+
+后台任务的租约（见 app.services.retention）：
+{
+  "_id": str,          # "lease:任务名"
+  "until": datetime,   # 租约到期时间
+  "holder": str        # 持有租约的进程标识
+}
+
+数据库结构版本（见 app.migrations）：
+{
+  "_id": "schema_version",
+  "version": int,      # 已执行的最新迁移版本
+  "applied": [         # 迁移执行记录
+    {"version": int, "name": str, "applied_at": datetime}
+  ]
+}
+"""
+
+# 集合名称
+META_COLLECTION_NAME = "meta"
+
+# 卡片数据变更计数器，任意卡片写入后递增
+CHANGE_COUNTER_ID = "idea_cards_changes"
+
+# 数据库结构版本，由 python -m app.migrate 维护
+SCHEMA_VERSION_ID = "schema_version"
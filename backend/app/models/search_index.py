@@ -0,0 +1,20 @@
+"""
+全文检索倒排索引数据模型
+
+每张卡片对应一个索引文档，terms 为多键索引，即倒排表。
+
+MongoDB 文档结构：
+{
+  "_id": ObjectId,         # 卡片ID
+  "is_deleted": bool,
+  "update_time": datetime,
+  "terms": [str],          # 标题、内容、待办文本的全部词项（去重）
+  "title_terms": [str],    # 标题词项，用于排序加权
+  "todo_terms": [str]      # 待办文本词项，用于排序加权
+}
+
+中日韩文本切分为单字和二元组（bigram），其他文本按字母数字切词并转为小写，见 app.services.search。
+"""
+
+# 集合名称
+SEARCH_INDEX_COLLECTION_NAME = "search_index"
@@ -0,0 +1,18 @@
+"""
+全局时间线事件数据模型
+
+MongoDB 文档结构（只追加，不修改）：
+{
+  "_id": str,              # 事件ID，由卡片ID/历史记录ID派生，回填时可幂等写入
+  "event_type": str,       # card_created, card_deleted, card_recovered, title_changed,
+                           # todo_added, todo_updated, todo_deleted
+  "card_id": str,
+  "card_title": str,
+  "event_time": datetime,
+  "description": str,
+  "details": dict | None
+}
+"""
+
+# 集合名称
+TIMELINE_COLLECTION_NAME = "timeline_events"
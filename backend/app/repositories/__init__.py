@@ -0,0 +1,69 @@
+"""
+卡片存储后端
+
+按 Settings.storage_backend 选择卡片接口使用的存储：
+- mongo：MongoDB（默认），支持全部接口
+- sqlite：内嵌 SQLite，支持卡片增删改查、回收站、编辑历史和时间线，其余接口返回 501
+
+路由通过 get_repository() 访问卡片存储；只支持 MongoDB 的接口通过 mongo_database() 获取数据库，
+其他存储后端下抛出 BackendNotSupported，由应用统一返回 501。
+"""
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.database import get_database
+from app.repositories.base import CardRepository, Position
+from app.repositories.mongo import MongoCardRepository
+from app.repositories.sqlite import SQLiteCardRepository
+
+__all__ = [
+    "BackendNotSupported",
+    "CardRepository",
+    "MongoCardRepository",
+    "Position",
+    "SQLiteCardRepository",
+    "close_repository",
+    "configure_repository",
+    "get_repository",
+    "mongo_database",
+]
+
+
+class BackendNotSupported(Exception):
+    """当前存储后端不支持该操作"""
+
+
+# 默认使用 MongoDB，连接由 app.database 管理
+_repository: CardRepository = MongoCardRepository()
+
+
+async def configure_repository(backend: str, sqlite_path: str = "") -> CardRepository:
+    """按配置初始化卡片存储"""
+    global _repository
+    if backend == "sqlite":
+        repository = SQLiteCardRepository(sqlite_path)
+        await repository.open()
+        _repository = repository
+    else:
+        _repository = MongoCardRepository()
+    return _repository
+
+
+async def close_repository() -> None:
+    """关闭卡片存储并恢复默认的 MongoDB 存储"""
+    global _repository
+    await _repository.close()
+    _repository = MongoCardRepository()
+
+
+def get_repository() -> CardRepository:
+    """获取卡片存储"""
+    return _repository
+
+
+def mongo_database() -> Optional[AsyncIOMotorDatabase]:
+    """只支持 MongoDB 的接口使用的数据库实例，其他存储后端下抛出 BackendNotSupported"""
+    if _repository.name != "mongo":
+        raise BackendNotSupported(_repository.name)
+    return get_database()
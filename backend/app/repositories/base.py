@@ -0,0 +1,132 @@
+"""
+卡片存储接口
+
+CardRepository 覆盖卡片接口需要的存储操作：卡片的增删改查与回收站、编辑历史、时间线事件和变更序号。
+文档格式与 MongoDB 集合一致（见 app.models），_id 为 ObjectId，时间为 UTC naive 并截断到毫秒，
+路由与整形函数无需区分存储后端。
+
+活动统计与全文检索属于派生数据，只有 MongoDB 后端维护；其他后端忽略相应写入，对应接口返回 501。
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Optional
+
+from bson import ObjectId
+
+from app.services.activity import ActivityEntry
+
+# 分页位置：上一页最后一条的 (排序时间, _id)
+Position = tuple[Any, Any]
+
+
+class CardRepository(ABC):
+    """卡片存储"""
+
+    # 存储后端名称，与 Settings.storage_backend 一致
+    name: str = ""
+
+    async def close(self) -> None:
+        """释放连接等资源"""
+
+    # ---- 变更序号 ----
+
+    @abstractmethod
+    async def current_change_seq(self) -> int:
+        """读取当前变更序号"""
+
+    @abstractmethod
+    async def record_change(self, changes: Optional[list[dict]]) -> int:
+        """
+        卡片写入后的统一收尾：递增变更序号并写回卡片，使缓存失效并推送变更，返回新的变更序号
+
+        changes 为 app.services.events.card_change 构建的变更消息，为 None 表示涉及全部卡片。
+        """
+
+    # ---- 卡片 ----
+
+    @abstractmethod
+    async def insert_card(self, doc: dict) -> None:
+        """写入新卡片，doc 不含 _id 时写入后补充"""
+
+    @abstractmethod
+    async def find_card(self, card_id: ObjectId, fields: Optional[tuple[str, ...]] = None) -> Optional[dict]:
+        """读取单张卡片（不含内嵌的 edit_history），fields 为需要的字段，后端可返回更多字段"""
+
+    @abstractmethod
+    async def list_cards(
+        self, is_deleted: bool, limit: int, after: Optional[Position], summary: bool
+    ) -> list[dict]:
+        """按 (update_time, _id) 倒序分页读取卡片，summary 为 True 时只需摘要字段"""
+
+    @abstractmethod
+    async def count_cards(self, is_deleted: bool) -> int:
+        """正常卡片或回收站中的卡片数量"""
+
+    @abstractmethod
+    async def update_card(
+        self, card_id: ObjectId, values: dict, version: int, now: datetime
+    ) -> Optional[dict]:
+        """
+        条件更新卡片内容，返回更新前的卡片
+
+        仅当卡片未删除、版本一致且 values 中至少一个字段有变化时更新，
+        同时递增 version 与 edit_count；未命中时返回 None，由调用方查明原因。
+        """
+
+    @abstractmethod
+    async def revert_update(self, card_id: ObjectId, existing: dict) -> None:
+        """
+        撤销 update_card 对 update_time、change_seq、version 和 edit_count 的修改（实际无变化时调用）
+
+        仅当卡片版本仍为本次更新后的版本时撤销，期间已有其他写入时保留其结果。
+        """
+
+    @abstractmethod
+    async def set_deleted(self, card_id: ObjectId, deleted: bool, now: datetime) -> Optional[dict]:
+        """删除（记录 deleted_at）或恢复卡片，返回更新前的卡片；卡片不存在或已处于目标状态时返回 None"""
+
+    # ---- 编辑历史 ----
+
+    @abstractmethod
+    async def record_history(self, card_id: ObjectId, history_item: dict, base: Optional[dict] = None) -> None:
+        """追加一条编辑历史，history_item 须包含修改后的卡片版本号 version，base 为变更前的卡片"""
+
+    @abstractmethod
+    async def history_page(self, card: dict, limit: int, before: Optional[Position] = None) -> list[dict]:
+        """按版本号倒序分页读取编辑历史，before 为 (version, history_id)，card 须包含 _id、content 与 todos"""
+
+    @abstractmethod
+    async def load_histories(self, cards: list[dict]) -> dict[ObjectId, list[dict]]:
+        """批量读取多张卡片的编辑历史（不含归档），按版本号正序排列"""
+
+    @abstractmethod
+    async def newest_history_version(self, card_id: ObjectId) -> Optional[int]:
+        """卡片最新一条编辑历史的版本号（含归档），没有历史时返回 None"""
+
+    # ---- 时间线 ----
+
+    @abstractmethod
+    async def record_events(self, events: list[dict]) -> None:
+        """追加时间线事件"""
+
+    @abstractmethod
+    async def timeline_page(
+        self,
+        event_types: Optional[list[str]],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int,
+        after: Optional[Position] = None,
+    ) -> tuple[list[dict], Optional[int]]:
+        """按 (event_time, _id) 倒序分页读取时间线事件，返回 (事件, 符合筛选条件的总数)，总数只在第一页（after 为空）返回"""
+
+    # ---- 派生数据 ----
+
+    async def record_activity(self, entries: list[ActivityEntry]) -> None:
+        """累加活动统计"""
+
+    async def index_cards(self, cards: list[dict]) -> None:
+        """写入或覆盖卡片的检索索引"""
+
+    async def mark_index_deleted(self, card_id: ObjectId, deleted: bool, update_time: datetime) -> None:
+        """同步检索索引中卡片的删除状态"""
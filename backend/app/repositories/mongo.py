@@ -0,0 +1,168 @@
+"""
+MongoDB 卡片存储
+
+直接调用 app.services 中的编辑历史、时间线、变更序号、活动统计和检索索引实现，
+行为与引入存储接口之前完全一致。
+"""
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from app.database import get_database
+from app.models.idea_card import CARD_SUMMARY_PROJECTION, COLLECTION_NAME, version_filter
+from app.models.timeline_event import TIMELINE_COLLECTION_NAME
+from app.repositories.base import CardRepository, Position
+from app.services.activity import ActivityEntry, record_activity
+from app.services.changes import CHANGE_PENDING, current_change_seq, record_change
+from app.services.history import find_history_page, load_histories, newest_history_version, record_history
+from app.services.pagination import keyset_filter
+from app.services.search import index_cards, mark_index_deleted
+from app.services.timeline import record_events
+
+
+class MongoCardRepository(CardRepository):
+    """MongoDB 卡片存储，未指定 db 时使用 app.database 的当前连接"""
+
+    name = "mongo"
+
+    def __init__(self, db: Optional[AsyncIOMotorDatabase] = None):
+        self._db = db
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return self._db if self._db is not None else get_database()
+
+    async def current_change_seq(self) -> int:
+        return await current_change_seq(self.db)
+
+    async def record_change(self, changes: Optional[list[dict]]) -> int:
+        return await record_change(self.db, changes)
+
+    async def insert_card(self, doc: dict) -> None:
+        result = await self.db[COLLECTION_NAME].insert_one(doc)
+        doc["_id"] = result.inserted_id
+
+    async def find_card(self, card_id: ObjectId, fields: Optional[tuple[str, ...]] = None) -> Optional[dict]:
+        projection = dict.fromkeys(fields, 1) if fields else {"edit_history": 0}
+        return await self.db[COLLECTION_NAME].find_one({"_id": card_id}, projection)
+
+    async def list_cards(
+        self, is_deleted: bool, limit: int, after: Optional[Position], summary: bool
+    ) -> list[dict]:
+        query: dict = {"is_deleted": is_deleted}
+        if after:
+            query.update(keyset_filter("update_time", *after))
+        cursor = (
+            self.db[COLLECTION_NAME]
+            .find(query, CARD_SUMMARY_PROJECTION if summary else {"edit_history": 0})
+            .sort([("update_time", -1), ("_id", -1)])
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    async def count_cards(self, is_deleted: bool) -> int:
+        return await self.db[COLLECTION_NAME].count_documents({"is_deleted": is_deleted})
+
+    async def update_card(
+        self, card_id: ObjectId, values: dict, version: int, now: datetime
+    ) -> Optional[dict]:
+        # 仅匹配未删除、版本一致且确有变化的卡片，一次往返完成校验与更新
+        conditions = [
+            {"_id": card_id, "is_deleted": False},
+            {"$or": [{field: {"$ne": value}} for field, value in values.items()]},
+            version_filter(version),
+        ]
+        return await self.db[COLLECTION_NAME].find_one_and_update(
+            {"$and": conditions},
+            {
+                "$set": {**values, "update_time": now, **CHANGE_PENDING},
+                "$inc": {"version": 1, "edit_count": 1}
+            },
+            projection={"edit_history": 0},
+            return_document=ReturnDocument.BEFORE,
+        )
+
+    async def revert_update(self, card_id: ObjectId, existing: dict) -> None:
+        # 字段顺序不同的等值子文档会被 $ne 视为变化；版本已被其他写入推进时不再撤销，以免覆盖其变更序号
+        await self.db[COLLECTION_NAME].update_one(
+            {"_id": card_id, "version": existing.get("version", 0) + 1},
+            {
+                "$set": {"update_time": existing["update_time"], "change_seq": existing.get("change_seq", 0)},
+                "$inc": {"version": -1, "edit_count": -1}
+            }
+        )
+
+    async def set_deleted(self, card_id: ObjectId, deleted: bool, now: datetime) -> Optional[dict]:
+        if deleted:
+            update = {"$set": {"is_deleted": True, "deleted_at": now, "update_time": now, **CHANGE_PENDING}}
+        else:
+            update = {
+                "$set": {"is_deleted": False, "update_time": now, **CHANGE_PENDING},
+                "$unset": {"deleted_at": ""},
+            }
+        return await self.db[COLLECTION_NAME].find_one_and_update(
+            {"_id": card_id, "is_deleted": not deleted}, update, projection={"title": 1}
+        )
+
+    async def record_history(self, card_id: ObjectId, history_item: dict, base: Optional[dict] = None) -> None:
+        await record_history(self.db, card_id, history_item, base)
+
+    async def history_page(self, card: dict, limit: int, before: Optional[Position] = None) -> list[dict]:
+        return await find_history_page(self.db, card, limit, before)
+
+    async def load_histories(self, cards: list[dict]) -> dict[ObjectId, list[dict]]:
+        return await load_histories(self.db, cards)
+
+    async def newest_history_version(self, card_id: ObjectId) -> Optional[int]:
+        return await newest_history_version(self.db, card_id)
+
+    async def record_events(self, events: list[dict]) -> None:
+        await record_events(self.db, events)
+
+    async def timeline_page(
+        self,
+        event_types: Optional[list[str]],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int,
+        after: Optional[Position] = None,
+    ) -> tuple[list[dict], Optional[int]]:
+        # 在 (event_type, event_time, _id) / (event_time, _id) 索引上做范围查询
+        query: dict = {}
+        if event_types:
+            query["event_type"] = {"$in": event_types}
+        if start or end:
+            query["event_time"] = {}
+            if start:
+                query["event_time"]["$gte"] = start
+            if end:
+                query["event_time"]["$lte"] = end
+        # 总数只在第一页统计：无筛选时使用集合元数据中的估计值，不扫描整个集合
+        total = None
+        if after:
+            query.update(keyset_filter("event_time", *after))
+        elif query:
+            total = await self.db[TIMELINE_COLLECTION_NAME].count_documents(query)
+        else:
+            total = await self.db[TIMELINE_COLLECTION_NAME].estimated_document_count()
+
+        cursor = (
+            self.db[TIMELINE_COLLECTION_NAME]
+            .find(query)
+            .sort([("event_time", -1), ("_id", -1)])
+            .limit(limit)
+        )
+        docs = await cursor.to_list(length=limit)
+        return docs, total
+
+    async def record_activity(self, entries: list[ActivityEntry]) -> None:
+        await record_activity(self.db, entries)
+
+    async def index_cards(self, cards: list[dict]) -> None:
+        await index_cards(self.db, cards)
+
+    async def mark_index_deleted(self, card_id: ObjectId, deleted: bool, update_time: datetime) -> None:
+        await mark_index_deleted(self.db, card_id, deleted, update_time)
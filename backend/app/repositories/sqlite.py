@@ -0,0 +1,467 @@
+"""
+内嵌 SQLite 卡片存储
+
+供单机部署和不依赖 mongod 的压测使用，数据保存在 SQLITE_PATH 指定的文件中（:memory: 为内存数据库）。
+标准库 sqlite3 为同步接口，所有操作在同一个专用线程中依次执行，事件循环不会阻塞；
+写操作因此天然串行，条件更新在一个事务内先读后写，无需 MongoDB 的原子更新操作符。
+
+文档与 MongoDB 集合结构一致：_id 保存为 ObjectId 的十六进制字符串，时间保存为毫秒精度的 ISO 8601 文本
+（按字典序即时间顺序，与 BSON 时间同精度），card_style、todos、change_content、details 保存为扩展 JSON。
+编辑历史同样以增量格式保存（见 app.services.delta），按修改后的卡片版本号排序，不做归档。
+
+只维护卡片、编辑历史、时间线事件和变更序号；活动统计、全文检索、增量同步、导入导出和后台保留任务
+依赖 MongoDB，对应接口返回 501。
+"""
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from bson import ObjectId, json_util
+
+from app.models.meta import CHANGE_COUNTER_ID
+from app.repositories.base import CardRepository, Position
+from app.services.changes import publish_change
+from app.services.delta import compact_change_content, expand_history
+from app.services.history import is_delta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idea_cards (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    card_style TEXT,
+    todos TEXT NOT NULL,
+    is_deleted INTEGER NOT NULL DEFAULT 0,
+    deleted_at TEXT,
+    create_time TEXT NOT NULL,
+    update_time TEXT NOT NULL,
+    edit_count INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    change_seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS idea_cards_deleted_update_time ON idea_cards (is_deleted, update_time DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idea_cards_change_seq ON idea_cards (change_seq, id);
+
+CREATE TABLE IF NOT EXISTS card_history (
+    id TEXT PRIMARY KEY,
+    card_id TEXT NOT NULL,
+    edit_time TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    operator TEXT,
+    change_content TEXT NOT NULL,
+    edit_note TEXT
+);
+CREATE INDEX IF NOT EXISTS card_history_card_version ON card_history (card_id, version DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS timeline_events (
+    id TEXT PRIMARY KEY,
+    event_type TEXT NOT NULL,
+    card_id TEXT NOT NULL,
+    card_title TEXT,
+    event_time TEXT NOT NULL,
+    description TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS timeline_events_event_time ON timeline_events (event_time DESC, id DESC);
+CREATE INDEX IF NOT EXISTS timeline_events_type_time ON timeline_events (event_type, event_time DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# 以扩展 JSON 保存的字段
+JSON_FIELDS = ("card_style", "todos")
+
+
+def _time(value: Optional[datetime]) -> Optional[str]:
+    """转换为 UTC naive 的毫秒精度 ISO 文本"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="milliseconds")
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _dumps(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return json_util.dumps(value, json_options=json_util.RELAXED_JSON_OPTIONS, ensure_ascii=False)
+
+
+def _loads(value: Optional[str]) -> Any:
+    return json_util.loads(value) if value is not None else None
+
+
+def _card_row(doc: dict) -> tuple:
+    return (
+        str(doc["_id"]),
+        doc["title"],
+        doc["content"],
+        _dumps(doc.get("card_style")),
+        _dumps(doc.get("todos", [])),
+        int(doc.get("is_deleted", False)),
+        _time(doc.get("deleted_at")),
+        _time(doc["create_time"]),
+        _time(doc["update_time"]),
+        doc.get("edit_count", 0),
+        doc.get("version", 0),
+        doc.get("change_seq"),
+    )
+
+
+def _card_doc(row: sqlite3.Row) -> dict:
+    doc = {
+        "_id": ObjectId(row["id"]),
+        "title": row["title"],
+        "content": row["content"],
+        "card_style": _loads(row["card_style"]),
+        "todos": _loads(row["todos"]),
+        "is_deleted": bool(row["is_deleted"]),
+        "create_time": _parse_time(row["create_time"]),
+        "update_time": _parse_time(row["update_time"]),
+        "edit_count": row["edit_count"],
+        "version": row["version"],
+        "change_seq": row["change_seq"],
+    }
+    # 与 MongoDB 一致：恢复后不存在 deleted_at 字段
+    if row["deleted_at"] is not None:
+        doc["deleted_at"] = _parse_time(row["deleted_at"])
+    return doc
+
+
+def _history_item(row: sqlite3.Row) -> dict:
+    return {
+        "history_id": row["id"],
+        "edit_time": _parse_time(row["edit_time"]),
+        "version": row["version"],
+        "operator": row["operator"],
+        "change_content": _loads(row["change_content"]),
+        "edit_note": row["edit_note"],
+    }
+
+
+def _event_doc(row: sqlite3.Row) -> dict:
+    return {
+        "_id": row["id"],
+        "event_type": row["event_type"],
+        "card_id": row["card_id"],
+        "card_title": row["card_title"],
+        "event_time": _parse_time(row["event_time"]),
+        "description": row["description"],
+        "details": _loads(row["details"]),
+    }
+
+
+def _keyset(column: str, position: Position, op: str = "<") -> tuple[str, list]:
+    """按 (column, id) 倒序排列时取下一页的条件，op 为 > 时取之前的记录"""
+    value, last_id = position[0], str(position[1])
+    if isinstance(value, datetime):
+        value = _time(value)
+    return f"({column} {op} ? OR ({column} = ? AND id {op} ?))", [value, value, last_id]
+
+
+class SQLiteCardRepository(CardRepository):
+    """内嵌 SQLite 卡片存储"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        """在专用线程中执行同步操作"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise RuntimeError("SQLite repository is not open")
+        return self._conn
+
+    async def open(self) -> None:
+        """打开数据库并创建表和索引"""
+        await self._run(self._open)
+
+    def _open(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    # ---- 变更序号 ----
+
+    async def current_change_seq(self) -> int:
+        return await self._run(self._current_change_seq)
+
+    def _current_change_seq(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (CHANGE_COUNTER_ID,)).fetchone()
+        return row["value"] if row else 0
+
+    async def record_change(self, changes: Optional[list[dict]]) -> int:
+        card_ids = None if changes is None else list({str(change["card_id"]) for change in changes})
+        seq = await self._run(self._bump_change_seq, card_ids)
+        await publish_change(seq, changes)
+        return seq
+
+    def _bump_change_seq(self, card_ids: Optional[list[str]]) -> int:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, 1) ON CONFLICT (key) DO UPDATE SET value = value + 1",
+                (CHANGE_COUNTER_ID,),
+            )
+            seq = self._current_change_seq()
+            if card_ids is None:
+                self.conn.execute("UPDATE idea_cards SET change_seq = ? WHERE change_seq IS NULL", (seq,))
+            elif card_ids:
+                placeholders = ",".join("?" * len(card_ids))
+                self.conn.execute(
+                    f"UPDATE idea_cards SET change_seq = ? WHERE id IN ({placeholders}) "
+                    "AND (change_seq IS NULL OR change_seq < ?)",
+                    (seq, *card_ids, seq),
+                )
+        return seq
+
+    # ---- 卡片 ----
+
+    async def insert_card(self, doc: dict) -> None:
+        doc.setdefault("_id", ObjectId())
+        await self._run(self._insert_card, _card_row(doc))
+
+    def _insert_card(self, row: tuple) -> None:
+        with self.conn:
+            self.conn.execute(f"INSERT INTO idea_cards VALUES ({','.join('?' * len(row))})", row)
+
+    async def find_card(self, card_id: ObjectId, fields: Optional[tuple[str, ...]] = None) -> Optional[dict]:
+        return await self._run(self._find_card, str(card_id))
+
+    def _find_card(self, card_id: str) -> Optional[dict]:
+        row = self.conn.execute("SELECT * FROM idea_cards WHERE id = ?", (card_id,)).fetchone()
+        return _card_doc(row) if row else None
+
+    async def list_cards(
+        self, is_deleted: bool, limit: int, after: Optional[Position], summary: bool
+    ) -> list[dict]:
+        return await self._run(self._list_cards, is_deleted, limit, after)
+
+    def _list_cards(self, is_deleted: bool, limit: int, after: Optional[Position]) -> list[dict]:
+        sql = "SELECT * FROM idea_cards WHERE is_deleted = ?"
+        params: list = [int(is_deleted)]
+        if after:
+            condition, values = _keyset("update_time", after)
+            sql += f" AND {condition}"
+            params += values
+        sql += " ORDER BY update_time DESC, id DESC LIMIT ?"
+        return [_card_doc(row) for row in self.conn.execute(sql, (*params, limit))]
+
+    async def count_cards(self, is_deleted: bool) -> int:
+        return await self._run(self._count, "SELECT COUNT(*) FROM idea_cards WHERE is_deleted = ?", [int(is_deleted)])
+
+    def _count(self, sql: str, params: list) -> int:
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    async def update_card(
+        self, card_id: ObjectId, values: dict, version: int, now: datetime
+    ) -> Optional[dict]:
+        return await self._run(self._update_card, str(card_id), values, version, now)
+
+    def _update_card(self, card_id: str, values: dict, version: int, now: datetime) -> Optional[dict]:
+        with self.conn:
+            existing = self._find_card(card_id)
+            if existing is None or existing["is_deleted"]:
+                return None
+            if existing["version"] != version:
+                return None
+            if all(existing.get(field) == value for field, value in values.items()):
+                return None
+            assignments = ", ".join(f"{field} = ?" for field in values)
+            params = [_dumps(value) if field in JSON_FIELDS else value for field, value in values.items()]
+            self.conn.execute(
+                f"UPDATE idea_cards SET {assignments}, update_time = ?, change_seq = NULL, "
+                "version = version + 1, edit_count = edit_count + 1 WHERE id = ?",
+                (*params, _time(now), card_id),
+            )
+        return existing
+
+    async def revert_update(self, card_id: ObjectId, existing: dict) -> None:
+        await self._run(self._revert_update, str(card_id), existing)
+
+    def _revert_update(self, card_id: str, existing: dict) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE idea_cards SET update_time = ?, change_seq = ?, version = version - 1, "
+                "edit_count = edit_count - 1 WHERE id = ? AND version = ?",
+                (_time(existing["update_time"]), existing.get("change_seq", 0), card_id, existing["version"] + 1),
+            )
+
+    async def set_deleted(self, card_id: ObjectId, deleted: bool, now: datetime) -> Optional[dict]:
+        return await self._run(self._set_deleted, str(card_id), deleted, now)
+
+    def _set_deleted(self, card_id: str, deleted: bool, now: datetime) -> Optional[dict]:
+        with self.conn:
+            existing = self._find_card(card_id)
+            if existing is None or existing["is_deleted"] == deleted:
+                return None
+            self.conn.execute(
+                "UPDATE idea_cards SET is_deleted = ?, deleted_at = ?, update_time = ?, change_seq = NULL WHERE id = ?",
+                (int(deleted), _time(now) if deleted else None, _time(now), card_id),
+            )
+        return existing
+
+    # ---- 编辑历史 ----
+
+    async def record_history(self, card_id: ObjectId, history_item: dict, base: Optional[dict] = None) -> None:
+        change_content = compact_change_content(history_item["change_content"], base)
+        row = (
+            history_item["history_id"],
+            str(card_id),
+            _time(history_item["edit_time"]),
+            history_item["version"],
+            history_item.get("operator"),
+            _dumps(change_content),
+            history_item.get("edit_note"),
+        )
+        await self._run(self._record_history, row)
+
+    def _record_history(self, row: tuple) -> None:
+        with self.conn:
+            self.conn.execute("INSERT INTO card_history VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+
+    async def history_page(self, card: dict, limit: int, before: Optional[Position] = None) -> list[dict]:
+        return await self._run(self._history_page, card, limit, before)
+
+    def _history_page(self, card: dict, limit: int, before: Optional[Position]) -> list[dict]:
+        card_id = str(card["_id"])
+        sql = "SELECT * FROM card_history WHERE card_id = ?"
+        params: list = [card_id]
+        if before:
+            condition, values = _keyset("version", before)
+            sql += f" AND {condition}"
+            params += values
+        sql += " ORDER BY version DESC, id DESC LIMIT ?"
+        items = [_history_item(row) for row in self.conn.execute(sql, (*params, limit))]
+        if not any(is_delta(item) for item in items):
+            return items
+
+        # 还原需要从最新一条开始，补读当前页之前的记录
+        newer: list[dict] = []
+        if before and items:
+            condition, values = _keyset("version", (items[0]["version"], items[0]["history_id"]), ">")
+            cursor = self.conn.execute(
+                f"SELECT * FROM card_history WHERE card_id = ? AND {condition} ORDER BY version DESC, id DESC",
+                (card_id, *values),
+            )
+            newer = [_history_item(row) for row in cursor]
+
+        expanded = expand_history(newer + items, card.get("content", ""), card.get("todos", []))
+        return expanded[len(newer):]
+
+    async def load_histories(self, cards: list[dict]) -> dict[ObjectId, list[dict]]:
+        return await self._run(self._load_histories, cards)
+
+    async def newest_history_version(self, card_id: ObjectId) -> Optional[int]:
+        return await self._run(self._newest_history_version, str(card_id))
+
+    def _newest_history_version(self, card_id: str) -> Optional[int]:
+        row = self.conn.execute("SELECT MAX(version) FROM card_history WHERE card_id = ?", (card_id,)).fetchone()
+        return row[0]
+
+    def _load_histories(self, cards: list[dict]) -> dict[ObjectId, list[dict]]:
+        latest_first: dict[str, list[dict]] = {str(card["_id"]): [] for card in cards}
+        if cards:
+            placeholders = ",".join("?" * len(latest_first))
+            cursor = self.conn.execute(
+                f"SELECT * FROM card_history WHERE card_id IN ({placeholders}) ORDER BY version DESC, id DESC",
+                list(latest_first),
+            )
+            for row in cursor:
+                latest_first[row["card_id"]].append(_history_item(row))
+        return {
+            card["_id"]: expand_history(
+                latest_first[str(card["_id"])], card.get("content", ""), card.get("todos", [])
+            )[::-1]
+            for card in cards
+        }
+
+    # ---- 时间线 ----
+
+    async def record_events(self, events: list[dict]) -> None:
+        if events:
+            rows = [
+                (
+                    event["_id"],
+                    event["event_type"],
+                    event["card_id"],
+                    event["card_title"],
+                    _time(event["event_time"]),
+                    event["description"],
+                    _dumps(event.get("details")),
+                )
+                for event in events
+            ]
+            await self._run(self._record_events, rows)
+
+    def _record_events(self, rows: list[tuple]) -> None:
+        # 事件ID确定性派生，重复写入同一事件时保留已有的一条
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO timeline_events VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    async def timeline_page(
+        self,
+        event_types: Optional[list[str]],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int,
+        after: Optional[Position] = None,
+    ) -> tuple[list[dict], int]:
+        return await self._run(self._timeline_page, event_types, start, end, limit, after)
+
+    def _timeline_page(
+        self,
+        event_types: Optional[list[str]],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int,
+        after: Optional[Position],
+    ) -> tuple[list[dict], Optional[int]]:
+        conditions: list[str] = []
+        params: list = []
+        if event_types:
+            conditions.append(f"event_type IN ({','.join('?' * len(event_types))})")
+            params += event_types
+        if start:
+            conditions.append("event_time >= ?")
+            params.append(_time(start))
+        if end:
+            conditions.append("event_time <= ?")
+            params.append(_time(end))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        total = None if after else self._count(f"SELECT COUNT(*) FROM timeline_events{where}", params)
+
+        if after:
+            condition, values = _keyset("event_time", after)
+            conditions.append(condition)
+            params += values
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.conn.execute(
+            f"SELECT * FROM timeline_events{where} ORDER BY event_time DESC, id DESC LIMIT ?", (*params, limit)
+        )
+        return [_event_doc(row) for row in cursor], total
@@ -0,0 +1,41 @@
+from datetime import datetime
+from dataclasses import asdict
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.repositories import mongo_database
+from app.services.backup import export_cards, import_cards
+from app.schemas.idea_card import ImportResponse
+
+router = APIRouter(prefix="/api", tags=["backup"])
+
+
+@router.get("/export")
+async def export_all_cards():
+    """
+    导出全部卡片及其编辑历史
+
+    以 NDJSON 流式返回，每行一张卡片（含已删除卡片），使用 MongoDB 扩展 JSON 表示 ObjectId 和时间。
+    仅支持 MongoDB 存储后端
+    """
+    db = mongo_database()
+    filename = f"thoughtflow-{datetime.utcnow():%Y%m%d%H%M%S}.ndjson"
+    return StreamingResponse(
+        export_cards(db),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_all_cards(request: Request):
+    """
+    导入 /api/export 导出的 NDJSON 数据
+
+    请求体按流读取，分批写入；卡片和编辑历史按 _id 覆盖写入，重复导入同一文件结果不变。
+    格式错误的行会被跳过并在结果中列出；新卡片的活动计入统计。仅支持 MongoDB 存储后端
+    """
+    db = mongo_database()
+    result = await import_cards(db, request.stream())
+    return ImportResponse(**asdict(result))
@@ -0,0 +1,63 @@
+import json
+from dataclasses import asdict
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import get_settings
+from app.services.events import Subscription, TooManySubscribers, event_broker
+
+router = APIRouter(prefix="/api", tags=["events"])
+
+settings = get_settings()
+
+
+def format_sse(message: dict) -> str:
+    """编码一条 SSE 消息，id 为变更序号"""
+    lines = []
+    if message.get("seq") is not None:
+        lines.append(f"id: {message['seq']}")
+    lines.append(f"event: {message['type']}")
+    lines.append(f"data: {json.dumps(message, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_changes(request: Request, subscription: Subscription):
+    """逐条输出变更，空闲时发送心跳注释以保持连接"""
+    try:
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            message = await subscription.get(settings.event_heartbeat_seconds)
+            yield format_sse(message) if message else ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+@router.get("/events/stream")
+async def stream_events(request: Request):
+    """
+    订阅卡片变更（Server-Sent Events）
+
+    推送 card_created / card_updated / card_deleted / card_recovered /
+    todo_added / todo_updated / todo_deleted 事件，消息体包含 card_id 和变更序号 seq。
+    收到 resync 事件时客户端应重新拉取数据（导入数据或接收过慢导致变更被丢弃）
+    """
+    try:
+        subscription = event_broker.subscribe()
+    except TooManySubscribers:
+        raise HTTPException(status_code=503, detail="订阅连接数已达上限，请稍后重试")
+    return StreamingResponse(
+        stream_changes(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/events/stats")
+async def event_stats():
+    """变更推送的订阅数、发布数和丢弃数"""
+    return {
+        **asdict(event_broker.stats),
+        "subscribers": len(event_broker.subscribers),
+        "queue_size": event_broker.queue_size,
+    }
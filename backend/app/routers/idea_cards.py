@@ -1,20 +1,71 @@
-from fastapi import APIRouter, HTTPException, Query, status
-from datetime import datetime
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
 from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from uuid import uuid4
 
-from app.database import get_database
-from app.models.idea_card import COLLECTION_NAME, DEFAULT_CARD_STYLE
+from app.models.idea_card import CARD_SUMMARY_PROJECTION, COLLECTION_NAME, DEFAULT_CARD_STYLE
+from app.repositories import CardRepository, get_repository, mongo_database
+from app.services.activity import Granularity, activity_entry, history_activity, query_activity, record_activity
+from app.services.cache import COLLECTION_TAG, read_cache
+from app.services.changes import CHANGE_PENDING, current_change_seq, record_change
+from app.services.delta import diff_todos, storage_form
+from app.services.events import (
+    CARD_CREATED,
+    CARD_DELETED,
+    CARD_RECOVERED,
+    CARD_UPDATED,
+    TODO_ADDED,
+    TODO_DELETED,
+    TODO_UPDATED,
+    card_change,
+)
+from app.services.etag import card_etag, is_not_modified, not_modified, seq_etag
+from app.services.history import build_history_item, diff_card, record_histories, record_history
+from app.services.sync import find_changes
+from app.services.search import index_cards, reindex_cards, search_cards
+from app.services.serialization import (
+    MSGPACK_MEDIA_TYPE,
+    ResponseFormat,
+    compile_shaper,
+    encode,
+    encode_json,
+    encoded_response,
+    json_response,
+    negotiate_format,
+)
+from app.services.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.services.timeline import (
+    card_created_event,
+    card_deleted_event,
+    card_recovered_event,
+    history_events,
+    record_events,
+)
 from app.schemas.idea_card import (
+    ActivityResponse,
     IdeaCardCreate,
     IdeaCardUpdate,
     IdeaCardResponse,
+    IdeaCardSummary,
     IdeaCardListResponse,
     EditHistoryResponse,
     MessageResponse,
+    SearchResponse,
+    SyncResponse,
+    BulkOperation,
+    BulkRequest,
+    BulkItemResult,
+    BulkResponse,
     TimelineEvent,
     TimelineResponse,
+    TodoCreate,
+    TodoItem,
+    TodoUpdate,
     CardStyle,
     EditHistoryItem,
     ChangeContent,
@@ -22,6 +73,23 @@ from app.schemas.idea_card import (
 
 router = APIRouter(prefix="/api", tags=["idea-cards"])
 
+# 列表返回字段：summary 为摘要，full 包含编辑历史
+CardFields = Literal["summary", "full"]
+
+# 支持 MessagePack 的接口在 OpenAPI 中声明的额外响应类型（Accept: application/msgpack）
+MSGPACK_RESPONSES = {200: {"content": {MSGPACK_MEDIA_TYPE: {}}}}
+
+# 时间线事件类型
+TimelineEventType = Literal[
+    "card_created",
+    "card_deleted",
+    "card_recovered",
+    "title_changed",
+    "todo_added",
+    "todo_updated",
+    "todo_deleted",
+]
+
 
 def convert_id(doc: dict) -> dict:
     """将 MongoDB _id 转换为字符串"""
@@ -30,8 +98,8 @@ def convert_id(doc: dict) -> dict:
     return doc
 
 
-def build_card_response(doc: dict) -> IdeaCardResponse:
-    """构建卡片响应对象"""
+def _fill_card_defaults(doc: dict) -> dict:
+    """补全卡片文档的缺省字段"""
     doc = convert_id(doc)
     # 确保 card_style 存在
     if "card_style" not in doc or doc["card_style"] is None:
@@ -39,12 +107,70 @@ def build_card_response(doc: dict) -> IdeaCardResponse:
     # 确保 todos 存在
     if "todos" not in doc:
         doc["todos"] = []
-    # 确保 edit_history 存在
-    if "edit_history" not in doc:
-        doc["edit_history"] = []
+    return doc
+
+
+def build_card_response(doc: dict, history: list[dict]) -> IdeaCardResponse:
+    """构建卡片响应对象，history 为按编辑时间正序排列的编辑历史（不含已归档的记录）"""
+    doc = _fill_card_defaults(doc)
+    doc["edit_history"] = history
+    doc["edit_count"] = max(doc.get("edit_count", 0), len(history))
     return IdeaCardResponse(**doc)
 
 
+def build_card_summary(doc: dict) -> IdeaCardSummary:
+    """构建卡片摘要对象（文档需使用 CARD_SUMMARY_PROJECTION 查询）"""
+    return IdeaCardSummary(**_fill_card_defaults(doc))
+
+
+# 读接口跳过 Pydantic 校验，按响应模型整形后直接编码（见 app.services.serialization）
+_shape_card = compile_shaper(IdeaCardResponse)
+_shape_summary = compile_shaper(IdeaCardSummary)
+_shape_card_list = compile_shaper(IdeaCardListResponse)
+_shape_history = compile_shaper(EditHistoryResponse)
+_shape_timeline_event = compile_shaper(TimelineEvent)
+_shape_timeline = compile_shaper(TimelineResponse)
+_shape_search = compile_shaper(SearchResponse)
+_shape_sync = compile_shaper(SyncResponse)
+_shape_activity = compile_shaper(ActivityResponse)
+
+
+def shape_card_response(doc: dict, history: list[dict]) -> dict:
+    """整形卡片详情，与 build_card_response 输出一致"""
+    doc = _fill_card_defaults(doc)
+    doc["edit_history"] = history
+    doc["edit_count"] = max(doc.get("edit_count", 0), len(history))
+    return _shape_card(doc)
+
+
+def shape_card_summary(doc: dict) -> dict:
+    """整形卡片摘要，与 build_card_summary 输出一致"""
+    return _shape_summary(_fill_card_defaults(doc))
+
+
+def shape_timeline_event(doc: dict) -> dict:
+    """整形时间线事件"""
+    doc["event_id"] = doc.pop("_id")
+    return _shape_timeline_event(doc)
+
+
+def cached_response(request: Request, key: tuple, fmt: Optional[ResponseFormat] = None) -> Optional[Response]:
+    """
+    从读缓存返回已编码的响应，If-None-Match 命中时返回 304，未命中缓存返回 None
+
+    支持 MessagePack 的接口传入协商后的 fmt（缓存键须包含 fmt），其余接口只返回 JSON。
+    """
+    cached = read_cache.get(key)
+    if cached is None:
+        return None
+    etag, body = cached
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if fmt is None:
+        return json_response(body, etag)
+    return encoded_response(body, fmt, etag)
+
+
 @router.post("/idea-card", response_model=IdeaCardResponse, status_code=status.HTTP_201_CREATED)
 async def create_idea_card(card: IdeaCardCreate):
     """
@@ -54,7 +180,7 @@ async def create_idea_card(card: IdeaCardCreate):
     - **content**: 想法内容
     - **card_style**: 可选，卡片样式
     """
-    db = get_database()
+    repository = get_repository()
     
     now = datetime.utcnow()
     card_style = card.card_style.model_dump() if card.card_style else DEFAULT_CARD_STYLE
@@ -67,141 +193,381 @@ async def create_idea_card(card: IdeaCardCreate):
         "is_deleted": False,
         "create_time": now,
         "update_time": now,
-        "edit_history": []
+        "edit_count": 0,
+        "version": 1,
+        "change_seq": None
     }
     
-    result = await db[COLLECTION_NAME].insert_one(doc)
-    doc["_id"] = result.inserted_id
+    await repository.insert_card(doc)
     
-    return build_card_response(doc)
+    await repository.record_events([card_created_event(str(doc["_id"]), card.title, now)])
+    await repository.record_activity([activity_entry(now, None, created=1)])
+    await repository.index_cards([doc])
+    await repository.record_change([card_change(CARD_CREATED, doc["_id"], version=1)])
+    
+    return build_card_response(doc, [])
 
 
-@router.get("/idea-cards", response_model=IdeaCardListResponse)
-async def get_idea_cards():
+async def list_cards(
+    request: Request,
+    is_deleted: bool,
+    limit: int,
+    after: Optional[str],
+    fields: CardFields,
+):
     """
-    查询所有正常卡片（未删除）
-    
-    返回按更新时间倒序排列的卡片列表
+    按 (update_time, _id) 倒序做游标分页查询卡片
+
+    ETag 由集合级变更序号和查询参数派生，If-None-Match 命中时只读取一次计数器即返回 304。
+    变更序号须在查询数据之前读取，保证 ETag 不会比返回的数据更新。
     """
-    db = get_database()
+    fmt = negotiate_format(request)
+    key = ("cards", is_deleted, limit, after, fields, fmt)
+    cached = cached_response(request, key, fmt)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
     
-    cursor = db[COLLECTION_NAME].find({"is_deleted": False}).sort("update_time", -1)
-    cards = await cursor.to_list(length=1000)
+    repository = get_repository()
     
-    return IdeaCardListResponse(
-        cards=[build_card_response(card) for card in cards],
-        total=len(cards)
-    )
+    etag = seq_etag("cards", await repository.current_change_seq(), is_deleted, limit, after, fields, fmt)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    position = None
+    if after:
+        try:
+            position = tuple(decode_cursor(after, 2))
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+    
+    full = fields == "full"
+    
+    # 多取一条用于判断是否还有下一页
+    cards = await repository.list_cards(is_deleted, limit + 1, position, summary=not full)
+    
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        last = cards[-1]
+        next_cursor = encode_cursor(last["update_time"], last["_id"])
+    
+    total = await repository.count_cards(is_deleted)
+    
+    if full:
+        histories = await repository.load_histories(cards)
+        results = [shape_card_response(card, histories[card["_id"]]) for card in cards]
+    else:
+        results = [shape_card_summary(card) for card in cards]
+    
+    body = encode(_shape_card_list({
+        "cards": results,
+        "total": total,
+        "next_cursor": next_cursor
+    }), fmt)
+    read_cache.set(key, (etag, body), COLLECTION_TAG, generation)
+    return encoded_response(body, fmt, etag)
 
 
-@router.get("/idea-cards/deleted", response_model=IdeaCardListResponse)
-async def get_deleted_cards():
+@router.get("/idea-cards", response_model=IdeaCardListResponse, responses=MSGPACK_RESPONSES)
+async def get_idea_cards(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000, description="每页数量"),
+    after: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    fields: CardFields = Query("summary", description="summary 不含编辑历史，full 包含完整编辑历史"),
+):
+    """
+    查询所有正常卡片（未删除）
+    
+    返回按更新时间倒序排列的卡片列表，使用 next_cursor 获取下一页。
+    支持 If-None-Match 条件请求，数据未变化时返回 304
+    """
+    return await list_cards(request, False, limit, after, fields)
+
+
+@router.get("/idea-cards/deleted", response_model=IdeaCardListResponse, responses=MSGPACK_RESPONSES)
+async def get_deleted_cards(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000, description="每页数量"),
+    after: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    fields: CardFields = Query("summary", description="summary 不含编辑历史，full 包含完整编辑历史"),
+):
     """
     查询所有已删除卡片
     
-    返回按删除时间倒序排列的卡片列表
+    返回按删除时间倒序排列的卡片列表，使用 next_cursor 获取下一页。
+    支持 If-None-Match 条件请求，数据未变化时返回 304
     """
-    db = get_database()
+    return await list_cards(request, True, limit, after, fields)
+
+
+@router.post("/idea-cards/bulk", response_model=BulkResponse)
+async def bulk_cards(request: BulkRequest):
+    """
+    批量操作卡片
+    
+    支持在一个请求中混合 create / update / delete / recover 操作，
+    先用一次查询读取涉及的卡片，再以一次无序 bulk_write 写入，返回逐项结果。
+    同一张卡片在一个请求中只能出现一次。仅支持 MongoDB 存储后端。
+    """
+    db = mongo_database()
+    now = datetime.utcnow()
     
-    cursor = db[COLLECTION_NAME].find({"is_deleted": True}).sort("update_time", -1)
-    cards = await cursor.to_list(length=1000)
+    results: list[Optional[BulkItemResult]] = [None] * len(request.operations)
     
-    return IdeaCardListResponse(
-        cards=[build_card_response(card) for card in cards],
-        total=len(cards)
-    )
+    def fail(index: int, op: BulkOperation, status_code: int, message: str) -> None:
+        results[index] = BulkItemResult(
+            index=index, op=op.op, card_id=op.card_id, success=False,
+            status_code=status_code, message=message,
+        )
+    
+    # 校验参数并收集需要读取的卡片
+    targets: dict[int, ObjectId] = {}
+    seen: set[ObjectId] = set()
+    for index, op in enumerate(request.operations):
+        if op.op == "create":
+            if op.card is None:
+                fail(index, op, 400, "create 操作缺少 card")
+            continue
+        if op.op == "update" and op.update is None:
+            fail(index, op, 400, "update 操作缺少 update")
+            continue
+        try:
+            object_id = ObjectId(op.card_id)
+        except Exception:
+            fail(index, op, 400, "无效的卡片ID")
+            continue
+        if object_id in seen:
+            fail(index, op, 400, "同一请求中重复操作该卡片")
+            continue
+        seen.add(object_id)
+        targets[index] = object_id
+    
+    existing_cards = {}
+    if targets:
+        cursor = db[COLLECTION_NAME].find({"_id": {"$in": list(targets.values())}}, {"edit_history": 0})
+        existing_cards = {card["_id"]: card async for card in cursor}
+    
+    # 构建写操作，以读取时的 update_time 作为并发校验条件
+    requests = []
+    planned: dict[int, tuple] = {}
+    for index, op in enumerate(request.operations):
+        if results[index] is not None:
+            continue
+        
+        if op.op == "create":
+            doc = {
+                "_id": ObjectId(),
+                "title": op.card.title,
+                "content": op.card.content,
+                "card_style": op.card.card_style.model_dump() if op.card.card_style else DEFAULT_CARD_STYLE,
+                "todos": [],
+                "is_deleted": False,
+                "create_time": now,
+                "update_time": now,
+                "edit_count": 0,
+                "version": 1,
+                "change_seq": None
+            }
+            requests.append(InsertOne(doc))
+            planned[index] = (doc,)
+            continue
+        
+        object_id = targets[index]
+        existing = existing_cards.get(object_id)
+        if existing is None:
+            fail(index, op, 404, "卡片不存在")
+            continue
+        guard = {"_id": object_id, "update_time": existing["update_time"]}
+        
+        if op.op == "update":
+            if existing.get("is_deleted"):
+                fail(index, op, 400, "已删除的卡片无法编辑")
+                continue
+            if existing.get("version", 0) != op.update.version:
+                fail(index, op, 409, "卡片已被他人修改，请刷新后重试")
+                continue
+            values = storage_form({
+                "title": op.update.title,
+                "content": op.update.content,
+                "card_style": op.update.card_style.model_dump() if op.update.card_style else DEFAULT_CARD_STYLE,
+                "todos": [todo.model_dump() for todo in op.update.todos],
+            })
+            change_content = diff_card(existing, values)
+            if not change_content:
+                fail(index, op, 400, "无修改内容，无需保存")
+                continue
+            # 同时匹配版本号，使记录的版本号与实际写入一致
+            requests.append(UpdateOne(
+                {**guard, "is_deleted": False, "version": existing.get("version")},
+                {"$set": {**values, "update_time": now, **CHANGE_PENDING}, "$inc": {"version": 1, "edit_count": 1}},
+            ))
+            # 单项未显式指定操作人时使用请求级的操作人（IdeaCardUpdate.operator 默认值不为空）
+            operator = op.update.operator if "operator" in op.update.model_fields_set else request.operator
+            history_item = build_history_item(
+                change_content, now, existing.get("version", 0) + 1, operator, op.update.edit_note
+            )
+            planned[index] = (existing, history_item, values)
+            continue
+        
+        deleting = op.op == "delete"
+        if existing.get("is_deleted") == deleting:
+            fail(index, op, 400, "卡片已处于删除状态" if deleting else "卡片未被删除，无需恢复")
+            continue
+        if deleting:
+            update = {"$set": {"is_deleted": True, "deleted_at": now, "update_time": now, **CHANGE_PENDING}}
+        else:
+            update = {"$set": {"is_deleted": False, "update_time": now, **CHANGE_PENDING}, "$unset": {"deleted_at": ""}}
+        requests.append(UpdateOne({**guard, "is_deleted": not deleting}, update))
+        planned[index] = (existing,)
+    
+    write_errors: dict[int, str] = {}
+    matched_all = True
+    if requests:
+        try:
+            result = await db[COLLECTION_NAME].bulk_write(requests, ordered=False)
+            matched_all = result.matched_count == len(requests) - result.inserted_count
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                write_errors[error["index"]] = error.get("errmsg", "写入失败")
+            matched_all = False
+    
+    # 有操作未命中时，按 update_time 确认哪些写入已生效
+    applied: Optional[set] = None
+    if not matched_all:
+        written = [plan[0]["_id"] for plan in planned.values()]
+        cursor = db[COLLECTION_NAME].find({"_id": {"$in": written}, "update_time": now}, {"_id": 1})
+        applied = {card["_id"] async for card in cursor}
+    
+    histories = []
+    events = []
+    activity = []
+    indexed = []
+    for position, (index, plan) in enumerate(planned.items()):
+        op = request.operations[index]
+        doc = plan[0]
+        card_id = str(doc["_id"])
+        if position in write_errors:
+            fail(index, op, 500, write_errors[position])
+            continue
+        if applied is not None and doc["_id"] not in applied:
+            fail(index, op, 409, "卡片已被他人修改，请刷新后重试")
+            continue
+        
+        title = doc.get("title", "未命名")
+        if op.op == "create":
+            events.append(card_created_event(card_id, title, now))
+            activity.append(activity_entry(now, request.operator, created=1))
+            indexed.append(doc)
+        elif op.op == "update":
+            _, history_item, values = plan
+            histories.append((doc["_id"], history_item, doc))
+            events.extend(history_events(card_id, values["title"], history_item))
+            activity.append(history_activity(history_item))
+            indexed.append({**doc, **values, "update_time": now})
+        else:
+            deleting = op.op == "delete"
+            event = card_deleted_event if deleting else card_recovered_event
+            events.append(event(card_id, title, now))
+            activity.append(activity_entry(now, request.operator, **{"deleted" if deleting else "recovered": 1}))
+            indexed.append({**doc, "is_deleted": deleting, "update_time": now})
+        
+        status_code = status.HTTP_201_CREATED if op.op == "create" else status.HTTP_200_OK
+        results[index] = BulkItemResult(
+            index=index, op=op.op, card_id=card_id, success=True, status_code=status_code
+        )
+    
+    await record_histories(db, histories)
+    await record_events(db, events)
+    await record_activity(db, activity)
+    await index_cards(db, indexed)
+    
+    succeeded = sum(1 for item in results if item.success)
+    if succeeded:
+        change_types = {
+            "create": CARD_CREATED, "update": CARD_UPDATED, "delete": CARD_DELETED, "recover": CARD_RECOVERED,
+        }
+        await record_change(db, [
+            card_change(change_types[item.op], item.card_id) for item in results if item.success
+        ])
+    return BulkResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
 
 
-@router.put("/idea-card/{card_id}", response_model=IdeaCardResponse)
+@router.put("/idea-card/{card_id}", response_model=IdeaCardSummary)
 async def update_idea_card(card_id: str, update: IdeaCardUpdate):
     """
     编辑想法卡片
     
-    自动记录编辑历史，仅当内容有实际变化时才追加历史记录
+    服务端以存储的卡片为准计算变更，仅当内容有实际变化时才追加历史记录。
+    返回卡片摘要，编辑历史通过 /idea-card/{card_id}/history 查询
     
     - **title**: 新标题
     - **content**: 新内容
     - **card_style**: 新样式
-    - **old_title**: 原标题（用于对比）
-    - **old_content**: 原内容（用于对比）
-    - **old_card_style**: 原样式（用于对比）
+    - **todos**: 新待办事项列表
+    - **version**: 客户端持有的版本号（必填），与服务端不一致时返回 409
     - **operator**: 操作人
     - **edit_note**: 编辑备注
     """
-    db = get_database()
+    repository = get_repository()
     
-    # 验证卡片存在
+    # 验证卡片ID
     try:
         object_id = ObjectId(card_id)
     except Exception:
         raise HTTPException(status_code=400, detail="无效的卡片ID")
     
-    existing = await db[COLLECTION_NAME].find_one({"_id": object_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="卡片不存在")
+    # 转换为存储形式，便于与数据库中的值比较
+    values = storage_form({
+        "title": update.title,
+        "content": update.content,
+        "card_style": update.card_style.model_dump() if update.card_style else DEFAULT_CARD_STYLE,
+        "todos": [todo.model_dump() for todo in update.todos],
+    })
     
-    if existing.get("is_deleted"):
-        raise HTTPException(status_code=400, detail="已删除的卡片无法编辑")
-    
-    # 检查是否有实际变化
-    new_style = update.card_style.model_dump() if update.card_style else DEFAULT_CARD_STYLE
-    old_style = update.old_card_style.model_dump() if update.old_card_style else DEFAULT_CARD_STYLE
-    
-    # 转换todos为字典格式用于比较
-    new_todos = [todo.model_dump() for todo in update.todos]
-    old_todos = [todo.model_dump() for todo in update.old_todos]
+    # 仅匹配未删除、版本一致且确有变化的卡片，校验与更新在一次原子操作中完成
+    now = datetime.utcnow()
+    existing = await repository.update_card(object_id, values, update.version, now)
     
-    has_title_change = update.title != update.old_title
-    has_content_change = update.content != update.old_content
-    has_style_change = new_style != old_style
-    has_todos_change = new_todos != old_todos
+    if existing is None:
+        await _raise_update_failure(repository, object_id, update.version)
     
-    if not (has_title_change or has_content_change or has_style_change or has_todos_change):
+    change_content = diff_card(existing, values)
+    if not change_content:
+        # 字段顺序不同的等值子文档会被 MongoDB 视为变化，撤销计数后按无修改处理
+        await repository.revert_update(object_id, existing)
         raise HTTPException(status_code=400, detail="无修改内容，无需保存")
     
-    now = datetime.utcnow()
+    # 追加历史记录，版本号由原子更新返回的文档推导，作为编辑历史的排序依据
+    version = existing.get("version", 0) + 1
+    history_item = build_history_item(change_content, now, version, update.operator, update.edit_note)
+    await repository.record_history(object_id, history_item, existing)
+    await repository.record_events(history_events(card_id, update.title, history_item))
+    await repository.record_activity([history_activity(history_item)])
     
-    # 构建变更内容
-    change_content = {}
-    if has_title_change:
-        change_content["title"] = {"old": update.old_title, "new": update.title}
-    if has_content_change:
-        change_content["content"] = {"old": update.old_content, "new": update.content}
-    if has_style_change:
-        change_content["card_style"] = {"old": old_style, "new": new_style}
-    if has_todos_change:
-        change_content["todos"] = {"old": old_todos, "new": new_todos}
-    
-    # 构建历史记录
-    history_item = {
-        "history_id": str(uuid4()),
-        "edit_time": now,
-        "operator": update.operator or "anonymous",
-        "change_content": change_content,
-        "edit_note": update.edit_note
+    # 由更新前的文档推导更新后的结果
+    updated = {
+        **existing,
+        **values,
+        "update_time": now,
+        "version": version,
+        "edit_count": existing.get("edit_count", 0) + 1,
     }
-    
-    # 原子更新：更新卡片内容 + 追加历史记录
-    update_result = await db[COLLECTION_NAME].update_one(
-        {"_id": object_id},
-        {
-            "$set": {
-                "title": update.title,
-                "content": update.content,
-                "card_style": new_style,
-                "todos": new_todos,
-                "update_time": now
-            },
-            "$push": {"edit_history": history_item}
-        }
-    )
-    
-    if update_result.modified_count == 0:
-        raise HTTPException(status_code=500, detail="更新失败")
-    
-    # 获取更新后的文档
-    updated = await db[COLLECTION_NAME].find_one({"_id": object_id})
-    return build_card_response(updated)
+    await repository.index_cards([updated])
+    await repository.record_change([card_change(CARD_UPDATED, card_id, version=updated["version"])])
+    return build_card_summary(updated)
+
+
+async def _raise_update_failure(repository: CardRepository, object_id: ObjectId, version: int) -> None:
+    """条件更新未命中时，查明原因并抛出对应的错误"""
+    card = await repository.find_card(object_id, ("is_deleted", "version"))
+    if not card:
+        raise HTTPException(status_code=404, detail="卡片不存在")
+    if card.get("is_deleted"):
+        raise HTTPException(status_code=400, detail="已删除的卡片无法编辑")
+    if card.get("version", 0) != version:
+        raise HTTPException(status_code=409, detail="卡片已被他人修改，请刷新后重试")
+    raise HTTPException(status_code=400, detail="无修改内容，无需保存")
 
 
 @router.patch("/idea-card/{card_id}/delete", response_model=MessageResponse)
@@ -209,31 +575,28 @@ async def soft_delete_card(card_id: str):
     """
     逻辑删除卡片
     
-    仅修改 is_deleted 字段为 True，数据完整保留
+    将 is_deleted 字段改为 True 并记录删除时间，数据完整保留；
+    超过回收站保留期限（TRASH_RETENTION_DAYS）后由后台任务移入归档
     """
-    db = get_database()
+    repository = get_repository()
     
     try:
         object_id = ObjectId(card_id)
     except Exception:
         raise HTTPException(status_code=400, detail="无效的卡片ID")
     
-    existing = await db[COLLECTION_NAME].find_one({"_id": object_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="卡片不存在")
+    now = datetime.utcnow()
+    existing = await repository.set_deleted(object_id, True, now)
     
-    if existing.get("is_deleted"):
-        raise HTTPException(status_code=400, detail="卡片已处于删除状态")
+    if existing is None:
+        if await repository.find_card(object_id, ("_id",)):
+            raise HTTPException(status_code=400, detail="卡片已处于删除状态")
+        raise HTTPException(status_code=404, detail="卡片不存在")
     
-    await db[COLLECTION_NAME].update_one(
-        {"_id": object_id},
-        {
-            "$set": {
-                "is_deleted": True,
-                "update_time": datetime.utcnow()
-            }
-        }
-    )
+    await repository.record_events([card_deleted_event(card_id, existing.get("title", "未命名"), now)])
+    await repository.record_activity([activity_entry(now, None, deleted=1)])
+    await repository.mark_index_deleted(object_id, True, now)
+    await repository.record_change([card_change(CARD_DELETED, card_id)])
     
     return MessageResponse(message="卡片已删除，可在已删除列表中恢复", success=True)
 
@@ -243,158 +606,467 @@ async def recover_card(card_id: str):
     """
     恢复已删除卡片
     
-    将 is_deleted 字段改回 False
+    将 is_deleted 字段改回 False 并移除删除时间
     """
-    db = get_database()
+    repository = get_repository()
     
     try:
         object_id = ObjectId(card_id)
     except Exception:
         raise HTTPException(status_code=400, detail="无效的卡片ID")
     
-    existing = await db[COLLECTION_NAME].find_one({"_id": object_id})
-    if not existing:
+    now = datetime.utcnow()
+    existing = await repository.set_deleted(object_id, False, now)
+    
+    if existing is None:
+        if await repository.find_card(object_id, ("_id",)):
+            raise HTTPException(status_code=400, detail="卡片未被删除，无需恢复")
         raise HTTPException(status_code=404, detail="卡片不存在")
     
-    if not existing.get("is_deleted"):
-        raise HTTPException(status_code=400, detail="卡片未被删除，无需恢复")
+    await repository.record_events([card_recovered_event(card_id, existing.get("title", "未命名"), now)])
+    await repository.record_activity([activity_entry(now, None, recovered=1)])
+    await repository.mark_index_deleted(object_id, False, now)
+    await repository.record_change([card_change(CARD_RECOVERED, card_id)])
+    
+    return MessageResponse(message="卡片已恢复", success=True)
+
+
+# 待办事项操作对应的变更类型
+TODO_CHANGE_TYPES = {"add": TODO_ADDED, "update": TODO_UPDATED, "remove": TODO_DELETED}
+
+
+async def _record_todo_change(
+    db: AsyncIOMotorDatabase,
+    object_id: ObjectId,
+    card_title: str,
+    op: dict,
+    now: datetime,
+    operator: str,
+    version: int,
+) -> None:
+    """
+    为单条待办事项操作追加增量格式的编辑历史、时间线事件和活动统计，并同步检索索引、推送变更
+
+    version 为该次操作后的卡片版本号，由原子更新返回的文档推导，作为编辑历史的排序依据。
+    """
+    history_item = build_history_item({"todos": {"ops": [op]}}, now, version, operator, None)
+    await record_history(db, object_id, history_item)
+    await record_events(db, history_events(str(object_id), card_title, history_item))
+    await record_activity(db, [history_activity(history_item)])
+    await reindex_cards(db, [object_id])
+    todo_id = op["todo"]["todo_id"] if "todo" in op else op["todo_id"]
+    await record_change(db, [card_change(TODO_CHANGE_TYPES[op["op"]], object_id, todo_id=todo_id, version=version)])
+
+
+async def _raise_todo_failure(db: AsyncIOMotorDatabase, object_id: ObjectId, todo_id: str) -> None:
+    """待办事项的条件更新未命中时，查明原因并抛出对应的错误"""
+    card = await db[COLLECTION_NAME].find_one(
+        {"_id": object_id}, {"is_deleted": 1, "todos": {"$elemMatch": {"todo_id": todo_id}}}
+    )
+    if not card:
+        raise HTTPException(status_code=404, detail="卡片不存在")
+    if card.get("is_deleted"):
+        raise HTTPException(status_code=400, detail="已删除的卡片无法编辑")
+    if card.get("todos"):
+        raise HTTPException(status_code=400, detail="无修改内容，无需保存")
+    raise HTTPException(status_code=404, detail="待办事项不存在")
+
+
+@router.post(
+    "/idea-card/{card_id}/todos",
+    response_model=TodoItem,
+    status_code=status.HTTP_201_CREATED,
+)
+async def add_todo(card_id: str, todo: TodoCreate):
+    """
+    新增待办事项
     
-    await db[COLLECTION_NAME].update_one(
-        {"_id": object_id},
+    追加到待办列表末尾，仅返回新增的待办事项
+    仅支持 MongoDB 存储后端
+    """
+    db = mongo_database()
+    
+    try:
+        object_id = ObjectId(card_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的卡片ID")
+    
+    now = datetime.utcnow()
+    item = storage_form({
+        "todo_id": todo.todo_id or str(uuid4()),
+        "text": todo.text,
+        "completed": False,
+        "create_time": now,
+        "update_time": now,
+    })
+    
+    existing = await db[COLLECTION_NAME].find_one_and_update(
+        {"_id": object_id, "is_deleted": False, "todos.todo_id": {"$ne": item["todo_id"]}},
+        {
+            "$push": {"todos": item},
+            "$set": {"update_time": now, **CHANGE_PENDING},
+            "$inc": {"version": 1, "edit_count": 1}
+        },
+        projection={"title": 1, "version": 1, "todos.todo_id": 1},
+    )
+    
+    if existing is None:
+        card = await db[COLLECTION_NAME].find_one({"_id": object_id}, {"is_deleted": 1})
+        if not card:
+            raise HTTPException(status_code=404, detail="卡片不存在")
+        if card.get("is_deleted"):
+            raise HTTPException(status_code=400, detail="已删除的卡片无法编辑")
+        raise HTTPException(status_code=409, detail="待办事项ID已存在")
+    
+    op = {"op": "add", "index": len(existing.get("todos", [])), "todo": item}
+    await _record_todo_change(
+        db, object_id, existing.get("title", "未命名"), op, now, todo.operator, existing.get("version", 0) + 1
+    )
+    
+    return TodoItem(**item)
+
+
+@router.patch("/idea-card/{card_id}/todos/{todo_id}", response_model=TodoItem)
+async def update_todo(card_id: str, todo_id: str, update: TodoUpdate):
+    """
+    更新待办事项
+    
+    使用数组定位符仅修改该条待办事项，仅返回修改后的待办事项
+    仅支持 MongoDB 存储后端
+    """
+    db = mongo_database()
+    
+    try:
+        object_id = ObjectId(card_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的卡片ID")
+    
+    values = update.model_dump(include={"text", "completed"}, exclude_none=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="无修改内容，无需保存")
+    
+    now = datetime.utcnow()
+    existing = await db[COLLECTION_NAME].find_one_and_update(
+        {
+            "_id": object_id,
+            "is_deleted": False,
+            "todos": {"$elemMatch": {
+                "todo_id": todo_id,
+                "$or": [{field: {"$ne": value}} for field, value in values.items()],
+            }},
+        },
         {
             "$set": {
-                "is_deleted": False,
-                "update_time": datetime.utcnow()
-            }
-        }
+                **{f"todos.$.{field}": value for field, value in values.items()},
+                "todos.$.update_time": now,
+                "update_time": now,
+                **CHANGE_PENDING
+            },
+            "$inc": {"version": 1, "edit_count": 1}
+        },
+        projection={"title": 1, "version": 1, "todos": {"$elemMatch": {"todo_id": todo_id}}},
     )
     
-    return MessageResponse(message="卡片已恢复", success=True)
+    if existing is None:
+        await _raise_todo_failure(db, object_id, todo_id)
+    
+    old_todo = existing["todos"][0]
+    new_todo = storage_form({**old_todo, **values, "update_time": now})
+    [op] = diff_todos([old_todo], [new_todo])
+    await _record_todo_change(
+        db, object_id, existing.get("title", "未命名"), op, now, update.operator, existing.get("version", 0) + 1
+    )
+    
+    return TodoItem(**new_todo)
+
+
+@router.delete("/idea-card/{card_id}/todos/{todo_id}", response_model=TodoItem)
+async def delete_todo(
+    card_id: str,
+    todo_id: str,
+    operator: str = Query("anonymous", description="操作人"),
+):
+    """
+    删除待办事项
+    
+    返回被删除的待办事项
+    仅支持 MongoDB 存储后端
+    """
+    db = mongo_database()
+    
+    try:
+        object_id = ObjectId(card_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的卡片ID")
+    
+    now = datetime.utcnow()
+    existing = await db[COLLECTION_NAME].find_one_and_update(
+        {"_id": object_id, "is_deleted": False, "todos.todo_id": todo_id},
+        {
+            "$pull": {"todos": {"todo_id": todo_id}},
+            "$set": {"update_time": now, **CHANGE_PENDING},
+            "$inc": {"version": 1, "edit_count": 1}
+        },
+        projection={"title": 1, "version": 1, "todos": 1},
+    )
+    
+    if existing is None:
+        await _raise_todo_failure(db, object_id, todo_id)
+    
+    todos = existing["todos"]
+    index = next(i for i, t in enumerate(todos) if t.get("todo_id") == todo_id)
+    op = {"op": "remove", "index": index, "todo": todos[index]}
+    await _record_todo_change(
+        db, object_id, existing.get("title", "未命名"), op, now, operator, existing.get("version", 0) + 1
+    )
+    
+    return TodoItem(**todos[index])
+
 
+# 卡片先于编辑历史写入，读到版本号领先最新历史的卡片时短暂等待历史写入后重读
+HISTORY_SETTLE_ATTEMPTS = 3
+HISTORY_SETTLE_DELAY = 0.05
 
-@router.get("/idea-card/{card_id}/history", response_model=EditHistoryResponse)
-async def get_card_history(card_id: str):
+
+async def _find_settled_card(
+    repository: CardRepository, object_id: ObjectId, fields: Optional[tuple[str, ...]] = None
+) -> tuple[Optional[dict], bool]:
+    """
+    读取卡片并确认其编辑历史已写入，返回 (卡片, 历史是否已跟上卡片版本)
+
+    未创建过历史的卡片版本号为 1；重读后仍未跟上时调用方不应返回 ETag 或写入缓存。
+    """
+    for attempt in range(HISTORY_SETTLE_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(HISTORY_SETTLE_DELAY)
+        card = await repository.find_card(object_id, fields)
+        if not card:
+            return None, True
+        newest = await repository.newest_history_version(object_id)
+        if card.get("version", 0) <= (newest if newest is not None else 1):
+            return card, True
+    return card, False
+
+
+@router.get("/idea-card/{card_id}/history", response_model=EditHistoryResponse, responses=MSGPACK_RESPONSES)
+async def get_card_history(
+    card_id: str,
+    request: Request,
+    limit: int = Query(50, ge=1, le=500, description="每页数量"),
+    before: Optional[str] = Query(None, description="上一页返回的 next_cursor，获取更早的记录"),
+):
     """
     查询单张卡片的编辑历史
     
-    返回按编辑时间倒序排列的历史记录列表
+    返回按编辑时间倒序排列的历史记录列表，使用 next_cursor 获取更早的记录。
+    编辑历史只随卡片写入变化，ETag 由卡片版本派生，命中时不查询历史记录；
+    卡片的编辑历史尚未写入时不返回 ETag，也不写入缓存
     """
-    db = get_database()
+    fmt = negotiate_format(request)
+    key = ("history", card_id, limit, before, fmt)
+    cached = cached_response(request, key, fmt)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
+    
+    repository = get_repository()
     
     try:
         object_id = ObjectId(card_id)
     except Exception:
         raise HTTPException(status_code=400, detail="无效的卡片ID")
     
-    card = await db[COLLECTION_NAME].find_one({"_id": object_id})
+    cursor_values = None
+    if before:
+        try:
+            cursor_values = tuple(decode_cursor(before, 2))
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+        # 早期按编辑时间分页的游标不再适用
+        if not isinstance(cursor_values[0], int):
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+    
+    card, settled = await _find_settled_card(
+        repository,
+        object_id,
+        ("title", "content", "todos", "edit_count", "version", "update_time", "history_archived"),
+    )
     if not card:
         raise HTTPException(status_code=404, detail="卡片不存在")
     
-    # 按编辑时间倒序排列
-    history = card.get("edit_history", [])
-    history_sorted = sorted(history, key=lambda x: x.get("edit_time", datetime.min), reverse=True)
+    etag = card_etag(card, "history" if fmt == "json" else "history-msgpack") if settled else None
+    if etag and is_not_modified(request, etag):
+        return not_modified(etag)
     
-    return EditHistoryResponse(
-        card_id=str(card["_id"]),
-        card_title=card["title"],
-        total_edits=len(history),
-        history=history_sorted
-    )
+    # 按版本号倒序分页，多取一条用于判断是否还有更早的记录
+    history = await repository.history_page(card, limit + 1, cursor_values)
+    next_cursor = None
+    if len(history) > limit:
+        history = history[:limit]
+        next_cursor = encode_cursor(history[-1]["version"], history[-1]["history_id"])
+    
+    body = encode(_shape_history({
+        "card_id": str(card["_id"]),
+        "card_title": card["title"],
+        "total_edits": card.get("edit_count", 0),
+        "history": history,
+        "next_cursor": next_cursor
+    }), fmt)
+    if etag:
+        read_cache.set(key, (etag, body), str(object_id), generation)
+    return encoded_response(body, fmt, etag)
 
 
 @router.get("/idea-card/{card_id}", response_model=IdeaCardResponse)
-async def get_idea_card(card_id: str):
+async def get_idea_card(card_id: str, request: Request):
     """
     获取单张卡片详情
+    
+    支持 If-None-Match 条件请求：先只读取版本号和更新时间，未变化时直接返回 304。
+    卡片的编辑历史尚未写入时不返回 ETag，也不写入缓存
     """
-    db = get_database()
+    key = ("card", card_id)
+    cached = cached_response(request, key)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
+    
+    repository = get_repository()
     
     try:
         object_id = ObjectId(card_id)
     except Exception:
         raise HTTPException(status_code=400, detail="无效的卡片ID")
     
-    card = await db[COLLECTION_NAME].find_one({"_id": object_id})
+    if request.headers.get("if-none-match"):
+        stamp = await repository.find_card(object_id, ("version", "update_time", "history_archived"))
+        if not stamp:
+            raise HTTPException(status_code=404, detail="卡片不存在")
+        if is_not_modified(request, card_etag(stamp)):
+            return not_modified(card_etag(stamp))
+    
+    card, settled = await _find_settled_card(repository, object_id)
     if not card:
         raise HTTPException(status_code=404, detail="卡片不存在")
+    etag = card_etag(card) if settled else None
     
-    return build_card_response(card)
+    histories = await repository.load_histories([card])
+    body = encode_json(shape_card_response(card, histories[object_id]))
+    if etag:
+        read_cache.set(key, (etag, body), str(object_id), generation)
+    return json_response(body, etag)
 
 
-def _diff_todos(old_todos: list, new_todos: list, card_id: str, card_title: str, event_time: datetime) -> list[TimelineEvent]:
-    """比较新旧待办事项列表，生成增删改事件"""
-    events = []
-    old_map = {t.get("todo_id", ""): t for t in old_todos if t.get("todo_id")}
-    new_map = {t.get("todo_id", ""): t for t in new_todos if t.get("todo_id")}
-
-    # 新增的 todo
-    for tid, todo in new_map.items():
-        if tid not in old_map:
-            events.append(TimelineEvent(
-                event_id=str(uuid4()),
-                event_type="todo_added",
-                card_id=card_id,
-                card_title=card_title,
-                event_time=event_time,
-                description=f"「{card_title}」新增待办: {todo.get('text', '')}",
-                details={"todo_text": todo.get("text", ""), "todo_id": tid}
-            ))
+@router.get("/sync", response_model=SyncResponse)
+async def sync_cards(
+    since: Optional[str] = Query(None, description="上次同步返回的 next_token，为空时全量同步"),
+    limit: int = Query(500, ge=1, le=1000, description="每次返回的最大变更数"),
+):
+    """
+    增量同步卡片
+    
+    返回 since 之后新增、修改的卡片和已删除卡片的墓碑，以及下次同步使用的令牌。
+    变更按单调递增的变更序号排序，has_more 为 true 时继续使用 next_token 拉取。
+    仅支持 MongoDB 存储后端
+    """
+    db = mongo_database()
+    
+    since_values = None
+    if since:
+        try:
+            since_values = decode_cursor(since, 2)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="无效的同步令牌")
+    
+    cards, next_token, has_more = await find_changes(db, since_values, limit)
+    
+    return json_response(encode_json(_shape_sync({
+        "cards": [shape_card_summary(card) for card in cards if not card.get("is_deleted")],
+        "deleted": [str(card["_id"]) for card in cards if card.get("is_deleted")],
+        "next_token": next_token,
+        "has_more": has_more
+    })))
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="检索词"),
+    include_deleted: bool = Query(False, description="是否包含已删除卡片"),
+    limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    after: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+):
+    """
+    全文检索卡片标题、内容和待办事项
+    
+    中文按单字和二元组切分，检索词切分后须全部命中；
+    结果按相关度（标题、待办命中加权）和更新时间倒序排列，使用 next_cursor 获取下一页。
+    仅支持 MongoDB 存储后端
+    """
+    key = ("search", q, include_deleted, limit, after)
+    cached = cached_response(request, key)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
+    
+    db = mongo_database()
+    
+    cursor_values = None
+    if after:
+        try:
+            cursor_values = decode_cursor(after, 3)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+    
+    etag = seq_etag("search", await current_change_seq(db), q, include_deleted, limit, after)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    # 多取一条用于判断是否还有下一页
+    hits, total = await search_cards(db, q, include_deleted, limit + 1, cursor_values)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last = hits[-1]
+        next_cursor = encode_cursor(last["score"], last["update_time"], last["_id"])
+    
+    cursor = db[COLLECTION_NAME].find({"_id": {"$in": [hit["_id"] for hit in hits]}}, CARD_SUMMARY_PROJECTION)
+    cards = {card["_id"]: card async for card in cursor}
+    results = [
+        {"card": shape_card_summary(cards[hit["_id"]]), "score": hit["score"]}
+        for hit in hits if hit["_id"] in cards
+    ]
+    
+    body = encode_json(_shape_search({"hits": results, "total": total, "next_cursor": next_cursor}))
+    read_cache.set(key, (etag, body), COLLECTION_TAG, generation)
+    return json_response(body, etag)
 
-    # 删除的 todo
-    for tid, todo in old_map.items():
-        if tid not in new_map:
-            events.append(TimelineEvent(
-                event_id=str(uuid4()),
-                event_type="todo_deleted",
-                card_id=card_id,
-                card_title=card_title,
-                event_time=event_time,
-                description=f"「{card_title}」删除待办: {todo.get('text', '')}",
-                details={"todo_text": todo.get("text", ""), "todo_id": tid}
-            ))
 
-    # 修改的 todo (text 或 completed 状态变化)
-    for tid in new_map:
-        if tid in old_map:
-            old_t = old_map[tid]
-            new_t = new_map[tid]
-            changes = []
-            if old_t.get("text") != new_t.get("text"):
-                changes.append(f"内容: \"{old_t.get('text')}\" → \"{new_t.get('text')}\"")
-            if old_t.get("completed") != new_t.get("completed"):
-                status_str = "已完成" if new_t.get("completed") else "未完成"
-                changes.append(f"状态: {status_str}")
-            if changes:
-                events.append(TimelineEvent(
-                    event_id=str(uuid4()),
-                    event_type="todo_updated",
-                    card_id=card_id,
-                    card_title=card_title,
-                    event_time=event_time,
-                    description=f"「{card_title}」更新待办: {new_t.get('text', '')} ({', '.join(changes)})",
-                    details={
-                        "todo_text": new_t.get("text", ""),
-                        "old_todo_text": old_t.get("text", ""),
-                        "todo_id": tid,
-                        "changes": changes
-                    }
-                ))
-
-    return events
-
-
-@router.get("/timeline", response_model=TimelineResponse)
+@router.get("/timeline", response_model=TimelineResponse, responses=MSGPACK_RESPONSES)
 async def get_global_timeline(
+    request: Request,
     start_time: Optional[str] = Query(None, description="起始时间 ISO 格式"),
     end_time: Optional[str] = Query(None, description="结束时间 ISO 格式"),
+    event_type: Optional[list[TimelineEventType]] = Query(None, description="事件类型，可重复传入多个"),
+    limit: int = Query(100, ge=1, le=1000, description="每页数量"),
+    after: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
 ):
     """
     获取全局操作时间线
     
-    汇总所有卡片的创建、删除、标题修改和待办事项变更事件。
-    支持按时间范围筛选。
+    从时间线事件日志读取卡片的创建、删除、恢复、标题修改和待办事项变更事件，
+    按事件时间倒序排列，使用 next_cursor 获取下一页。
+    支持按时间范围和事件类型筛选，支持 If-None-Match 条件请求。
     """
-    db = get_database()
+    event_types = sorted(set(event_type)) if event_type else None
+    fmt = negotiate_format(request)
+    key = ("timeline", start_time, end_time, tuple(event_types or ()), limit, after, fmt)
+    cached = cached_response(request, key, fmt)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
+    
+    repository = get_repository()
     
     # 解析时间范围
     dt_start = None
@@ -410,76 +1082,73 @@ async def get_global_timeline(
         except ValueError:
             raise HTTPException(status_code=400, detail="无效的结束时间格式")
 
-    # 获取所有卡片(包括已删除)
-    cursor = db[COLLECTION_NAME].find({})
-    all_cards = await cursor.to_list(length=5000)
-
-    events: list[TimelineEvent] = []
-
-    for card in all_cards:
-        card_id = str(card["_id"])
-        card_title = card.get("title", "未命名")
-        create_time = card.get("create_time")
-        is_deleted = card.get("is_deleted", False)
-
-        # 1. 卡片创建事件
-        if create_time:
-            events.append(TimelineEvent(
-                event_id=str(uuid4()),
-                event_type="card_created",
-                card_id=card_id,
-                card_title=card_title,
-                event_time=create_time,
-                description=f"新增「{card_title}」",
-            ))
+    cursor_values = None
+    if after:
+        try:
+            cursor_values = tuple(decode_cursor(after, 2))
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
 
-        # 2. 卡片删除事件 (is_deleted=True 且没有后续恢复)
-        if is_deleted:
-            delete_time = card.get("update_time", create_time)
-            events.append(TimelineEvent(
-                event_id=str(uuid4()),
-                event_type="card_deleted",
-                card_id=card_id,
-                card_title=card_title,
-                event_time=delete_time,
-                description=f"删除「{card_title}」",
-            ))
+    # 事件只随卡片写入追加，ETag 复用卡片的变更序号
+    etag = seq_etag(
+        "timeline", await repository.current_change_seq(), start_time, end_time, event_types, limit, after, fmt
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    # 多取一条用于判断是否还有下一页
+    docs, total = await repository.timeline_page(event_types, dt_start, dt_end, limit + 1, cursor_values)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["event_time"], docs[-1]["_id"])
+    
+    events = [shape_timeline_event(doc) for doc in docs]
+    
+    body = encode(_shape_timeline({"events": events, "total": total, "next_cursor": next_cursor}), fmt)
+    read_cache.set(key, (etag, body), COLLECTION_TAG, generation)
+    return encoded_response(body, fmt, etag)
 
-        # 3. 从 edit_history 提取标题变更和 todo 变更
-        for hist in card.get("edit_history", []):
-            cc = hist.get("change_content", {})
-            edit_time = hist.get("edit_time")
-            if not edit_time:
-                continue
 
-            # 标题变更
-            if cc.get("title"):
-                old_title = cc["title"].get("old", "")
-                new_title = cc["title"].get("new", "")
-                events.append(TimelineEvent(
-                    event_id=str(uuid4()),
-                    event_type="title_changed",
-                    card_id=card_id,
-                    card_title=card_title,
-                    event_time=edit_time,
-                    description=f"标题修改: 「{old_title}」→「{new_title}」",
-                    details={"old_title": old_title, "new_title": new_title}
-                ))
-
-            # 待办事项变更
-            if cc.get("todos"):
-                old_todos = cc["todos"].get("old", [])
-                new_todos = cc["todos"].get("new", [])
-                todo_events = _diff_todos(old_todos, new_todos, card_id, card_title, edit_time)
-                events.extend(todo_events)
-
-    # 时间范围筛选
-    if dt_start:
-        events = [e for e in events if e.event_time >= dt_start]
-    if dt_end:
-        events = [e for e in events if e.event_time <= dt_end]
-
-    # 按时间倒序排列
-    events.sort(key=lambda e: e.event_time, reverse=True)
-
-    return TimelineResponse(events=events, total=len(events))
+# 活动统计单次查询的最大天数
+MAX_ACTIVITY_DAYS = 3660
+
+
+@router.get("/stats/activity", response_model=ActivityResponse, tags=["stats"])
+async def get_activity_stats(
+    request: Request,
+    start: Optional[date] = Query(None, alias="from", description="起始日期（UTC，含），默认为结束日期前 29 天"),
+    end: Optional[date] = Query(None, alias="to", description="结束日期（UTC，含），默认为今天"),
+    granularity: Granularity = Query("day", description="统计粒度：day 按日，week 按周（周一起始）"),
+):
+    """
+    活动统计
+    
+    返回每日（或每周）新建、删除、恢复、编辑和待办事项完成等计数，以及各操作人的计数。
+    数据来自写操作累加的日汇总文档，查询代价只与天数有关。
+    支持 If-None-Match 条件请求。仅支持 MongoDB 存储后端
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="起始日期不能晚于结束日期")
+    if (end - start).days >= MAX_ACTIVITY_DAYS:
+        raise HTTPException(status_code=400, detail=f"统计范围不能超过 {MAX_ACTIVITY_DAYS} 天")
+    
+    key = ("activity", start, end, granularity)
+    cached = cached_response(request, key)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
+    
+    db = mongo_database()
+    
+    # 汇总随卡片写入累加，ETag 复用卡片的变更序号
+    etag = seq_etag("activity", await current_change_seq(db), start, end, granularity)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    body = encode_json(_shape_activity(await query_activity(db, start, end, granularity)))
+    read_cache.set(key, (etag, body), COLLECTION_TAG, generation)
+    return json_response(body, etag)
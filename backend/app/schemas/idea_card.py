@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Any
-from datetime import datetime
+from typing import Optional, Any, Literal, Union
+from datetime import date, datetime
 
 
 class TodoItem(BaseModel):
@@ -50,34 +50,59 @@ class IdeaCardUpdate(BaseModel):
     content: str = Field(..., min_length=1, max_length=2000, description="新内容")
     card_style: Optional[CardStyle] = Field(default=None, description="新样式")
     todos: list[TodoItem] = Field(default=[], description="新待办事项列表")
-    old_title: str = Field(..., description="原标题")
-    old_content: str = Field(..., description="原内容")
-    old_card_style: Optional[CardStyle] = Field(default=None, description="原样式")
-    old_todos: list[TodoItem] = Field(default=[], description="原待办事项列表")
+    version: int = Field(..., ge=0, description="客户端持有的卡片版本号，不一致时返回 409")
+    old_title: Optional[str] = Field(default=None, description="已废弃，服务端以存储的卡片为准")
+    old_content: Optional[str] = Field(default=None, description="已废弃，服务端以存储的卡片为准")
+    old_card_style: Optional[CardStyle] = Field(default=None, description="已废弃，服务端以存储的卡片为准")
+    old_todos: Optional[list[TodoItem]] = Field(default=None, description="已废弃，服务端以存储的卡片为准")
     operator: str = Field(default="anonymous", description="操作人")
     edit_note: Optional[str] = Field(default=None, description="编辑备注")
 
 
-class IdeaCardResponse(BaseModel):
-    """想法卡片响应"""
+class TodoCreate(BaseModel):
+    """新增待办事项请求"""
+    todo_id: Optional[str] = Field(default=None, min_length=1, max_length=64, description="可选，客户端生成的待办ID")
+    text: str = Field(..., min_length=1, max_length=500, description="待办内容")
+    operator: str = Field(default="anonymous", description="操作人")
+
+
+class TodoUpdate(BaseModel):
+    """更新待办事项请求，仅提交需要修改的字段"""
+    text: Optional[str] = Field(default=None, min_length=1, max_length=500, description="新待办内容")
+    completed: Optional[bool] = Field(default=None, description="是否完成")
+    operator: str = Field(default="anonymous", description="操作人")
+
+
+class IdeaCardSummary(BaseModel):
+    """想法卡片摘要（不含编辑历史）"""
     id: str = Field(..., alias="_id", description="卡片ID")
     title: str = Field(..., description="想法标题")
     content: str = Field(..., description="想法内容")
     card_style: CardStyle = Field(..., description="卡片样式")
     todos: list[TodoItem] = Field(default=[], description="待办事项列表")
     is_deleted: bool = Field(default=False, description="是否已删除")
+    deleted_at: Optional[datetime] = Field(default=None, description="删除时间，未删除时为空")
     create_time: datetime = Field(..., description="创建时间")
     update_time: datetime = Field(..., description="最后更新时间")
-    edit_history: list[EditHistoryItem] = Field(default=[], description="编辑历史")
+    edit_count: int = Field(default=0, description="编辑次数")
+    version: int = Field(default=0, description="版本号")
     
     class Config:
         populate_by_name = True
 
 
+class IdeaCardResponse(IdeaCardSummary):
+    """想法卡片响应"""
+    edit_history: list[EditHistoryItem] = Field(..., description="编辑历史")
+
+
 class IdeaCardListResponse(BaseModel):
     """想法卡片列表响应"""
-    cards: list[IdeaCardResponse] = Field(..., description="卡片列表")
+    cards: list[Union[IdeaCardResponse, IdeaCardSummary]] = Field(
+        ..., description="卡片列表，默认为摘要，fields=full 时包含编辑历史"
+    )
     total: int = Field(..., description="总数")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，为空表示没有更多数据")
 
 
 class EditHistoryResponse(BaseModel):
@@ -86,6 +111,73 @@ class EditHistoryResponse(BaseModel):
     card_title: str = Field(..., description="卡片标题")
     total_edits: int = Field(..., description="编辑次数")
     history: list[EditHistoryItem] = Field(..., description="历史记录列表")
+    next_cursor: Optional[str] = Field(default=None, description="更早记录的分页游标，为空表示没有更多数据")
+
+
+class SyncResponse(BaseModel):
+    """增量同步响应"""
+    cards: list[IdeaCardSummary] = Field(..., description="新增或修改的正常卡片")
+    deleted: list[str] = Field(..., description="已删除卡片的ID（墓碑）")
+    next_token: str = Field(..., description="下次同步时作为 since 传入")
+    has_more: bool = Field(..., description="是否还有更多变更，为 true 时应立即使用 next_token 继续同步")
+
+
+class SearchHit(BaseModel):
+    """检索命中项"""
+    card: IdeaCardSummary = Field(..., description="卡片摘要")
+    score: int = Field(..., description="相关度得分，标题和待办命中加权")
+
+
+class SearchResponse(BaseModel):
+    """检索响应"""
+    hits: list[SearchHit] = Field(..., description="按相关度排序的命中列表")
+    total: int = Field(..., description="命中总数")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，为空表示没有更多数据")
+
+
+class BulkOperation(BaseModel):
+    """批量操作中的单项操作"""
+    op: Literal["create", "update", "delete", "recover"] = Field(..., description="操作类型")
+    card_id: Optional[str] = Field(default=None, description="卡片ID，update/delete/recover 时必填")
+    card: Optional[IdeaCardCreate] = Field(default=None, description="新卡片内容，create 时必填")
+    update: Optional[IdeaCardUpdate] = Field(default=None, description="更新内容，update 时必填")
+
+
+class BulkRequest(BaseModel):
+    """批量操作请求"""
+    operations: list[BulkOperation] = Field(..., min_length=1, max_length=1000, description="操作列表")
+    operator: str = Field(default="anonymous", description="操作人")
+
+
+class BulkItemResult(BaseModel):
+    """批量操作的单项结果"""
+    index: int = Field(..., description="对应操作在请求中的位置")
+    op: str = Field(..., description="操作类型")
+    card_id: Optional[str] = Field(default=None, description="卡片ID")
+    success: bool = Field(..., description="是否成功")
+    status_code: int = Field(..., description="与单项接口一致的状态码")
+    message: Optional[str] = Field(default=None, description="失败原因")
+
+
+class BulkResponse(BaseModel):
+    """批量操作响应"""
+    results: list[BulkItemResult] = Field(..., description="逐项结果，与请求顺序一致")
+    succeeded: int = Field(..., description="成功数量")
+    failed: int = Field(..., description="失败数量")
+
+
+class ImportErrorItem(BaseModel):
+    """导入失败的行"""
+    line: int = Field(..., description="行号，从 1 开始")
+    message: str = Field(..., description="失败原因")
+
+
+class ImportResponse(BaseModel):
+    """导入结果"""
+    cards: int = Field(..., description="写入的卡片数量")
+    history: int = Field(..., description="写入的编辑历史数量")
+    error_count: int = Field(..., description="失败的行数")
+    errors: list[ImportErrorItem] = Field(..., description="失败的行，最多返回前 100 条")
 
 
 class MessageResponse(BaseModel):
@@ -97,7 +189,7 @@ class MessageResponse(BaseModel):
 class TimelineEvent(BaseModel):
     """全局时间线事件"""
     event_id: str = Field(..., description="事件唯一ID")
-    event_type: str = Field(..., description="事件类型: card_created, card_deleted, title_changed, todo_added, todo_updated, todo_deleted")
+    event_type: str = Field(..., description="事件类型: card_created, card_deleted, card_recovered, title_changed, todo_added, todo_updated, todo_deleted")
     card_id: str = Field(..., description="关联卡片ID")
     card_title: str = Field(..., description="卡片标题")
     event_time: datetime = Field(..., description="事件时间")
@@ -108,4 +200,38 @@ class TimelineEvent(BaseModel):
 class TimelineResponse(BaseModel):
     """全局时间线响应"""
     events: list[TimelineEvent] = Field(..., description="时间线事件列表")
-    total: int = Field(..., description="事件总数")
+    total: Optional[int] = Field(default=None, description="符合筛选条件的事件总数，只在第一页返回")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，为空表示没有更多数据")
+
+
+class ActivityCounts(BaseModel):
+    """活动计数"""
+    created: int = Field(default=0, description="新建卡片数")
+    deleted: int = Field(default=0, description="删除卡片数")
+    recovered: int = Field(default=0, description="恢复卡片数")
+    edited: int = Field(default=0, description="编辑次数（含待办事项操作）")
+    todo_added: int = Field(default=0, description="新增待办事项数")
+    todo_updated: int = Field(default=0, description="修改待办事项次数")
+    todo_completed: int = Field(default=0, description="完成待办事项数")
+    todo_deleted: int = Field(default=0, description="删除待办事项数")
+
+
+class OperatorActivity(ActivityCounts):
+    """单个操作人的活动计数"""
+    operator: str = Field(..., description="操作人")
+
+
+class ActivityBucket(ActivityCounts):
+    """一个统计周期的活动计数"""
+    start: date = Field(..., description="周期起始日期（UTC），按周统计时为周一")
+    operators: list[OperatorActivity] = Field(default_factory=list, description="该周期内各操作人的活动计数")
+
+
+class ActivityResponse(BaseModel):
+    """活动统计响应"""
+    start: date = Field(..., description="统计起始日期（含）")
+    end: date = Field(..., description="统计结束日期（含）")
+    granularity: Literal["day", "week"] = Field(..., description="统计粒度")
+    buckets: list[ActivityBucket] = Field(..., description="按时间顺序排列的各周期计数")
+    totals: ActivityCounts = Field(..., description="范围内的合计")
+    operators: list[OperatorActivity] = Field(..., description="范围内各操作人的合计")
@@ -0,0 +1,23 @@
+"""
+为旧卡片补充变更序号
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.backfill_change_seq
+"""
+import asyncio
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.changes import backfill_change_seq
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        count = await backfill_change_seq(get_database())
+        print(f"Backfilled change_seq for {count} cards")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
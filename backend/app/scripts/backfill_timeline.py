@@ -0,0 +1,23 @@
+"""
+一次性回填全局时间线事件
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.backfill_timeline
+"""
+import asyncio
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.timeline import backfill_timeline_events
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        inserted = await backfill_timeline_events(get_database())
+        print(f"Backfilled {inserted} timeline events")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+"""
+对比读接口的两种序列化方式
+
+pydantic：构建响应模型后经 FastAPI 按 response_model 校验、序列化并由 JSONResponse 编码（改造前的路径）
+fast：按响应模型整形后由 orjson 直接编码（app.services.serialization）
+
+随后对同一份整形结果输出各响应格式的编码耗时和大小：JSON、MessagePack（Accept: application/msgpack），
+以及 CompressionMiddleware 按配置的等级做 gzip / br 压缩后的大小和压缩耗时。
+
+使用生成的卡片数据，不需要连接数据库。
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.bench_serialization
+    python -m app.scripts.bench_serialization --sizes 1000 10000 --history 5 --repeat 5
+"""
+import argparse
+import asyncio
+import copy
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+import msgpack
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.routers.idea_cards import (
+    _shape_card_list,
+    build_card_response,
+    build_card_summary,
+    shape_card_response,
+    shape_card_summary,
+)
+from app.config import get_settings
+from app.schemas.idea_card import IdeaCardListResponse
+from app.services.compression import CompressionMiddleware, brotli
+from app.services.serialization import encode_json, encode_msgpack
+
+
+def make_cards(count: int, history_per_card: int) -> list[tuple[dict, list[dict]]]:
+    """生成卡片文档及其已还原的编辑历史"""
+    base = datetime(2024, 1, 1)
+    cards = []
+    for i in range(count):
+        created = base + timedelta(minutes=i)
+        todos = [
+            {
+                "todo_id": f"todo-{i}-{j}",
+                "text": f"待办事项 {j}：整理第 {i} 张卡片的想法",
+                "completed": j % 2 == 0,
+                "create_time": created,
+                "update_time": created + timedelta(seconds=j),
+            }
+            for j in range(3)
+        ]
+        history = [
+            {
+                "history_id": f"history-{i}-{j}",
+                "edit_time": created + timedelta(hours=j),
+                "operator": "anonymous",
+                "change_content": {
+                    "title": {"old": f"想法 {i} v{j}", "new": f"想法 {i} v{j + 1}"},
+                    "content": {"old": "旧的内容" * 10, "new": "新的内容" * 10},
+                },
+                "edit_note": None,
+            }
+            for j in range(history_per_card)
+        ]
+        card = {
+            "_id": ObjectId(),
+            "title": f"想法 {i}",
+            "content": f"第 {i} 张卡片的内容，包含一些中文和 English words。" * 4,
+            "card_style": {"bg_color": "#FFF9C4", "text_color": "#333333", "border_radius": "20px", "shadow": "soft"},
+            "todos": todos,
+            "is_deleted": False,
+            "create_time": created,
+            "update_time": created + timedelta(hours=history_per_card),
+            "edit_count": history_per_card,
+            "version": history_per_card,
+            "change_seq": i,
+        }
+        cards.append((card, history))
+    return cards
+
+
+async def pydantic_path(field, cards: list[tuple[dict, list[dict]]], full: bool) -> bytes:
+    if full:
+        results = [build_card_response(card, history) for card, history in cards]
+    else:
+        results = [build_card_summary(card) for card, _ in cards]
+    result = IdeaCardListResponse(cards=results, total=len(results), next_cursor=None)
+    content = await serialize_response(field=field, response_content=result)
+    return JSONResponse(content).body
+
+
+async def fast_path(field, cards: list[tuple[dict, list[dict]]], full: bool) -> bytes:
+    if full:
+        results = [shape_card_response(card, history) for card, history in cards]
+    else:
+        results = [shape_card_summary(card) for card, _ in cards]
+    return encode_json(_shape_card_list({"cards": results, "total": len(results), "next_cursor": None}))
+
+
+async def measure(path, field, cards, full: bool, repeat: int) -> tuple[float, bytes]:
+    """返回最短耗时（毫秒）和输出；每轮使用文档副本，副本复制不计入耗时"""
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        docs = copy.deepcopy(cards)
+        start = time.perf_counter()
+        body = await path(field, docs, full)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, body
+
+
+def time_best(func: Callable[[], bytes], repeat: int) -> tuple[float, bytes]:
+    """返回最短耗时（毫秒）和输出"""
+    best = float("inf")
+    output = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, output
+
+
+def encoding_rows(content: dict, repeat: int) -> list[tuple[str, float, int]]:
+    """
+    各响应格式的（名称，编码耗时，字节数）
+
+    压缩行的耗时只包含压缩本身，实际请求的耗时为对应编码行与压缩行之和。
+    """
+    settings = get_settings()
+    compressor = CompressionMiddleware(
+        None,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+
+    rows = []
+    for name, encoder in (("json", encode_json), ("msgpack", encode_msgpack)):
+        encode_ms, body = time_best(lambda: encoder(content), repeat)
+        rows.append((name, encode_ms, len(body)))
+        for encoding in encodings:
+            compress_ms, compressed = time_best(lambda: compressor.compress(body, encoding), repeat)
+            rows.append((f"{name}+{encoding}", compress_ms, len(compressed)))
+    return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="对比读接口的序列化耗时")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="卡片数量")
+    parser.add_argument("--history", type=int, default=3, help="每张卡片的编辑历史条数（fields=full）")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，取最短耗时")
+    args = parser.parse_args()
+
+    field = create_response_field(name="bench", type_=IdeaCardListResponse, mode="serialization")
+
+    print(f"{'cards':>7} {'fields':>8} {'pydantic ms':>12} {'fast ms':>10} {'speedup':>8} {'bytes':>10}")
+    for size in args.sizes:
+        cards = make_cards(size, args.history)
+        for full in (False, True):
+            slow_ms, slow_body = await measure(pydantic_path, field, cards, full, args.repeat)
+            fast_ms, fast_body = await measure(fast_path, field, cards, full, args.repeat)
+            if json.loads(slow_body) != json.loads(fast_body):
+                raise SystemExit(f"输出不一致：cards={size} full={full}")
+            print(
+                f"{size:>7} {'full' if full else 'summary':>8} {slow_ms:>12.1f} {fast_ms:>10.1f} "
+                f"{slow_ms / fast_ms:>7.1f}x {len(fast_body):>10}"
+            )
+
+    print()
+    print(f"{'cards':>7} {'fields':>8} {'format':<14} {'encode ms':>10} {'bytes':>10} {'ratio':>7}")
+    for size in args.sizes:
+        cards = make_cards(size, args.history)
+        for full in (False, True):
+            if full:
+                results = [shape_card_response(card, history) for card, history in cards]
+            else:
+                results = [shape_card_summary(card) for card, _ in cards]
+            content = _shape_card_list({"cards": results, "total": len(results), "next_cursor": None})
+            if msgpack.unpackb(encode_msgpack(content)) != json.loads(encode_json(content)):
+                raise SystemExit(f"MessagePack 与 JSON 输出不一致：cards={size} full={full}")
+            rows = encoding_rows(content, args.repeat)
+            json_bytes = rows[0][2]
+            for name, encode_ms, size_bytes in rows:
+                print(
+                    f"{size:>7} {'full' if full else 'summary':>8} {name:<14} {encode_ms:>10.1f} "
+                    f"{size_bytes:>10} {size_bytes / json_bytes:>7.2f}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+"""
+按保留策略立即整理编辑历史，将超出策略的记录压缩移入归档
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.compact_history
+    python -m app.scripts.compact_history --keep-entries 50 --keep-days 30
+
+未指定时使用 HISTORY_HOT_ENTRIES / HISTORY_HOT_DAYS 配置。
+"""
+import argparse
+import asyncio
+
+from app.config import get_settings
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.history import compact_histories
+
+
+async def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="整理编辑历史")
+    parser.add_argument("--keep-entries", type=int, default=settings.history_hot_entries, help="每张卡片保留的最新记录数")
+    parser.add_argument("--keep-days", type=float, default=settings.history_hot_days, help="保留最近多少天内的记录")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        cards, entries = await compact_histories(get_database(), args.keep_entries, args.keep_days)
+        print(f"Archived {entries} history entries of {cards} cards")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,536 @@
+"""
+接口压测
+
+按参数生成数据集（N 张卡片，每张 M 条编辑历史、K 条待办），以多个并发客户端依次压测
+app.routers.idea_cards 中的每个接口，输出各接口的 p50 / p95 / p99 延迟、吞吐量和进程峰值内存。
+结果可保存为 JSON 基线，之后的运行与基线对比，延迟或吞吐量劣化超过阈值时以非零状态退出。
+
+数据库：
+  --backend mongo   连接 MongoDB，使用独立的压测库（默认 thoughtflow_bench，运行前会清空）
+  --backend memory  使用 mongomock-motor 内存数据库（需另行安装），部分聚合表达式不受支持，
+                    对应接口会计入错误数，结果仅用于观察应用层开销
+  --backend sqlite  使用内嵌 SQLite 存储（--sqlite-path，默认内存数据库），不需要 mongod；
+                    只压测该存储支持的接口（见 app.repositories）
+
+默认在进程内通过 ASGI 调用应用；指定 --url 时改为请求已运行的服务
+（服务须连接同一个数据库，峰值内存此时只反映压测进程）。需要安装 httpx。
+
+bytes 为响应在传输中的平均大小（压缩后）。--accept msgpack 以 MessagePack 请求列表、时间线和编辑历史接口，
+--accept-encoding 指定请求的压缩算法（identity 表示不压缩），用于对比不同格式和压缩的大小与延迟。
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.load_test --backend memory --cards 1000 --history 5 --todos 3
+    python -m app.scripts.load_test --cards 10000 --concurrency 20 --save bench/baseline.json
+    python -m app.scripts.load_test --cards 10000 --concurrency 20 --compare bench/baseline.json
+    python -m app.scripts.load_test --backend memory --accept msgpack --accept-encoding br
+    python -m app.scripts.load_test --backend sqlite --cards 10000 --save bench/sqlite.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+from uuid import uuid4
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+import app.database as database
+from app.config import get_settings
+from app.repositories import (
+    CardRepository,
+    MongoCardRepository,
+    close_repository,
+    configure_repository,
+    get_repository,
+)
+from app.models.card_history import HISTORY_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME, DEFAULT_CARD_STYLE
+from app.services.activity import rebuild_activity
+from app.services.cache import configure_cache, read_cache, shutdown_cache
+from app.services.events import configure_events, shutdown_events
+from app.services.history import build_history_item, to_history_doc
+from app.services.migrations import apply_migrations
+from app.services.search import index_cards
+from app.services.serialization import MSGPACK_MEDIA_TYPE
+from app.services.timeline import card_events, upsert_card_events
+
+settings = get_settings()
+
+SEED_BATCH_SIZE = 500
+
+
+@dataclass
+class Dataset:
+    """压测数据集参数"""
+    cards: int
+    history: int
+    todos: int
+    seed: int
+
+
+@dataclass
+class Context:
+    """压测过程中各接口共享的数据"""
+    rng: random.Random
+    card_ids: list[str]
+    todos: list[tuple[str, str]]
+    created: list[str] = field(default_factory=list)
+    added_todos: list[tuple[str, str]] = field(default_factory=list)
+    etags: dict[str, str] = field(default_factory=dict)
+    versions: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class Scenario:
+    """
+    单个接口的压测场景
+
+    build(ctx, i) 返回第 i 个请求的 (method, url, 请求参数)；
+    after(ctx, response) 在请求成功后记录后续场景需要的数据；
+    limit(ctx) 返回可执行的请求数上限（例如删除只能作用于已创建的卡片）；
+    mongo_only 的场景在其他存储后端下跳过。
+    """
+    name: str
+    build: Callable[[Context, int], tuple[str, str, dict]]
+    after: Optional[Callable[[Context, Any], None]] = None
+    limit: Optional[Callable[[Context], int]] = None
+    ok_status: tuple[int, ...] = (200, 201)
+    mongo_only: bool = False
+
+
+@dataclass
+class RouteResult:
+    """单个接口的压测结果"""
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput_rps: float
+    avg_bytes: float
+    peak_rss_mb: float
+    status: dict[str, int]
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB）"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def seed(db: Optional[AsyncIOMotorDatabase], dataset: Dataset, repository: CardRepository) -> Context:
+    """
+    写入压测数据集
+
+    每张卡片的编辑历史为一串连续的标题修改，时间线事件和全文检索索引与正常写入的结果一致。
+    约 10% 的卡片为已删除状态，返回的 Context 中只包含未删除的卡片及其待办。
+    其他存储后端通过卡片存储接口逐条写入卡片、编辑历史和时间线事件（db 为 None）。
+    """
+    rng = random.Random(dataset.seed)
+    base = datetime(2024, 1, 1)
+    card_ids: list[str] = []
+    todos: list[tuple[str, str]] = []
+
+    for start in range(0, dataset.cards, SEED_BATCH_SIZE):
+        cards = []
+        history_items: list[tuple[ObjectId, dict]] = []
+        for i in range(start, min(start + SEED_BATCH_SIZE, dataset.cards)):
+            card_id = ObjectId()
+            created = base + timedelta(minutes=i)
+            card_todos = []
+            for j in range(dataset.todos):
+                todo_time = created + timedelta(seconds=j)
+                card_todos.append({
+                    "todo_id": str(uuid4()),
+                    "text": f"待办 {j}：跟进想法 {i} 的第 {j} 步",
+                    "completed": rng.random() < 0.3,
+                    "create_time": todo_time,
+                    "update_time": todo_time,
+                })
+            for j in range(dataset.history):
+                item = build_history_item(
+                    {"title": {"old": f"想法 {i} v{j}", "new": f"想法 {i} v{j + 1}"}},
+                    created + timedelta(hours=j + 1),
+                    j + 1,
+                    "anonymous",
+                    None,
+                )
+                history_items.append((card_id, item))
+            is_deleted = rng.random() < 0.1
+            cards.append({
+                "_id": card_id,
+                "title": f"想法 {i} v{dataset.history}",
+                "content": f"第 {i} 张卡片的内容，记录一些 ideas 和灵感。" * rng.randint(1, 8),
+                "card_style": DEFAULT_CARD_STYLE,
+                "todos": card_todos,
+                "is_deleted": is_deleted,
+                "create_time": created,
+                "update_time": created + timedelta(hours=dataset.history),
+                "edit_count": dataset.history,
+                "version": dataset.history,
+                "change_seq": None,
+            })
+            if not is_deleted:
+                card_ids.append(str(card_id))
+                todos.extend((str(card_id), todo["todo_id"]) for todo in card_todos)
+
+        if db is None:
+            histories: dict[ObjectId, list[dict]] = {card["_id"]: [] for card in cards}
+            for card in cards:
+                await repository.insert_card(card)
+            for card_id, item in history_items:
+                await repository.record_history(card_id, item)
+                histories[card_id].append(item)
+            await repository.record_events([
+                event for card in cards for event in card_events(card, histories[card["_id"]])
+            ])
+            continue
+
+        await db[COLLECTION_NAME].insert_many(cards)
+        if history_items:
+            await db[HISTORY_COLLECTION_NAME].insert_many(
+                [to_history_doc(card_id, item) for card_id, item in history_items]
+            )
+        await upsert_card_events(db, cards)
+        await index_cards(db, cards)
+
+    if db is not None:
+        await rebuild_activity(db)
+    await repository.record_change(None)
+    return Context(rng=rng, card_ids=card_ids, todos=todos)
+
+
+def _pick(ctx: Context, values: list, i: int):
+    return values[i % len(values)]
+
+
+def build_scenarios() -> list[Scenario]:
+    """按执行顺序列出各接口的压测场景，先读后写"""
+
+    def remember_etag(ctx: Context, response) -> None:
+        card_id = response.json()["_id"]
+        ctx.etags[card_id] = response.headers.get("etag", "")
+
+    def remember_created(ctx: Context, response) -> None:
+        card = response.json()
+        ctx.created.append(card["_id"])
+        ctx.versions[card["_id"]] = card["version"]
+
+    def remember_version(ctx: Context, response) -> None:
+        card = response.json()
+        ctx.versions[card["_id"]] = card["version"]
+
+    def remember_todo(ctx: Context, response) -> None:
+        card_id = response.url.path.split("/")[3]
+        ctx.added_todos.append((card_id, response.json()["todo_id"]))
+
+    def conditional_card(ctx: Context, i: int):
+        card_id = _pick(ctx, list(ctx.etags) or ctx.card_ids, i)
+        return "GET", f"/api/idea-card/{card_id}", {"headers": {"If-None-Match": ctx.etags.get(card_id, "*")}}
+
+    def update_card(ctx: Context, i: int):
+        card_id = _pick(ctx, ctx.created, i)
+        body = {
+            "title": f"压测修改 {i}",
+            "content": f"修改后的内容 {i}",
+            "todos": [],
+            "version": ctx.versions[card_id],
+            "operator": "load-test",
+        }
+        return "PUT", f"/api/idea-card/{card_id}", {"json": body}
+
+    def update_todo(ctx: Context, i: int):
+        card_id, todo_id = _pick(ctx, ctx.todos, i)
+        return "PATCH", f"/api/idea-card/{card_id}/todos/{todo_id}", {"json": {"text": f"压测更新 {i}"}}
+
+    def delete_todo(ctx: Context, i: int):
+        card_id, todo_id = ctx.added_todos[i]
+        return "DELETE", f"/api/idea-card/{card_id}/todos/{todo_id}", {}
+
+    def bulk(ctx: Context, i: int):
+        operations = [
+            {"op": "create", "card": {"title": f"批量 {i}-{j}", "content": "批量创建的卡片"}} for j in range(10)
+        ]
+        return "POST", "/api/idea-cards/bulk", {"json": {"operations": operations}}
+
+    return [
+        Scenario("list_cards", lambda ctx, i: ("GET", "/api/idea-cards", {"params": {"limit": 100}})),
+        Scenario("list_cards_full", lambda ctx, i: (
+            "GET", "/api/idea-cards", {"params": {"limit": 100, "fields": "full"}}
+        )),
+        Scenario("list_deleted", lambda ctx, i: ("GET", "/api/idea-cards/deleted", {"params": {"limit": 100}})),
+        Scenario(
+            "get_card",
+            lambda ctx, i: ("GET", f"/api/idea-card/{_pick(ctx, ctx.card_ids, i)}", {}),
+            after=remember_etag,
+        ),
+        Scenario("get_card_conditional", conditional_card, ok_status=(200, 304)),
+        Scenario("card_history", lambda ctx, i: (
+            "GET", f"/api/idea-card/{_pick(ctx, ctx.card_ids, i)}/history", {"params": {"limit": 50}}
+        )),
+        Scenario("timeline", lambda ctx, i: ("GET", "/api/timeline", {"params": {"limit": 50}})),
+        Scenario("timeline_by_type", lambda ctx, i: (
+            "GET", "/api/timeline", {"params": {"limit": 50, "event_type": ["todo_added", "card_deleted"]}}
+        )),
+        Scenario("activity_stats", lambda ctx, i: (
+            "GET", "/api/stats/activity", {"params": {"from": "2024-01-01", "to": "2024-03-31", "granularity": "week"}}
+        ), mongo_only=True),
+        Scenario("sync", lambda ctx, i: ("GET", "/api/sync", {"params": {"limit": 500}}), mongo_only=True),
+        Scenario("search", lambda ctx, i: (
+            "GET", "/api/search", {"params": {"q": ctx.rng.choice(["想法", "灵感", "ideas", "待办"])}}
+        ), mongo_only=True),
+        Scenario("create_card", lambda ctx, i: (
+            "POST", "/api/idea-card", {"json": {"title": f"压测卡片 {i}", "content": "压测创建的卡片"}}
+        ), after=remember_created),
+        Scenario("update_card", update_card, after=remember_version, limit=lambda ctx: len(ctx.created)),
+        Scenario("add_todo", lambda ctx, i: (
+            "POST", f"/api/idea-card/{_pick(ctx, ctx.card_ids, i)}/todos", {"json": {"text": f"压测待办 {i}"}}
+        ), after=remember_todo, mongo_only=True),
+        Scenario("update_todo", update_todo, limit=lambda ctx: len(ctx.todos), mongo_only=True),
+        Scenario("delete_todo", delete_todo, limit=lambda ctx: len(ctx.added_todos), mongo_only=True),
+        Scenario("bulk_create", bulk, mongo_only=True),
+        Scenario("delete_card", lambda ctx, i: (
+            "PATCH", f"/api/idea-card/{ctx.created[i]}/delete", {}
+        ), limit=lambda ctx: len(ctx.created)),
+        Scenario("recover_card", lambda ctx, i: (
+            "PATCH", f"/api/idea-card/{ctx.created[i]}/recover", {}
+        ), limit=lambda ctx: len(ctx.created)),
+    ]
+
+
+async def run_scenario(client, ctx: Context, scenario: Scenario, requests: int, concurrency: int) -> RouteResult:
+    """以 concurrency 个并发客户端执行 requests 个请求"""
+    if scenario.limit:
+        requests = min(requests, scenario.limit(ctx))
+    counter = itertools.count()
+    latencies: list[float] = []
+    sizes: list[int] = []
+    status: dict[str, int] = {}
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            method, url, kwargs = scenario.build(ctx, i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except Exception as e:
+                errors += 1
+                status[type(e).__name__] = status.get(type(e).__name__, 0) + 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            sizes.append(response.num_bytes_downloaded)
+            status[str(response.status_code)] = status.get(str(response.status_code), 0) + 1
+            if response.status_code not in scenario.ok_status:
+                errors += 1
+            elif scenario.after:
+                scenario.after(ctx, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return RouteResult(
+        requests=requests,
+        errors=errors,
+        p50_ms=round(percentile(ms, 50), 3),
+        p95_ms=round(percentile(ms, 95), 3),
+        p99_ms=round(percentile(ms, 99), 3),
+        mean_ms=round(sum(ms) / len(ms), 3) if ms else 0.0,
+        throughput_rps=round(requests / elapsed, 1) if elapsed else 0.0,
+        avg_bytes=round(sum(sizes) / len(sizes), 1) if sizes else 0.0,
+        peak_rss_mb=round(peak_rss_mb(), 1),
+        status=status,
+    )
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """与基线对比，返回劣化超过阈值的接口说明"""
+    regressions = []
+    print(f"\n{'route':<22} {'p95 base':>10} {'p95 now':>10} {'Δp95':>8} {'rps base':>10} {'rps now':>10} {'Δrps':>8}")
+    for name, now in results["routes"].items():
+        base = baseline.get("routes", {}).get(name)
+        if not base:
+            print(f"{name:<22} {'(new)':>10}")
+            continue
+        d_p95 = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        d_rps = (now["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"] if base["throughput_rps"] else 0.0
+        flag = ""
+        if d_p95 > threshold or d_rps < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{name}: p95 {d_p95:+.0%}, throughput {d_rps:+.0%}")
+        print(
+            f"{name:<22} {base['p95_ms']:>10.2f} {now['p95_ms']:>10.2f} {d_p95:>+8.0%} "
+            f"{base['throughput_rps']:>10.1f} {now['throughput_rps']:>10.1f} {d_rps:>+8.0%}{flag}"
+        )
+    base_rss = baseline.get("peak_rss_mb")
+    if base_rss:
+        d_rss = (results["peak_rss_mb"] - base_rss) / base_rss
+        print(f"peak RSS: {base_rss:.1f} MB -> {results['peak_rss_mb']:.1f} MB ({d_rss:+.0%})")
+        if d_rss > threshold:
+            regressions.append(f"peak RSS {d_rss:+.0%}")
+    return regressions
+
+
+async def open_database(args) -> tuple[Any, Optional[AsyncIOMotorDatabase]]:
+    """连接压测数据库并清空，SQLite 存储返回 (None, None)"""
+    if args.backend == "sqlite":
+        if args.sqlite_path != ":memory:" and os.path.exists(args.sqlite_path):
+            raise SystemExit(f"压测需要新的 SQLite 文件，{args.sqlite_path} 已存在")
+        await configure_repository("sqlite", args.sqlite_path)
+        return None, None
+    if args.backend == "memory":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--backend memory 需要安装 mongomock-motor")
+        client = AsyncMongoMockClient()
+    else:
+        if args.database == settings.database_name:
+            raise SystemExit(f"压测会清空数据库，请勿使用业务库 {settings.database_name}")
+        client = AsyncIOMotorClient(args.mongodb_url)
+        await client.drop_database(args.database)
+    db = client[args.database]
+    await apply_migrations(db)
+    return client, db
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="压测 idea_cards 的全部接口")
+    parser.add_argument("--backend", choices=["mongo", "memory", "sqlite"], default="mongo", help="数据库类型")
+    parser.add_argument("--mongodb-url", default=settings.mongodb_url, help="MongoDB 连接地址")
+    parser.add_argument("--database", default="thoughtflow_bench", help="压测数据库名，运行前会清空")
+    parser.add_argument("--sqlite-path", default=":memory:", help="--backend sqlite 使用的数据库文件")
+    parser.add_argument("--url", default=None, help="请求已运行的服务，例如 http://localhost:8000")
+    parser.add_argument("--cards", type=int, default=1000, help="卡片数量 N")
+    parser.add_argument("--history", type=int, default=5, help="每张卡片的编辑历史条数 M")
+    parser.add_argument("--todos", type=int, default=3, help="每张卡片的待办数量 K")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--requests", type=int, default=200, help="每个接口的请求数")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发客户端数")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=settings.cache_enabled,
+                        help="进程内压测时是否启用读缓存")
+    parser.add_argument("--accept", choices=["json", "msgpack"], default="json",
+                        help="响应格式，msgpack 作用于列表、时间线和编辑历史接口")
+    parser.add_argument("--accept-encoding", default="gzip, br", help="请求头 Accept-Encoding，identity 表示不压缩")
+    parser.add_argument("--routes", nargs="+", default=None, help="只压测指定场景")
+    parser.add_argument("--save", default=None, help="保存结果为 JSON 基线")
+    parser.add_argument("--compare", default=None, help="与 JSON 基线对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定劣化的比例阈值")
+    args = parser.parse_args()
+
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("压测需要安装 httpx")
+    if args.url and args.backend in ("memory", "sqlite"):
+        raise SystemExit(f"{args.backend} 存储只能用于进程内压测")
+
+    dataset = Dataset(cards=args.cards, history=args.history, todos=args.todos, seed=args.seed)
+    client, db = await open_database(args)
+
+    started = time.perf_counter()
+    ctx = await seed(db, dataset, MongoCardRepository(db) if db is not None else get_repository())
+    print(f"Seeded {dataset.cards} cards in {time.perf_counter() - started:.1f}s")
+
+    headers = {"Accept-Encoding": args.accept_encoding}
+    if args.accept == "msgpack":
+        headers["Accept"] = f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9"
+    if args.url:
+        http = httpx.AsyncClient(base_url=args.url, timeout=60, headers=headers)
+    else:
+        from app.main import app
+        database.client, database.db = client, db
+        await configure_cache(db, args.cache, settings.cache_max_entries, settings.cache_ttl_seconds, "local")
+        await configure_events(db, "local", settings.event_queue_size, settings.event_max_subscribers)
+        http = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=60, headers=headers
+        )
+
+    scenarios = [
+        s for s in build_scenarios()
+        if (not args.routes or s.name in args.routes) and (db is not None or not s.mongo_only)
+    ]
+    routes: dict[str, dict] = {}
+    print(f"{'route':<22} {'reqs':>6} {'errs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>9} {'bytes':>10}")
+    try:
+        for scenario in scenarios:
+            result = await run_scenario(http, ctx, scenario, args.requests, args.concurrency)
+            routes[scenario.name] = asdict(result)
+            print(
+                f"{scenario.name:<22} {result.requests:>6} {result.errors:>5} {result.p50_ms:>9.2f} "
+                f"{result.p95_ms:>9.2f} {result.p99_ms:>9.2f} {result.throughput_rps:>9.1f} {result.avg_bytes:>10.0f}"
+            )
+    finally:
+        await http.aclose()
+        if not args.url:
+            await shutdown_events()
+            await shutdown_cache()
+            read_cache.clear()
+        if client is not None:
+            client.close()
+        await close_repository()
+
+    results = {
+        "meta": {
+            "time": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "target": args.url or "in-process",
+            "cache": args.cache,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "accept": args.accept,
+            "accept_encoding": args.accept_encoding,
+            "dataset": asdict(dataset),
+        },
+        "routes": routes,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    print(f"peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("dataset") != results["meta"]["dataset"]:
+            print("warning: 数据集参数与基线不同，对比结果仅供参考")
+        for name in ("accept", "accept_encoding"):
+            if baseline.get("meta", {}).get(name, results["meta"][name]) != results["meta"][name]:
+                print(f"warning: {name} 与基线不同，响应大小与延迟不可直接对比")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+"""
+将卡片内嵌的编辑历史迁移到独立的 card_history 集合
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.migrate_history
+"""
+import asyncio
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.history import backfill_history_versions, migrate_embedded_history
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        migrated = await migrate_embedded_history(db)
+        versioned = await backfill_history_versions(db)
+        print(f"Migrated edit history of {migrated} cards, assigned history versions of {versioned} cards")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+"""
+立即将回收站中超过保留期限的卡片移入归档
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.purge_trash
+    python -m app.scripts.purge_trash --retention-days 7
+
+未指定时使用 TRASH_RETENTION_DAYS 配置。
+"""
+import argparse
+import asyncio
+
+from app.config import get_settings
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.trash import purge_expired_trash
+
+
+async def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="清理回收站")
+    parser.add_argument("--retention-days", type=float, default=settings.trash_retention_days, help="回收站保留天数")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        purged = await purge_expired_trash(get_database(), args.retention_days)
+        print(f"Archived {purged} expired cards")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
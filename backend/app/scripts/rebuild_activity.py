@@ -0,0 +1,29 @@
+"""
+从卡片、编辑历史和时间线事件重新计算活动统计日汇总
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.rebuild_activity
+
+删除与恢复计数取自时间线事件，早期数据须先执行 python -m app.scripts.backfill_timeline。
+"""
+import asyncio
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.activity import rebuild_activity
+from app.services.changes import record_change
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        count = await rebuild_activity(db)
+        # 递增变更序号，使统计接口的 ETag 与各进程的读缓存失效
+        await record_change(db, None)
+        print(f"Rebuilt {count} daily activity rollups")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
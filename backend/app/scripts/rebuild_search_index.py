@@ -0,0 +1,23 @@
+"""
+重建全文检索索引
+
+用法（在 backend 目录下执行）：
+    python -m app.scripts.rebuild_search_index
+"""
+import asyncio
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.search import rebuild_search_index
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        count = await rebuild_search_index(get_database())
+        print(f"Indexed {count} cards")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+"""
+活动统计日汇总
+
+写操作落库后调用 record_activity，以 $inc upsert 累加（UTC 日期，操作人）汇总文档中的计数；
+/api/stats/activity 只读取查询范围内的汇总文档，再按日或按周（周一起始）合并。
+导入数据或修复历史数据后可用 rebuild_activity 从卡片、编辑历史和时间线事件重新计算。
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Literal, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.models.activity import ACTIVITY_COLLECTION_NAME, ACTIVITY_COUNTERS
+from app.models.card_history import HISTORY_ARCHIVE_COLLECTION_NAME, HISTORY_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME
+from app.models.timeline_event import TIMELINE_COLLECTION_NAME
+from app.services.delta import diff_todos
+from app.services.history import unpack_archive
+
+Granularity = Literal["day", "week"]
+
+# 未携带操作人的写操作计入该操作人
+DEFAULT_OPERATOR = "anonymous"
+
+# 汇总条目：(发生时间, 操作人, {计数字段: 增量})
+ActivityEntry = tuple[datetime, str, dict[str, int]]
+
+
+def _day(value: datetime) -> datetime:
+    """所在 UTC 日期的零点"""
+    return datetime(value.year, value.month, value.day)
+
+
+def _rollup_id(day: datetime, operator: str) -> str:
+    return f"{day:%Y-%m-%d}|{operator}"
+
+
+def activity_entry(time: datetime, operator: Optional[str], **counts: int) -> ActivityEntry:
+    """构建一条汇总条目，如 activity_entry(now, None, created=1)"""
+    return time, operator or DEFAULT_OPERATOR, counts
+
+
+def history_activity(history_item: dict) -> ActivityEntry:
+    """一条编辑历史对应的汇总条目：计一次编辑，并按待办事项操作分别计数"""
+    counts = {"edited": 1}
+    todos = (history_item.get("change_content") or {}).get("todos")
+    if todos and "ops" in todos:
+        ops = todos["ops"]
+    elif todos:
+        old_todos = [t for t in todos.get("old", []) if t.get("todo_id")]
+        new_todos = [t for t in todos.get("new", []) if t.get("todo_id")]
+        ops = diff_todos(old_todos, new_todos)
+    else:
+        ops = []
+
+    for op in ops:
+        if op["op"] == "add":
+            counts["todo_added"] = counts.get("todo_added", 0) + 1
+        elif op["op"] == "remove":
+            counts["todo_deleted"] = counts.get("todo_deleted", 0) + 1
+        else:
+            counts["todo_updated"] = counts.get("todo_updated", 0) + 1
+            if op["new"].get("completed") and not op["old"].get("completed"):
+                counts["todo_completed"] = counts.get("todo_completed", 0) + 1
+    return activity_entry(history_item["edit_time"], history_item.get("operator"), **counts)
+
+
+Totals = dict[tuple[datetime, str], dict[str, int]]
+
+
+def _fold(totals: Totals, entry: ActivityEntry) -> None:
+    """将一条汇总条目累加到按（日期，操作人）合并的计数中"""
+    time, operator, counts = entry
+    counters = totals[(_day(time), operator)]
+    for field, amount in counts.items():
+        counters[field] = counters.get(field, 0) + amount
+
+
+def _accumulate(entries: Iterable[ActivityEntry]) -> Totals:
+    """按（日期，操作人）合并汇总条目"""
+    totals: Totals = defaultdict(dict)
+    for entry in entries:
+        _fold(totals, entry)
+    return totals
+
+
+async def record_activity(db: AsyncIOMotorDatabase, entries: list[ActivityEntry]) -> None:
+    """累加汇总计数（须在数据写入之后调用）"""
+    if not entries:
+        return
+    operations = [
+        UpdateOne(
+            {"_id": _rollup_id(day, operator)},
+            {"$inc": counters, "$setOnInsert": {"day": day, "operator": operator}},
+            upsert=True,
+        )
+        for (day, operator), counters in _accumulate(entries).items()
+    ]
+    await db[ACTIVITY_COLLECTION_NAME].bulk_write(operations, ordered=False)
+
+
+async def rebuild_activity(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
+    """
+    从现有数据重新计算全部汇总，返回汇总文档数量
+
+    新建计数取卡片的 create_time，编辑与待办事项计数取编辑历史（含归档和未迁移的内嵌 edit_history），
+    删除与恢复计数取时间线事件（早期数据须先执行 backfill_timeline）。
+    卡片文档和时间线事件不记录操作人，重算后新建、删除、恢复计数均计入 anonymous。
+    计算期间发生的写入可能被覆盖，应在写入较少时执行。
+    条目读取后立即累加，内存占用只与（日期，操作人）的组合数量有关。
+    """
+    totals: Totals = defaultdict(dict)
+    async for card in db[COLLECTION_NAME].find({}, {"create_time": 1, "edit_history": 1}).batch_size(batch_size):
+        if card.get("create_time"):
+            _fold(totals, activity_entry(card["create_time"], None, created=1))
+        for item in card.get("edit_history", []):
+            if item.get("edit_time"):
+                _fold(totals, history_activity(item))
+
+    cursor = db[HISTORY_COLLECTION_NAME].find({}, {"edit_time": 1, "operator": 1, "change_content.todos": 1})
+    async for item in cursor.batch_size(batch_size):
+        _fold(totals, history_activity(item))
+    # 归档中途失败时热数据与归档可能存在同一条记录，逐段查出与热数据重叠的记录并跳过
+    async for chunk in db[HISTORY_ARCHIVE_COLLECTION_NAME].find({}).batch_size(batch_size):
+        items = unpack_archive(chunk)
+        overlap = {
+            doc["_id"] async for doc in db[HISTORY_COLLECTION_NAME].find(
+                {"_id": {"$in": [item["history_id"] for item in items]}}, {"_id": 1}
+            )
+        }
+        for item in items:
+            if item["history_id"] not in overlap:
+                _fold(totals, history_activity(item))
+
+    cursor = db[TIMELINE_COLLECTION_NAME].find(
+        {"event_type": {"$in": ["card_deleted", "card_recovered"]}}, {"event_type": 1, "event_time": 1}
+    )
+    async for event in cursor.batch_size(batch_size):
+        field = "deleted" if event["event_type"] == "card_deleted" else "recovered"
+        _fold(totals, activity_entry(event["event_time"], None, **{field: 1}))
+
+    docs = [
+        {"_id": _rollup_id(day, operator), "day": day, "operator": operator, **counters}
+        for (day, operator), counters in sorted(totals.items())
+    ]
+    await db[ACTIVITY_COLLECTION_NAME].delete_many({})
+    for start in range(0, len(docs), batch_size):
+        await db[ACTIVITY_COLLECTION_NAME].insert_many(docs[start:start + batch_size], ordered=False)
+    return len(docs)
+
+
+def _zero() -> dict[str, int]:
+    return dict.fromkeys(ACTIVITY_COUNTERS, 0)
+
+
+def _add(target: dict[str, int], doc: dict) -> None:
+    for field in ACTIVITY_COUNTERS:
+        target[field] += doc.get(field, 0)
+
+
+def _operator_list(operators: dict[str, dict[str, int]]) -> list[dict]:
+    return [{"operator": name, **counts} for name, counts in sorted(operators.items())]
+
+
+async def query_activity(db: AsyncIOMotorDatabase, start: date, end: date, granularity: Granularity) -> dict:
+    """
+    读取 [start, end] 范围内的汇总，按日或按周合并
+
+    每个周期都会返回（没有活动时计数为 0），按周合并时周期以周一为起始日，
+    首尾两周只统计落在范围内的日期。
+    """
+    step = timedelta(days=1 if granularity == "day" else 7)
+    first = start if granularity == "day" else start - timedelta(days=start.weekday())
+
+    buckets: dict[date, dict] = {}
+    period = first
+    while period <= end:
+        buckets[period] = {"start": period, **_zero(), "operators": {}}
+        period += step
+
+    totals = _zero()
+    operators: dict[str, dict[str, int]] = defaultdict(_zero)
+    cursor = db[ACTIVITY_COLLECTION_NAME].find({
+        "day": {"$gte": datetime.combine(start, datetime.min.time()),
+                "$lt": datetime.combine(end + timedelta(days=1), datetime.min.time())},
+    })
+    async for doc in cursor:
+        day = doc["day"].date()
+        bucket = buckets[first + (day - first) // step * step]
+        operator = doc.get("operator", DEFAULT_OPERATOR)
+        _add(bucket, doc)
+        _add(bucket["operators"].setdefault(operator, _zero()), doc)
+        _add(totals, doc)
+        _add(operators[operator], doc)
+
+    for bucket in buckets.values():
+        bucket["operators"] = _operator_list(bucket["operators"])
+    return {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "buckets": list(buckets.values()),
+        "totals": totals,
+        "operators": _operator_list(operators),
+    }
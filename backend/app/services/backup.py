@@ -0,0 +1,253 @@
+"""
+卡片导出与导入
+
+导出格式为 NDJSON，每行一张卡片：{"card": 卡片文档, "history": [card_history 文档, ...]}，
+使用 MongoDB 扩展 JSON（ObjectId、时间等类型可无损还原），编辑历史保持存储时的增量格式。
+
+导出时卡片按 _id 升序、编辑历史及其归档按 card_id 升序（卡片内按版本号倒序）各用一个游标读取，归并后逐行输出，
+内存占用与卡片总数无关；归档的记录以完整新旧值导出。导入按 _id 覆盖写入，可重复执行，
+覆盖已有卡片时先删除其在本库中的编辑历史及归档。导入的编辑历史全部写入热数据，由后台整理任务重新归档；早期导出的编辑历史没有版本号，导入时按编辑时间顺序补充。
+导入的新卡片及其编辑历史累加到活动统计；覆盖已有卡片时不重复计数。
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from bson import ObjectId, json_util
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import ReplaceOne
+
+from app.models.card_history import HISTORY_ARCHIVE_COLLECTION_NAME, HISTORY_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME, DEFAULT_CARD_STYLE
+from app.schemas.idea_card import IdeaCardSummary
+from app.services.activity import ActivityEntry, activity_entry, history_activity, record_activity
+from app.services.changes import CHANGE_PENDING, record_change
+from app.services.history import legacy_floor, legacy_versions, to_history_doc, unpack_archive
+from app.services.search import index_cards
+from app.services.timeline import upsert_card_events
+
+# 单次读取 / 写入的文档数量
+EXPORT_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 500
+
+# 单行上限，与 MongoDB 文档大小上限一致
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+# 导入结果中最多保留的错误数量
+MAX_REPORTED_ERRORS = 100
+
+
+def encode_line(card: dict, history: list[dict]) -> bytes:
+    """编码一行导出数据"""
+    line = json_util.dumps(
+        {"card": card, "history": history}, json_options=json_util.RELAXED_JSON_OPTIONS, ensure_ascii=False
+    )
+    return line.encode("utf-8") + b"\n"
+
+
+def _validate_card(card: dict) -> None:
+    """按卡片摘要的结构校验导入的卡片，读接口的整形函数依赖这些字段"""
+    try:
+        IdeaCardSummary.model_validate(
+            {**card, "_id": str(card["_id"]), "card_style": card.get("card_style") or DEFAULT_CARD_STYLE},
+            strict=True,
+        )
+    except ValidationError as e:
+        fields = sorted({".".join(str(part) for part in error["loc"]) for error in e.errors()})
+        raise ValueError(f"card 字段不正确：{', '.join(fields)}")
+
+
+def decode_line(line: bytes) -> tuple[dict, list[dict]]:
+    """解码一行导入数据，格式不正确时抛出 ValueError"""
+    try:
+        record = json_util.loads(line)
+    except Exception as e:
+        # 扩展 JSON 中无效的 $oid / $date 等会抛出 InvalidId、IndexError 等非 ValueError 异常
+        raise ValueError(f"无法解析：{e}")
+    if not isinstance(record, dict) or not isinstance(record.get("card"), dict):
+        raise ValueError("缺少 card 字段")
+    card = record["card"]
+    if not isinstance(card.get("_id"), ObjectId):
+        raise ValueError("card._id 不是有效的 ObjectId")
+    _validate_card(card)
+    history = record.get("history") or []
+    if not isinstance(history, list) or not all(
+        isinstance(doc, dict)
+        and doc.get("_id")
+        and isinstance(doc.get("edit_time"), datetime)
+        and isinstance(doc.get("version", 0), int)
+        for doc in history
+    ):
+        raise ValueError("history 格式不正确")
+    # 早期导出的编辑历史没有版本号，按编辑时间顺序补充
+    floor = legacy_floor([doc["version"] for doc in history if "version" in doc], card)
+    versions = legacy_versions({doc["_id"]: doc["edit_time"] for doc in history if "version" not in doc}, floor)
+    # 编辑历史一律归属到所在行的卡片
+    history = [
+        {**doc, "card_id": card["_id"], "version": doc.get("version", versions.get(doc["_id"]))} for doc in history
+    ]
+    return card, history
+
+
+async def export_cards(db: AsyncIOMotorDatabase) -> AsyncIterator[bytes]:
+    """逐行生成全部卡片及其编辑历史"""
+    cards = db[COLLECTION_NAME].find({}).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    histories = (
+        db[HISTORY_COLLECTION_NAME]
+        .find({})
+        .sort([("card_id", 1), ("version", -1), ("_id", -1)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    archives = (
+        db[HISTORY_ARCHIVE_COLLECTION_NAME]
+        .find({})
+        .sort([("card_id", 1), ("newest_version", -1), ("_id", -1)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
+    pending: Optional[dict] = await anext(histories, None)
+    pending_archive: Optional[dict] = await anext(archives, None)
+    async for card in cards:
+        # 跳过没有对应卡片的编辑历史
+        while pending is not None and pending["card_id"] < card["_id"]:
+            pending = await anext(histories, None)
+        while pending_archive is not None and pending_archive["card_id"] < card["_id"]:
+            pending_archive = await anext(archives, None)
+        history = []
+        while pending is not None and pending["card_id"] == card["_id"]:
+            history.append(pending)
+            pending = await anext(histories, None)
+        seen = {doc["_id"] for doc in history}
+        while pending_archive is not None and pending_archive["card_id"] == card["_id"]:
+            for item in unpack_archive(pending_archive):
+                if item["history_id"] not in seen:
+                    seen.add(item["history_id"])
+                    history.append(to_history_doc(card["_id"], item))
+            pending_archive = await anext(archives, None)
+        yield encode_line(card, history)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[Optional[bytes]]:
+    """将流式上传的数据块切分为行，超出 MAX_LINE_BYTES 的行丢弃至下一个换行符，以 None 占位"""
+    buffer = bytearray()
+    skipping = False
+    async for chunk in chunks:
+        if skipping:
+            end = chunk.find(b"\n")
+            if end == -1:
+                continue
+            chunk = chunk[end + 1:]
+            skipping = False
+        # 缓冲区中剩余的部分不含换行符，只需扫描新到达的数据
+        scan = len(buffer)
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", scan)) != -1:
+            yield bytes(buffer[start:end]) if end - start <= MAX_LINE_BYTES else None
+            start = scan = end + 1
+        del buffer[:start]
+        if len(buffer) > MAX_LINE_BYTES:
+            yield None
+            buffer.clear()
+            skipping = True
+    if buffer:
+        yield bytes(buffer)
+
+
+@dataclass
+class ImportResult:
+    """导入统计"""
+    cards: int = 0
+    history: int = 0
+    errors: list[dict] = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "message": message})
+
+
+def _import_activity(card: dict, history: list[dict]) -> list[ActivityEntry]:
+    """新导入卡片的活动统计条目，与 rebuild_activity 的口径一致（删除时间取 update_time，同时间线事件）"""
+    entries = [history_activity(doc) for doc in history]
+    if card.get("create_time"):
+        entries.append(activity_entry(card["create_time"], None, created=1))
+    if card.get("is_deleted") and card.get("update_time"):
+        entries.append(activity_entry(card["update_time"], None, deleted=1))
+    return entries
+
+
+async def _write_batch(db: AsyncIOMotorDatabase, batch: list[tuple[dict, list[dict]]]) -> None:
+    # 导出源的变更序号在本库无意义，置为待写回，导入完成后由 record_change 统一分配
+    cards = [{**card, **CHANGE_PENDING} for card, _ in batch]
+    history = [doc for _, docs in batch for doc in docs]
+    ids = [card["_id"] for card in cards]
+    cursor = db[COLLECTION_NAME].find({"_id": {"$in": ids}}, {"_id": 1})
+    existing = {doc["_id"] async for doc in cursor}
+    # 编辑历史以增量格式从卡片当前值倒推，覆盖卡片时须同时替换其全部编辑历史（含归档），
+    # 否则本库中更新的记录会与导入的卡片内容错位
+    if existing:
+        await db[HISTORY_COLLECTION_NAME].delete_many({"card_id": {"$in": list(existing)}})
+        await db[HISTORY_ARCHIVE_COLLECTION_NAME].delete_many({"card_id": {"$in": list(existing)}})
+    await db[COLLECTION_NAME].bulk_write(
+        [ReplaceOne({"_id": card["_id"]}, card, upsert=True) for card in cards], ordered=False
+    )
+    if history:
+        await db[HISTORY_COLLECTION_NAME].bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in history], ordered=False
+        )
+    # 同步派生数据：全文检索索引、时间线事件与活动统计
+    await index_cards(db, cards)
+    await upsert_card_events(db, cards)
+    await record_activity(db, [
+        entry for card, docs in batch if card["_id"] not in existing for entry in _import_activity(card, docs)
+    ])
+
+
+async def import_cards(
+    db: AsyncIOMotorDatabase, chunks: AsyncIterable[bytes], batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportResult:
+    """
+    从 NDJSON 数据流导入卡片及其编辑历史
+
+    每 batch_size 行写入一次，卡片和编辑历史均按 _id 覆盖写入；
+    格式错误的行记录到结果中并跳过，不影响其他行。
+    写入过数据后（包括中途出错）统一递增变更序号，写回导入卡片的 change_seq 并使读缓存失效。
+    """
+    result = ImportResult()
+    batch: list[tuple[dict, list[dict]]] = []
+    line_no = 0
+    written = False
+
+    async def flush() -> None:
+        nonlocal batch, written
+        written = True
+        await _write_batch(db, batch)
+        result.cards += len(batch)
+        result.history += sum(len(history) for _, history in batch)
+        batch = []
+
+    try:
+        async for line in iter_lines(chunks):
+            line_no += 1
+            if line is None:
+                result.add_error(line_no, "单行数据超出大小上限")
+                continue
+            if not line.strip():
+                continue
+            try:
+                batch.append(decode_line(line))
+            except Exception as e:
+                result.add_error(line_no, str(e))
+                continue
+            if len(batch) >= batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+    finally:
+        if written:
+            await record_change(db, None)
+    return result
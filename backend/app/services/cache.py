@@ -0,0 +1,246 @@
+"""
+进程内读缓存
+
+位于路由与数据库之间的 LRU + TTL 缓存，缓存已构建好的响应对象及其 ETag。
+写操作通过 invalidate_cards 写穿失效：清除涉及卡片的条目以及全部列表类条目，
+并经由失效通道通知其他 worker 进程。
+
+为避免“读到旧数据后晚于失效写入缓存”的竞争，读取前先记录 generation，
+写入缓存时若期间发生过失效则放弃写入。
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Iterable, Optional, Protocol
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+# 集合级条目（列表、时间线）的标签，任意卡片写入都会使其失效
+COLLECTION_TAG = "*"
+
+# 跨进程失效消息使用的 capped 集合
+INVALIDATION_COLLECTION_NAME = "cache_invalidations"
+
+
+@dataclass
+class CacheStats:
+    """缓存计数器"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    tag: str
+    expires_at: float
+
+
+@dataclass
+class ReadCache:
+    """有容量上限的 LRU + TTL 缓存"""
+    max_entries: int = 1024
+    ttl_seconds: float = 30.0
+    enabled: bool = True
+    stats: CacheStats = field(default_factory=CacheStats)
+    generation: int = 0
+
+    def __post_init__(self) -> None:
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._tags: dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回 None"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, tag: str, generation: int) -> None:
+        """
+        写入缓存
+
+        tag 为卡片ID或 COLLECTION_TAG；generation 为读取数据前的 self.generation，
+        期间发生过失效时不写入。
+        """
+        if not self.enabled or generation != self.generation:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, tag, time.monotonic() + self.ttl_seconds)
+        self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def invalidate(self, card_ids: Iterable[str]) -> None:
+        """使指定卡片的条目及全部集合级条目失效"""
+        self.generation += 1
+        for tag in [COLLECTION_TAG, *card_ids]:
+            for key in self._tags.pop(tag, ()):
+                if self._entries.pop(key, None) is not None:
+                    self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self.generation += 1
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        keys = self._tags.get(entry.tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[entry.tag]
+
+
+class InvalidationChannel(Protocol):
+    """跨 worker 的失效通道"""
+
+    async def publish(self, card_ids: Optional[list[str]]) -> None:
+        """通知其他 worker 使这些卡片的缓存失效，card_ids 为 None 表示清空"""
+
+    async def start(self, cache: ReadCache) -> None:
+        """开始接收其他 worker 的失效消息"""
+
+    async def close(self) -> None:
+        """停止接收"""
+
+
+class LocalChannel:
+    """单进程部署使用的空通道"""
+
+    async def publish(self, card_ids: Optional[list[str]]) -> None:
+        return None
+
+    async def start(self, cache: ReadCache) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+class MongoChannel:
+    """
+    基于 MongoDB capped 集合的失效通道
+
+    每个 worker 追加失效消息，并以 tailable cursor 跟踪其他 worker 的消息。
+    跟踪中断后无法确认错过了哪些消息，恢复时清空本地缓存。
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, size_bytes: int = 1 << 20, retry_seconds: float = 1.0):
+        self.db = db
+        self.size_bytes = size_bytes
+        self.retry_seconds = retry_seconds
+        self.worker_id = uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db[INVALIDATION_COLLECTION_NAME]
+
+    async def publish(self, card_ids: Optional[list[str]]) -> None:
+        await self.collection.insert_one({"worker": self.worker_id, "card_ids": card_ids})
+
+    async def start(self, cache: ReadCache) -> None:
+        try:
+            await self.db.create_collection(INVALIDATION_COLLECTION_NAME, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+        self._task = asyncio.create_task(self._follow(cache))
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _follow(self, cache: ReadCache) -> None:
+        last = await self.collection.find_one({}, sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+        while True:
+            try:
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+                cursor = self.collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for message in cursor:
+                        last_id = message["_id"]
+                        if message.get("worker") == self.worker_id:
+                            continue
+                        if message.get("card_ids") is None:
+                            cache.clear()
+                        else:
+                            cache.invalidate(message["card_ids"])
+                    await asyncio.sleep(self.retry_seconds)
+            except PyMongoError as e:
+                print(f"Cache invalidation channel error: {e}")
+                cache.clear()
+            await asyncio.sleep(self.retry_seconds)
+
+
+# 全局缓存与失效通道，启动时由 configure_cache 按配置初始化
+read_cache = ReadCache()
+invalidation_channel: InvalidationChannel = LocalChannel()
+
+
+async def configure_cache(
+    db: AsyncIOMotorDatabase,
+    enabled: bool,
+    max_entries: int,
+    ttl_seconds: float,
+    channel: str,
+) -> None:
+    """按配置初始化缓存并启动失效通道"""
+    global invalidation_channel
+    read_cache.enabled = enabled
+    read_cache.max_entries = max_entries
+    read_cache.ttl_seconds = ttl_seconds
+    read_cache.clear()
+    if enabled and channel == "mongo":
+        invalidation_channel = MongoChannel(db)
+    else:
+        invalidation_channel = LocalChannel()
+    await invalidation_channel.start(read_cache)
+
+
+async def shutdown_cache() -> None:
+    """停止失效通道"""
+    await invalidation_channel.close()
+
+
+async def invalidate_cards(card_ids: Optional[Iterable[str]]) -> None:
+    """写穿失效：清除本地条目并通知其他 worker，card_ids 为 None 时清空全部缓存"""
+    if card_ids is None:
+        read_cache.clear()
+    else:
+        card_ids = [str(card_id) for card_id in card_ids]
+        read_cache.invalidate(card_ids)
+    if read_cache.enabled:
+        await invalidation_channel.publish(card_ids)
@@ -0,0 +1,78 @@
+"""
+卡片数据变更序号
+
+所有卡片写操作在数据落库后调用 record_change：递增集合级的变更序号并写回卡片的 change_seq，
+使读缓存中涉及的条目失效，并向订阅者推送变更。
+列表类接口据变更序号生成 ETag，无需读取集合即可判断数据是否变化；/api/sync 据此返回增量。
+
+写操作在修改卡片的同一次更新中将 change_seq 置为 None（CHANGE_PENDING），落库后再递增序号，
+仅当卡片上的序号为空或更小时写回（等价于 $max，较早的收尾不会覆盖较新的序号）。
+序号总是在数据可见之后分配，因此读取者先读取当前序号 C 再查询时：
+凡是序号不大于 C 的写入都已可见，且要么已写回序号，要么仍为 None（一并返回），不会遗漏。
+"""
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from app.models.idea_card import COLLECTION_NAME
+from app.models.meta import CHANGE_COUNTER_ID, META_COLLECTION_NAME
+from app.services.cache import invalidate_cards
+from app.services.events import RESYNC, event_broker, publishes_locally
+
+# 写操作随数据一起设置，表示变更序号尚未写回
+CHANGE_PENDING = {"change_seq": None}
+
+
+async def bump_change_seq(db: AsyncIOMotorDatabase) -> int:
+    """递增并返回变更序号（须在数据写入之后调用）"""
+    doc = await db[META_COLLECTION_NAME].find_one_and_update(
+        {"_id": CHANGE_COUNTER_ID},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["seq"]
+
+
+async def current_change_seq(db: AsyncIOMotorDatabase) -> int:
+    """读取当前变更序号"""
+    doc = await db[META_COLLECTION_NAME].find_one({"_id": CHANGE_COUNTER_ID})
+    return doc["seq"] if doc else 0
+
+
+async def record_change(db: AsyncIOMotorDatabase, changes: Optional[list[dict]]) -> int:
+    """
+    卡片写入后的统一收尾：递增变更序号、使缓存失效并推送变更，返回新的变更序号
+
+    changes 为 app.services.events.card_change 构建的变更消息；
+    为 None 表示涉及全部卡片（如导入），此时推送 resync。
+    """
+    seq = await bump_change_seq(db)
+    if changes is None:
+        stamp_filter: dict = {"change_seq": {"$exists": True, "$eq": None}}
+    else:
+        stamp_filter = {
+            "_id": {"$in": list({ObjectId(change["card_id"]) for change in changes})},
+            "$or": [{"change_seq": None}, {"change_seq": {"$lt": seq}}],
+        }
+    await db[COLLECTION_NAME].update_many(stamp_filter, {"$set": {"change_seq": seq}})
+    await publish_change(seq, changes)
+    return seq
+
+
+async def publish_change(seq: int, changes: Optional[list[dict]]) -> None:
+    """使缓存失效并推送变更（变更序号写回之后调用），changes 含义同 record_change"""
+    await invalidate_cards(None if changes is None else [change["card_id"] for change in changes])
+    if publishes_locally():
+        for message in changes if changes is not None else [{"type": RESYNC}]:
+            event_broker.publish({**message, "seq": seq})
+
+
+async def backfill_change_seq(db: AsyncIOMotorDatabase) -> int:
+    """为没有 change_seq 字段的旧卡片补充序号 0，使其出现在全量同步中，返回处理的卡片数量"""
+    result = await db[COLLECTION_NAME].update_many(
+        {"change_seq": {"$exists": False}}, {"$set": {"change_seq": 0}}
+    )
+    return result.modified_count
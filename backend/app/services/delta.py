@@ -0,0 +1,173 @@
+"""
+编辑历史增量编码
+
+content 变更保存为文本补丁，todos 变更保存为逐条的增删改操作，不再保存完整的新旧值。
+补丁可由新值反推旧值：读取时以卡片当前内容为基准，从最新一条历史向前逐条还原。
+
+content 补丁：[[0, 相同字符数], [-1, "删除的文本"], [1, "插入的文本"], ...]
+todos 操作：
+  {"op": "add", "index": 新列表中的位置, "todo": {...}}
+  {"op": "remove", "index": 旧列表中的位置, "todo": {...}}
+  {"op": "update", "todo_id": str, "text": 新文本, "old": {变化字段}, "new": {变化字段}}
+
+无法由补丁准确还原的变更（例如仅调整了待办顺序）仍保存完整的新旧值。
+"""
+from difflib import SequenceMatcher
+from typing import Any, Optional
+
+import bson
+
+TEXT_EQUAL = 0
+TEXT_DELETE = -1
+TEXT_INSERT = 1
+
+
+def diff_text(old: str, new: str) -> list[list]:
+    """生成文本补丁"""
+    ops: list[list] = []
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([TEXT_EQUAL, i2 - i1])
+            continue
+        if tag in ("delete", "replace"):
+            ops.append([TEXT_DELETE, old[i1:i2]])
+        if tag in ("insert", "replace"):
+            ops.append([TEXT_INSERT, new[j1:j2]])
+    return ops
+
+
+def revert_text(new: str, ops: list[list]) -> str:
+    """由新文本和补丁还原旧文本"""
+    parts = []
+    pos = 0
+    for op, value in ops:
+        if op == TEXT_EQUAL:
+            parts.append(new[pos:pos + value])
+            pos += value
+        elif op == TEXT_INSERT:
+            pos += len(value)
+        else:
+            parts.append(value)
+    return "".join(parts)
+
+
+def diff_todos(old_todos: list[dict], new_todos: list[dict]) -> list[dict]:
+    """生成待办事项的增删改操作"""
+    old_map = {t["todo_id"]: t for t in old_todos}
+    new_map = {t["todo_id"]: t for t in new_todos}
+    ops: list[dict] = []
+
+    for index, todo in enumerate(old_todos):
+        if todo["todo_id"] not in new_map:
+            ops.append({"op": "remove", "index": index, "todo": todo})
+
+    for index, todo in enumerate(new_todos):
+        old = old_map.get(todo["todo_id"])
+        if old is None:
+            ops.append({"op": "add", "index": index, "todo": todo})
+            continue
+        keys = set(old) | set(todo)
+        changed = sorted(key for key in keys if old.get(key) != todo.get(key))
+        if changed:
+            ops.append({
+                "op": "update",
+                "todo_id": todo["todo_id"],
+                "text": todo.get("text", ""),
+                "old": {key: old[key] for key in changed if key in old},
+                "new": {key: todo[key] for key in changed if key in todo},
+            })
+
+    return ops
+
+
+def revert_todos(new_todos: list[dict], ops: list[dict]) -> list[dict]:
+    """由新待办列表和操作还原旧待办列表"""
+    added = {op["todo"]["todo_id"] for op in ops if op["op"] == "add"}
+    updates = {op["todo_id"]: op for op in ops if op["op"] == "update"}
+
+    todos = []
+    for todo in new_todos:
+        if todo["todo_id"] in added:
+            continue
+        update = updates.get(todo["todo_id"])
+        if update:
+            todo = {k: v for k, v in todo.items() if k not in update["new"]}
+            todo.update(update["old"])
+        todos.append(todo)
+
+    removed = sorted((op for op in ops if op["op"] == "remove"), key=lambda op: op["index"])
+    for op in removed:
+        todos.insert(op["index"], op["todo"])
+    return todos
+
+
+def storage_form(value: Any) -> Any:
+    """返回值写入 MongoDB 后再读出的形式（时间转为 UTC naive 并截断到毫秒）"""
+    return bson.decode(bson.encode({"v": value}))["v"]
+
+
+def compact_change_content(change_content: dict, base: Optional[dict] = None) -> dict:
+    """
+    将完整的新旧值编码为增量格式，无法准确还原或没有收益时保留原值，已是增量格式的变更原样保留
+
+    base 为变更前的卡片文档；提供时，仅当记录的旧值与其一致才编码，保证还原链条连续。
+    """
+    compact = dict(change_content)
+
+    content = change_content.get("content")
+    if content and "patch" not in content and (base is None or content["old"] == base.get("content")):
+        ops = diff_text(content["old"], content["new"])
+        payload = sum(len(value) for op, value in ops if op != TEXT_EQUAL)
+        if payload < len(content["old"]) + len(content["new"]) and revert_text(content["new"], ops) == content["old"]:
+            compact["content"] = {"patch": ops}
+
+    todos = change_content.get("todos")
+    if todos and "ops" not in todos:
+        old = storage_form(todos["old"])
+        new = storage_form(todos["new"])
+        if base is None or old == base.get("todos", []):
+            ops = diff_todos(old, new)
+            if ops and revert_todos(new, ops) == old:
+                compact["todos"] = {"ops": ops}
+
+    return compact
+
+
+def expand_history(history: list[dict], content: str, todos: list[dict]) -> list[dict]:
+    """
+    还原增量编码的编辑历史
+
+    history 须按编辑时间倒序排列，并包含从最新一条开始的全部记录；
+    content / todos 为卡片当前值。返回 change_content 均为完整新旧值的副本。
+    """
+    expanded = []
+    current_content: Optional[str] = content
+    current_todos: Optional[list[dict]] = todos
+
+    for item in history:
+        item = dict(item)
+        cc = dict(item.get("change_content") or {})
+
+        change = cc.get("content")
+        if change:
+            if "patch" in change:
+                old = revert_text(current_content, change["patch"])
+                cc["content"] = {"old": old, "new": current_content}
+                current_content = old
+            else:
+                current_content = change.get("old")
+
+        change = cc.get("todos")
+        if change:
+            if "ops" in change:
+                old = revert_todos(current_todos, change["ops"])
+                cc["todos"] = {"old": old, "new": current_todos}
+                current_todos = old
+            else:
+                current_todos = change.get("old")
+
+        item["change_content"] = cc
+        expanded.append(item)
+
+    return expanded
@@ -0,0 +1,49 @@
+"""
+ETag 与条件请求
+
+单张卡片及其编辑历史的 ETag 由版本号和 update_time 派生（整理过编辑历史的卡片附加已归档条数），
+列表与时间线的 ETag 由集合级变更序号派生。
+"""
+import calendar
+import hashlib
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+
+def _time_key(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    return calendar.timegm(value.utctimetuple()) * 1000 + value.microsecond // 1000
+
+
+def card_etag(card: dict, kind: str = "card") -> str:
+    """单张卡片（或其编辑历史）的强 ETag，card 须包含 _id、version、update_time 与 history_archived"""
+    etag = f'{kind}-{card["_id"]}-{card.get("version", 0)}-{_time_key(card.get("update_time"))}'
+    # 整理编辑历史不修改版本号，但卡片详情中的热数据随之变化
+    if card.get("history_archived"):
+        etag += f'-{card["history_archived"]}'
+    return f'"{etag}"'
+
+
+def seq_etag(kind: str, seq: int, *params: Any) -> str:
+    """基于变更序号的强 ETag，params 为影响结果的查询参数"""
+    digest = hashlib.sha1(repr(params).encode("utf-8")).hexdigest()[:12]
+    return f'"{kind}-{seq}-{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match 是否命中给定的 ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    """304 响应"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,195 @@
+"""
+卡片变更推送
+
+写操作经 app.services.changes.record_change 将变更发布到进程内的 EventBroker，
+/api/events/stream 的每个连接订阅一个有界队列。
+
+消费过慢的连接队列写满后，丢弃其中积压的全部变更并放入一条 resync 消息，
+客户端收到后应重新拉取数据；发布方永不等待消费方。
+
+多 worker 部署时可改用 MongoDB change stream 作为事件源（需要副本集），
+每个 worker 监听 idea_cards 集合的变更并发布到本进程的 EventBroker。
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from app.models.idea_card import COLLECTION_NAME
+
+# 变更类型
+CARD_CREATED = "card_created"
+CARD_UPDATED = "card_updated"
+CARD_DELETED = "card_deleted"
+CARD_RECOVERED = "card_recovered"
+# 回收站中的卡片超过保留期限，已移入归档
+CARD_PURGED = "card_purged"
+TODO_ADDED = "todo_added"
+TODO_UPDATED = "todo_updated"
+TODO_DELETED = "todo_deleted"
+# 客户端需要重新拉取全部数据（导入、消费过慢导致丢弃）
+RESYNC = "resync"
+
+
+def card_change(change_type: str, card_id, **details) -> dict:
+    """构建一条卡片变更消息"""
+    return {"type": change_type, "card_id": str(card_id), **details}
+
+
+@dataclass
+class BrokerStats:
+    """推送计数器"""
+    published: int = 0
+    delivered: int = 0
+    dropped: int = 0
+    resyncs: int = 0
+
+
+class Subscription:
+    """单个订阅者的有界队列"""
+
+    def __init__(self, broker: "EventBroker", maxsize: int):
+        self.broker = broker
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, message: dict) -> None:
+        """非阻塞投递，队列已满时丢弃积压并改为投递 resync"""
+        try:
+            self.queue.put_nowait(message)
+            self.broker.stats.delivered += 1
+            return
+        except asyncio.QueueFull:
+            pass
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.broker.stats.dropped += 1
+        self.broker.stats.dropped += 1
+        self.broker.stats.resyncs += 1
+        self.queue.put_nowait({"type": RESYNC, "seq": message.get("seq")})
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """等待下一条消息，超时返回 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.subscribers.discard(self)
+
+
+class TooManySubscribers(Exception):
+    """订阅者数量已达上限"""
+
+
+class EventBroker:
+    """进程内发布 / 订阅"""
+
+    def __init__(self, queue_size: int = 256, max_subscribers: int = 1000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: set[Subscription] = set()
+        self.stats = BrokerStats()
+
+    def subscribe(self) -> Subscription:
+        if len(self.subscribers) >= self.max_subscribers:
+            raise TooManySubscribers()
+        subscription = Subscription(self, self.queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def publish(self, message: dict) -> None:
+        self.stats.published += 1
+        for subscription in list(self.subscribers):
+            subscription.offer(message)
+
+
+class ChangeStreamSource:
+    """
+    以 MongoDB change stream 作为事件源
+
+    change stream 只能看到文档层面的变化，待办事项的增删改统一报告为 card_updated。
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, broker: EventBroker, retry_seconds: float = 1.0):
+        self.db = db
+        self.broker = broker
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._watch())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def to_message(change: dict) -> Optional[dict]:
+        """将 change stream 事件转换为变更消息"""
+        card_id = change.get("documentKey", {}).get("_id")
+        operation = change.get("operationType")
+        if operation == "insert":
+            return card_change(CARD_CREATED, card_id)
+        if operation in ("update", "replace"):
+            description = change.get("updateDescription", {})
+            fields = description.get("updatedFields", {})
+            # record_change 写回变更序号的更新紧随数据写入之后，数据写入已发布过消息
+            if operation == "update" and set(fields) == {"change_seq"} and not description.get("removedFields"):
+                return None
+            if "is_deleted" in fields:
+                return card_change(CARD_DELETED if fields["is_deleted"] else CARD_RECOVERED, card_id)
+            return card_change(CARD_UPDATED, card_id)
+        return None
+
+    async def _watch(self) -> None:
+        resume_token = None
+        while True:
+            try:
+                async with self.db[COLLECTION_NAME].watch(resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        message = self.to_message(change)
+                        if message:
+                            self.broker.publish(message)
+            except PyMongoError as e:
+                print(f"Change stream error: {e}")
+                # 无法续接时通知客户端重新拉取
+                resume_token = None
+                self.broker.publish({"type": RESYNC})
+            await asyncio.sleep(self.retry_seconds)
+
+
+# 全局事件代理，启动时由 configure_events 按配置初始化
+event_broker = EventBroker()
+change_stream_source: Optional[ChangeStreamSource] = None
+
+
+def publishes_locally() -> bool:
+    """写操作是否直接发布到本进程（使用 change stream 时由其统一发布）"""
+    return change_stream_source is None
+
+
+async def configure_events(db: AsyncIOMotorDatabase, source: str, queue_size: int, max_subscribers: int) -> None:
+    """按配置初始化事件代理与事件源"""
+    global change_stream_source
+    event_broker.queue_size = queue_size
+    event_broker.max_subscribers = max_subscribers
+    if source == "change_stream":
+        change_stream_source = ChangeStreamSource(db, event_broker)
+        change_stream_source.start()
+
+
+async def shutdown_events() -> None:
+    """停止事件源"""
+    global change_stream_source
+    if change_stream_source:
+        await change_stream_source.close()
+        change_stream_source = None
@@ -0,0 +1,450 @@
+"""
+卡片编辑历史存储
+
+编辑历史保存在独立的 card_history 集合中，按 (card_id, version, _id) 建立索引，
+分页读取时由数据库完成排序，卡片文档的大小不再随编辑次数增长。
+content / todos 的变更以增量格式写入，读取时以卡片当前值为基准还原完整新旧值。
+
+每条记录保存该次修改后的卡片版本号，由卡片的原子更新分配，同一张卡片内唯一且与提交顺序一致；
+编辑时间在写入前取得，并发写入时可能与提交顺序不一致，因此排序与还原均以版本号为准。
+
+较早的记录由 compact_card_history 还原为完整新旧值后压缩移入归档集合，
+分页读取在热数据读完后继续读取归档，调用方无需区分。
+"""
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from uuid import uuid4
+
+import bson
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne, UpdateOne
+
+from app.models.card_history import HISTORY_ARCHIVE_COLLECTION_NAME, HISTORY_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME, DEFAULT_CARD_STYLE
+from app.services.cache import invalidate_cards
+from app.services.changes import bump_change_seq
+from app.services.delta import compact_change_content, expand_history
+from app.services.pagination import keyset_filter
+
+
+# 单个归档文档最多包含的记录数量与压缩前的字节数
+ARCHIVE_CHUNK_ENTRIES = 200
+ARCHIVE_CHUNK_BYTES = 4 * 1024 * 1024
+
+# 最近有写入的卡片暂不整理，避免与进行中的写操作交错
+COMPACTION_QUIET_SECONDS = 300
+
+# 编辑历史的排序：版本号倒序（最新的修改在前）
+NEWEST_FIRST = [("version", -1), ("_id", -1)]
+
+# 记录编辑历史的卡片字段及其缺省值
+TRACKED_FIELDS = {
+    "title": "",
+    "content": "",
+    "card_style": DEFAULT_CARD_STYLE,
+    "todos": [],
+}
+
+
+def diff_card(existing: dict, values: dict) -> dict:
+    """对比卡片当前文档与新值，返回变更内容 {field: {old, new}}，无变化时为空"""
+    change_content = {}
+    for field, default in TRACKED_FIELDS.items():
+        if field not in values:
+            continue
+        old = existing.get(field)
+        if old is None:
+            old = default
+        if old != values[field]:
+            change_content[field] = {"old": old, "new": values[field]}
+    return change_content
+
+
+def build_history_item(
+    change_content: dict, edit_time: datetime, version: int, operator: str, edit_note: Optional[str]
+) -> dict:
+    """构建编辑历史记录项，version 为该次修改后的卡片版本号（取自原子更新的结果）"""
+    return {
+        "history_id": str(uuid4()),
+        "edit_time": edit_time,
+        "version": version,
+        "operator": operator or "anonymous",
+        "change_content": change_content,
+        "edit_note": edit_note,
+    }
+
+
+def is_delta(item: dict) -> bool:
+    """编辑历史记录项是否包含增量编码的变更"""
+    cc = item.get("change_content") or {}
+    return "patch" in (cc.get("content") or {}) or "ops" in (cc.get("todos") or {})
+
+
+def to_history_doc(card_id: ObjectId, history_item: dict) -> dict:
+    """将编辑历史记录项转换为 card_history 文档"""
+    doc = {k: v for k, v in history_item.items() if k != "history_id"}
+    doc["_id"] = history_item["history_id"]
+    doc["card_id"] = card_id
+    return doc
+
+
+def from_history_doc(doc: dict) -> dict:
+    """将 card_history 文档还原为编辑历史记录项"""
+    item = {k: v for k, v in doc.items() if k not in ("_id", "card_id")}
+    item["history_id"] = doc["_id"]
+    return item
+
+
+async def record_history(
+    db: AsyncIOMotorDatabase, card_id: ObjectId, history_item: dict, base: Optional[dict] = None
+) -> None:
+    """追加一条编辑历史（content / todos 以增量格式保存），base 为变更前的卡片文档"""
+    item = dict(history_item)
+    item["change_content"] = compact_change_content(history_item["change_content"], base)
+    await db[HISTORY_COLLECTION_NAME].insert_one(to_history_doc(card_id, item))
+
+
+async def record_histories(db: AsyncIOMotorDatabase, entries: list[tuple[ObjectId, dict, dict]]) -> None:
+    """批量追加编辑历史，entries 为 (卡片ID, 编辑历史记录项, 变更前的卡片文档)"""
+    docs = []
+    for card_id, history_item, base in entries:
+        item = dict(history_item)
+        item["change_content"] = compact_change_content(history_item["change_content"], base)
+        docs.append(to_history_doc(card_id, item))
+    if docs:
+        await db[HISTORY_COLLECTION_NAME].insert_many(docs, ordered=False)
+
+
+async def find_history_page(
+    db: AsyncIOMotorDatabase,
+    card: dict,
+    limit: int,
+    before: Optional[tuple[Any, Any]] = None,
+) -> list[dict]:
+    """
+    按版本号倒序分页读取编辑历史，before 为上一页最后一条的 (version, history_id)
+
+    card 须包含 content 与 todos，用于还原增量编码的记录。
+    """
+    query: dict = {"card_id": card["_id"]}
+    if before:
+        query.update(keyset_filter("version", *before))
+    cursor = db[HISTORY_COLLECTION_NAME].find(query).sort(NEWEST_FIRST).limit(limit)
+    items = [from_history_doc(doc) async for doc in cursor]
+    # 热数据不足一页时继续读取归档（归档总是早于热数据）
+    if len(items) < limit:
+        last = (items[-1]["version"], items[-1]["history_id"]) if items else before
+        items += await find_archived_history(db, card["_id"], limit - len(items), last)
+    if not any(is_delta(item) for item in items):
+        return items
+
+    # 还原需要从最新一条开始，补读当前页之前的记录（只取变更字段）
+    newer: list[dict] = []
+    if before and items:
+        newer_query = {"card_id": card["_id"]}
+        newer_query.update(keyset_filter("version", items[0]["version"], items[0]["history_id"], "$gt"))
+        newer_cursor = (
+            db[HISTORY_COLLECTION_NAME]
+            .find(newer_query, {"version": 1, "change_content.content": 1, "change_content.todos": 1})
+            .sort(NEWEST_FIRST)
+        )
+        newer = [from_history_doc(doc) async for doc in newer_cursor]
+
+    expanded = expand_history(newer + items, card.get("content", ""), card.get("todos", []))
+    return expanded[len(newer):]
+
+
+async def newest_history_version(db: AsyncIOMotorDatabase, card_id: ObjectId) -> Optional[int]:
+    """卡片最新一条编辑历史的版本号（热数据为空时读取归档），没有历史时返回 None"""
+    newest = await db[HISTORY_COLLECTION_NAME].find_one({"card_id": card_id}, {"version": 1}, sort=NEWEST_FIRST)
+    if newest is not None:
+        return newest["version"]
+    chunk = await db[HISTORY_ARCHIVE_COLLECTION_NAME].find_one(
+        {"card_id": card_id}, {"newest_version": 1}, sort=[("newest_version", -1)]
+    )
+    return chunk["newest_version"] if chunk is not None else None
+
+
+async def load_histories(
+    db: AsyncIOMotorDatabase, cards: list[dict], include_archived: bool = False
+) -> dict[ObjectId, list[dict]]:
+    """
+    批量读取多张卡片的编辑历史，按版本号正序排列
+
+    cards 须包含 _id、content 与 todos，用于还原增量编码的记录。
+    默认只读取热数据，include_archived 为 True 时包含归档的记录。
+    """
+    latest_first: dict[ObjectId, list[dict]] = {card["_id"]: [] for card in cards}
+    if not cards:
+        return latest_first
+    cursor = db[HISTORY_COLLECTION_NAME].find({"card_id": {"$in": list(latest_first)}}).sort(NEWEST_FIRST)
+    async for doc in cursor:
+        latest_first[doc["card_id"]].append(from_history_doc(doc))
+
+    if include_archived:
+        seen = {item["history_id"] for items in latest_first.values() for item in items}
+        cursor = (
+            db[HISTORY_ARCHIVE_COLLECTION_NAME]
+            .find({"card_id": {"$in": list(latest_first)}})
+            .sort([("card_id", 1), ("newest_version", -1), ("_id", -1)])
+        )
+        async for chunk in cursor:
+            for item in unpack_archive(chunk):
+                if item["history_id"] not in seen:
+                    seen.add(item["history_id"])
+                    latest_first[chunk["card_id"]].append(item)
+
+    histories = {}
+    for card in cards:
+        items = expand_history(latest_first[card["_id"]], card.get("content", ""), card.get("todos", []))
+        histories[card["_id"]] = items[::-1]
+    return histories
+
+
+async def migrate_embedded_history(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    将卡片文档内嵌的 edit_history 迁移到 card_history 集合
+
+    历史记录按 history_id 幂等写入，迁移完成后移除内嵌数组并按实际条数修正 edit_count。
+    迁移的记录没有版本号，需再执行 backfill_history_versions。返回迁移的卡片数量。
+    """
+    migrated = 0
+    cursor = db[COLLECTION_NAME].find(
+        {"edit_history.0": {"$exists": True}},
+        {"edit_history": 1},
+    )
+    async for card in cursor:
+        operations = [
+            UpdateOne(
+                {"_id": item["history_id"]},
+                {"$setOnInsert": {k: v for k, v in to_history_doc(card["_id"], item).items() if k != "_id"}},
+                upsert=True,
+            )
+            for item in card["edit_history"]
+            if item.get("history_id")
+        ]
+        for start in range(0, len(operations), batch_size):
+            await db[HISTORY_COLLECTION_NAME].bulk_write(operations[start:start + batch_size], ordered=False)
+
+        edit_count = await db[HISTORY_COLLECTION_NAME].count_documents({"card_id": card["_id"]})
+        await db[COLLECTION_NAME].update_one(
+            {"_id": card["_id"]},
+            {"$set": {"edit_count": edit_count}, "$unset": {"edit_history": ""}},
+        )
+        migrated += 1
+
+    return migrated
+
+
+def legacy_versions(edit_times: dict[str, datetime], floor: int) -> dict[str, int]:
+    """
+    为没有版本号的记录编号：这些记录早于带版本号的记录，按编辑时间倒序从 floor - 1 向下编号
+
+    edit_times 为 {history_id: edit_time}，floor 为该卡片已有记录的最小版本号，结果可能为负数，只用于排序。
+    卡片没有带版本号的记录时 floor 取卡片当前版本号加一（见 legacy_floor），使最新一条与卡片版本一致。
+    """
+    ordered = sorted(edit_times, key=lambda history_id: (edit_times[history_id], history_id), reverse=True)
+    return {history_id: floor - 1 - i for i, history_id in enumerate(ordered)}
+
+
+def legacy_floor(versions: list[int], card: Optional[dict]) -> int:
+    """legacy_versions 的 floor：已有记录的最小版本号，没有时为卡片当前版本号加一"""
+    if versions:
+        return min(versions)
+    return (card or {}).get("version", 0) + 1
+
+
+async def backfill_history_versions(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    为没有版本号的编辑历史（早于版本号排序的记录与归档）补充版本号，编号规则见 legacy_versions
+
+    可重复执行，返回处理的卡片数量。
+    """
+    pending = set(await db[HISTORY_COLLECTION_NAME].distinct("card_id", {"version": {"$exists": False}}))
+    pending |= set(
+        await db[HISTORY_ARCHIVE_COLLECTION_NAME].distinct("card_id", {"newest_version": {"$exists": False}})
+    )
+
+    for card_id in pending:
+        versions = []
+        lowest = await db[HISTORY_COLLECTION_NAME].find_one(
+            {"card_id": card_id, "version": {"$exists": True}}, {"version": 1}, sort=[("version", 1)]
+        )
+        if lowest is not None:
+            versions.append(lowest["version"])
+        async for chunk in db[HISTORY_ARCHIVE_COLLECTION_NAME].find(
+            {"card_id": card_id, "oldest_version": {"$exists": True}}, {"oldest_version": 1}
+        ):
+            versions.append(chunk["oldest_version"])
+        card = await db[COLLECTION_NAME].find_one({"_id": card_id}, {"version": 1})
+        floor = legacy_floor(versions, card)
+
+        # 中途失败的整理可能使同一条记录同时存在于热数据和归档中，按 history_id 统一编号
+        edit_times: dict[str, datetime] = {}
+        async for doc in db[HISTORY_COLLECTION_NAME].find(
+            {"card_id": card_id, "version": {"$exists": False}}, {"edit_time": 1}
+        ):
+            edit_times[doc["_id"]] = doc["edit_time"]
+        chunks = [
+            chunk async for chunk in db[HISTORY_ARCHIVE_COLLECTION_NAME].find(
+                {"card_id": card_id, "newest_version": {"$exists": False}}
+            )
+        ]
+        for chunk in chunks:
+            for item in unpack_archive(chunk):
+                edit_times.setdefault(item["history_id"], item["edit_time"])
+        versions = legacy_versions(edit_times, floor)
+
+        operations = [
+            UpdateOne({"_id": history_id, "version": {"$exists": False}}, {"$set": {"version": version}})
+            for history_id, version in versions.items()
+        ]
+        for start in range(0, len(operations), batch_size):
+            await db[HISTORY_COLLECTION_NAME].bulk_write(operations[start:start + batch_size], ordered=False)
+        for chunk in chunks:
+            items = [{**item, "version": versions[item["history_id"]]} for item in unpack_archive(chunk)]
+            items.sort(key=lambda item: (item["version"], item["history_id"]), reverse=True)
+            await db[HISTORY_ARCHIVE_COLLECTION_NAME].replace_one(
+                {"_id": chunk["_id"]}, {**pack_archive(card_id, items), "_id": chunk["_id"]}
+            )
+
+    return len(pending)
+
+
+def pack_archive(card_id: ObjectId, items: list[dict]) -> dict:
+    """将一段按版本号倒序排列、已还原为完整新旧值的记录项打包为归档文档"""
+    return {
+        "_id": f"{card_id}:{items[0]['history_id']}",
+        "card_id": card_id,
+        "newest_version": items[0]["version"],
+        "oldest_version": items[-1]["version"],
+        "newest_time": items[0]["edit_time"],
+        "oldest_time": items[-1]["edit_time"],
+        "count": len(items),
+        "data": Binary(zlib.compress(bson.encode({"items": items}))),
+    }
+
+
+def unpack_archive(chunk: dict) -> list[dict]:
+    """解压归档文档中的记录项，按版本号倒序排列"""
+    return bson.decode(zlib.decompress(chunk["data"]))["items"]
+
+
+def _archive_chunks(card_id: ObjectId, items: list[dict]) -> list[dict]:
+    """按条数和压缩前大小切分归档文档"""
+    chunks = []
+    current: list[dict] = []
+    size = 0
+    for item in items:
+        item_size = len(bson.encode(item))
+        if current and (len(current) >= ARCHIVE_CHUNK_ENTRIES or size + item_size > ARCHIVE_CHUNK_BYTES):
+            chunks.append(pack_archive(card_id, current))
+            current, size = [], 0
+        current.append(item)
+        size += item_size
+    if current:
+        chunks.append(pack_archive(card_id, current))
+    return chunks
+
+
+async def find_archived_history(
+    db: AsyncIOMotorDatabase,
+    card_id: ObjectId,
+    limit: int,
+    before: Optional[tuple[Any, Any]] = None,
+) -> list[dict]:
+    """按版本号倒序读取归档的记录项，before 为上一条的 (version, history_id)"""
+    query: dict = {"card_id": card_id}
+    if before:
+        query["oldest_version"] = {"$lte": before[0]}
+    cursor = (
+        db[HISTORY_ARCHIVE_COLLECTION_NAME]
+        .find(query)
+        .sort([("newest_version", -1), ("_id", -1)])
+    )
+    items: list[dict] = []
+    seen: set[str] = set()
+    async for chunk in cursor:
+        for item in unpack_archive(chunk):
+            if before and (item["version"], item["history_id"]) >= tuple(before):
+                continue
+            if item["history_id"] in seen:
+                continue
+            seen.add(item["history_id"])
+            items.append(item)
+            if len(items) >= limit:
+                return items
+    return items
+
+
+async def compact_card_history(
+    db: AsyncIOMotorDatabase, card_id: ObjectId, keep_entries: int, keep_days: float, now: datetime
+) -> int:
+    """
+    将一张卡片超出保留策略的编辑历史移入归档，返回归档的记录数量
+
+    最新 keep_entries 条和最近 keep_days 天内的记录保留在热数据中，其余记录还原为完整新旧值后压缩归档。
+    读取期间卡片发生写入时放弃本次整理，留待下一轮。
+    卡片详情只包含热数据，整理后累加卡片的 history_archived 使其 ETag 变化，并使读缓存失效。
+    """
+    quiet_before = now - timedelta(seconds=COMPACTION_QUIET_SECONDS)
+    card = await db[COLLECTION_NAME].find_one(
+        {"_id": card_id, "update_time": {"$lt": quiet_before}}, {"content": 1, "todos": 1, "version": 1}
+    )
+    if card is None:
+        return 0
+
+    cutoff = now - timedelta(days=keep_days)
+    cursor = db[HISTORY_COLLECTION_NAME].find({"card_id": card_id}).sort(NEWEST_FIRST)
+    items = [from_history_doc(doc) async for doc in cursor]
+    start = next(
+        (i for i in range(keep_entries, len(items)) if items[i]["edit_time"] < cutoff),
+        len(items),
+    )
+    if start == len(items):
+        return 0
+
+    stamp = await db[COLLECTION_NAME].find_one({"_id": card_id}, {"version": 1})
+    if stamp is None or stamp.get("version") != card.get("version"):
+        return 0
+
+    archived = expand_history(items, card.get("content", ""), card.get("todos", []))[start:]
+    # 先写归档再删除热数据；中途失败时两处可能同时存在，读取时按 history_id 去重
+    await db[HISTORY_ARCHIVE_COLLECTION_NAME].bulk_write(
+        [ReplaceOne({"_id": chunk["_id"]}, chunk, upsert=True) for chunk in _archive_chunks(card_id, archived)],
+        ordered=False,
+    )
+    await db[HISTORY_COLLECTION_NAME].delete_many({"_id": {"$in": [item["history_id"] for item in archived]}})
+    await db[COLLECTION_NAME].update_one({"_id": card_id}, {"$inc": {"history_archived": len(archived)}})
+    await invalidate_cards([str(card_id)])
+    return len(archived)
+
+
+async def compact_histories(
+    db: AsyncIOMotorDatabase, keep_entries: int, keep_days: float, now: Optional[datetime] = None
+) -> tuple[int, int]:
+    """按保留策略整理全部卡片的编辑历史，返回 (整理的卡片数量, 归档的记录数量)"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=keep_days)
+    # 只有存在早于保留期限的记录、且总条数超过 keep_entries 的卡片需要整理
+    pipeline = [
+        {"$match": {"edit_time": {"$lt": cutoff}}},
+        {"$group": {"_id": "$card_id"}},
+    ]
+    candidates = [doc["_id"] async for doc in db[HISTORY_COLLECTION_NAME].aggregate(pipeline, allowDiskUse=True)]
+
+    cards = 0
+    entries = 0
+    for card_id in candidates:
+        if await db[HISTORY_COLLECTION_NAME].count_documents({"card_id": card_id}) <= keep_entries:
+            continue
+        archived = await compact_card_history(db, card_id, keep_entries, keep_days, now)
+        if archived:
+            cards += 1
+            entries += archived
+    if cards:
+        # fields=full 的列表包含热数据，递增变更序号使其 ETag 变化
+        await bump_change_seq(db)
+    return cards, entries
@@ -0,0 +1,320 @@
+"""
+运行指标
+
+以 Prometheus 文本格式（0.0.4）暴露于 /metrics：
+- http_*：MetricsMiddleware 按路由模板记录的请求数、延迟和请求 / 响应大小
+- mongodb_command_*：注册到 AsyncIOMotorClient 的 CommandListener 按命令和集合记录的耗时
+- mongodb_pool_*：ConnectionPoolListener 维护的连接池连接数
+
+Motor 在线程池中执行 pymongo 操作，监听器回调发生在工作线程，各指标内部加锁。
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Iterable
+
+from pymongo import monitoring
+
+# 延迟分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# 大小分桶（字节）
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 未匹配到路由的请求统一归入该标签，避免任意路径造成标签基数膨胀
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def remove(self, *labels) -> None:
+        with self._lock:
+            self._values.pop(labels, None)
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """分桶直方图，输出累计桶计数、总和与总数"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., +Inf 桶计数, 总和]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, *labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        lines = self._header()
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), state[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# HTTP 指标
+http_requests = Counter("http_requests_total", "HTTP requests by route, method and status", ("method", "route", "status"))
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent", ("method", "route")
+)
+http_request_size = Histogram(
+    "http_request_size_bytes", "HTTP request body size", ("method", "route"), buckets=SIZE_BUCKETS
+)
+http_response_size = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ("method", "route"), buckets=SIZE_BUCKETS
+)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+# MongoDB 指标
+mongo_commands = Counter(
+    "mongodb_commands_total", "MongoDB commands by name, collection and outcome", ("command", "collection", "outcome")
+)
+mongo_latency = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency reported by the driver",
+    ("command", "collection"), buckets=COMMAND_BUCKETS,
+)
+mongo_pool_connections = Gauge("mongodb_pool_connections", "Open connections in the pool", ("address",))
+mongo_pool_checked_out = Gauge("mongodb_pool_checked_out", "Connections currently checked out", ("address",))
+mongo_pool_checkout_failures = Counter(
+    "mongodb_pool_checkout_failures_total", "Failed connection checkouts", ("address", "reason")
+)
+
+REGISTRY: list[_Metric] = [
+    http_requests,
+    http_latency,
+    http_request_size,
+    http_response_size,
+    http_in_flight,
+    mongo_commands,
+    mongo_latency,
+    mongo_pool_connections,
+    mongo_pool_checked_out,
+    mongo_pool_checkout_failures,
+]
+
+
+def render_metrics() -> str:
+    """以 Prometheus 文本格式输出全部指标"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    记录每个请求的路由、状态码、延迟和请求 / 响应大小
+
+    使用纯 ASGI 中间件，按实际发送的字节计数，流式响应（导出、SSE）同样适用；
+    路由标签取 FastAPI 匹配到的路径模板（如 /api/idea-card/{card_id}）。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            http_in_flight.inc(amount=-1)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            http_requests.inc(method, path, str(status_code))
+            http_latency.observe(method, path, value=time.perf_counter() - start)
+            http_request_size.observe(method, path, value=request_bytes)
+            http_response_size.observe(method, path, value=response_bytes)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """按命令名和集合记录 MongoDB 命令耗时"""
+
+    def __init__(self):
+        self._collections: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return event.connection_id, event.request_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        # 多数命令的第一个字段值即集合名，如 {"find": "idea_cards", ...}
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else ""
+        with self._lock:
+            self._collections[self._key(event)] = collection
+
+    def _finish(self, event, outcome: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(self._key(event), "")
+        mongo_commands.inc(event.command_name, collection, outcome)
+        mongo_latency.observe(event.command_name, collection, value=event.duration_micros / 1_000_000)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "failure")
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """维护各服务器连接池的连接数与借出数"""
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event) -> None:
+        mongo_pool_connections.set(self._address(event), value=0)
+        mongo_pool_checked_out.set(self._address(event), value=0)
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        mongo_pool_connections.remove(self._address(event))
+        mongo_pool_checked_out.remove(self._address(event))
+
+    def connection_created(self, event) -> None:
+        mongo_pool_connections.inc(self._address(event))
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        mongo_pool_connections.inc(self._address(event), amount=-1)
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        mongo_pool_checkout_failures.inc(self._address(event), str(event.reason))
+
+    def connection_checked_out(self, event) -> None:
+        mongo_pool_checked_out.inc(self._address(event))
+
+    def connection_checked_in(self, event) -> None:
+        mongo_pool_checked_out.inc(self._address(event), amount=-1)
+
+
+def mongo_event_listeners(enabled: bool) -> list:
+    """创建 MongoDB 客户端时注册的监听器"""
+    if not enabled:
+        return []
+    return [CommandMetrics(), PoolMetrics()]
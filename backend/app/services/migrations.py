@@ -0,0 +1,178 @@
+"""
+数据库结构迁移的执行与校验
+
+- apply_migrations：按版本顺序执行未执行的迁移，每个迁移完成后立即记录版本，中途失败可重新执行
+- check_schema_version：API 服务启动时校验数据库版本不低于代码要求的版本
+- explain_checks：对迁移声明的热点查询执行 explain，确认使用索引而不是 COLLSCAN
+
+迁移期间持有 meta 集合中的 migrate 租约，多个部署同时执行时只有一个生效。
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
+
+from app.migrations import MIGRATIONS, SCHEMA_VERSION, Migration, QueryCheck
+from app.models.meta import META_COLLECTION_NAME, SCHEMA_VERSION_ID
+from app.services.retention import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+# 迁移租约时长（秒），回填大量数据时进程异常退出后最多等待这么久才能重新执行
+MIGRATION_LEASE_SECONDS = 3600
+
+# 删除不存在的索引时 MongoDB 返回的错误码
+INDEX_NOT_FOUND = 27
+
+
+class SchemaVersionError(Exception):
+    """数据库结构版本与代码不一致，或迁移无法执行"""
+
+
+@dataclass
+class PlanReport:
+    """一个热点查询的执行计划检查结果"""
+    migration: int
+    check: str
+    collection: str
+    stages: list[str]
+    indexes: list[str]
+    ok: bool
+
+
+async def current_schema_version(db: AsyncIOMotorDatabase) -> int:
+    """读取数据库结构版本，从未执行迁移时为 0"""
+    doc = await db[META_COLLECTION_NAME].find_one({"_id": SCHEMA_VERSION_ID})
+    return doc["version"] if doc else 0
+
+
+async def check_schema_version(db: AsyncIOMotorDatabase) -> int:
+    """启动时校验数据库结构版本，低于代码要求时抛出 SchemaVersionError"""
+    version = await current_schema_version(db)
+    if version < SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"数据库结构版本为 {version}，当前代码要求 {SCHEMA_VERSION}，请先执行 python -m app.migrate up"
+        )
+    if version > SCHEMA_VERSION:
+        # 回滚代码时数据库版本可能更高，迁移只增加索引或回填数据，旧代码仍可运行
+        logger.warning("数据库结构版本 %s 高于当前代码要求的 %s", version, SCHEMA_VERSION)
+    return version
+
+
+def pending_migrations(version: int, target: Optional[int] = None) -> list[Migration]:
+    """版本高于 version 且不超过 target 的迁移"""
+    target = SCHEMA_VERSION if target is None else target
+    return [m for m in MIGRATIONS if version < m.version <= target]
+
+
+async def _drop_index(db: AsyncIOMotorDatabase, collection: str, name: str) -> None:
+    try:
+        await db[collection].drop_index(name)
+    except OperationFailure as exc:
+        if exc.code != INDEX_NOT_FOUND and "not found" not in str(exc):
+            raise
+
+
+async def run_migration(db: AsyncIOMotorDatabase, migration: Migration) -> Optional[str]:
+    """执行单个迁移（不记录版本），返回回填摘要"""
+    by_collection: dict[str, list] = {}
+    for collection, index in migration.create_indexes:
+        by_collection.setdefault(collection, []).append(index)
+    for collection, indexes in by_collection.items():
+        await db[collection].create_indexes(indexes)
+    for collection, name in migration.drop_indexes:
+        await _drop_index(db, collection, name)
+    if migration.backfill is not None:
+        return await migration.backfill(db)
+    return None
+
+
+async def apply_migrations(
+    db: AsyncIOMotorDatabase, target: Optional[int] = None, verify: bool = False
+) -> list[tuple[Migration, Optional[str]]]:
+    """
+    执行待执行的迁移，返回本次执行的迁移及其回填摘要
+
+    verify 为 True 时每个迁移完成后立即执行其热点查询检查，失败则停止且不记录该版本。
+    """
+    if not await acquire_lease(db, "migrate", MIGRATION_LEASE_SECONDS):
+        raise SchemaVersionError("其他进程正在执行迁移")
+    try:
+        version = await current_schema_version(db)
+        if target is not None and target < version:
+            raise SchemaVersionError(f"数据库结构版本 {version} 已高于目标版本 {target}，迁移不支持回退")
+        applied = []
+        for migration in pending_migrations(version, target):
+            summary = await run_migration(db, migration)
+            if verify:
+                failed = [report for report in await explain_checks(db, [migration]) if not report.ok]
+                if failed:
+                    raise SchemaVersionError(
+                        f"迁移 {migration.version} 的执行计划检查未通过：{', '.join(r.check for r in failed)}"
+                    )
+            await db[META_COLLECTION_NAME].update_one(
+                {"_id": SCHEMA_VERSION_ID},
+                {
+                    "$set": {"version": migration.version},
+                    "$push": {"applied": {
+                        "version": migration.version, "name": migration.name, "applied_at": datetime.utcnow()
+                    }},
+                },
+                upsert=True,
+            )
+            applied.append((migration, summary))
+        return applied
+    finally:
+        await release_lease(db, "migrate")
+
+
+def _plan_nodes(node) -> Iterable[dict]:
+    """递归遍历执行计划中的各阶段（兼容经典引擎、SBE 的 queryPlan 和分片集群的 shards）"""
+    if isinstance(node, dict):
+        if "stage" in node:
+            yield node
+        for value in node.values():
+            yield from _plan_nodes(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _plan_nodes(item)
+
+
+async def explain_query(db: AsyncIOMotorDatabase, check: QueryCheck) -> tuple[list[str], list[str]]:
+    """返回获胜执行计划中的阶段和使用的索引"""
+    command: dict = {"find": check.collection, "filter": check.filter}
+    if check.sort:
+        command["sort"] = check.sort
+    result = await db.command({"explain": command, "verbosity": "queryPlanner"})
+    nodes = list(_plan_nodes(result["queryPlanner"]["winningPlan"]))
+    stages = [node["stage"] for node in nodes]
+    indexes = [node["indexName"] for node in nodes if "indexName" in node]
+    return stages, indexes
+
+
+async def explain_checks(
+    db: AsyncIOMotorDatabase, migrations: Optional[list[Migration]] = None
+) -> list[PlanReport]:
+    """执行迁移声明的热点查询检查，默认检查数据库中已执行的全部迁移（跳过已被后续迁移停用的检查）"""
+    if migrations is None:
+        migrations = pending_migrations(0, await current_schema_version(db))
+    retired = {name for migration in migrations for name in migration.retire_checks}
+    reports = []
+    for migration in migrations:
+        for check in migration.checks:
+            if check.name in retired:
+                continue
+            stages, indexes = await explain_query(db, check)
+            uses_index = bool(set(indexes) & set(check.indexes)) if check.indexes else bool(indexes)
+            reports.append(PlanReport(
+                migration=migration.version,
+                check=check.name,
+                collection=check.collection,
+                stages=stages,
+                indexes=indexes,
+                ok="COLLSCAN" not in stages and uses_index,
+            ))
+    return reports
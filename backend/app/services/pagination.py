@@ -0,0 +1,44 @@
+"""
+游标分页工具
+
+游标为不透明的 base64url 字符串，内部是排序键取值的 Extended JSON 编码，
+可无损还原 datetime、ObjectId 等 BSON 类型。
+"""
+import base64
+import binascii
+from typing import Any
+
+from bson import json_util
+from bson.errors import InvalidBSON
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(*values: Any) -> str:
+    """将排序键取值编码为分页游标"""
+    raw = json_util.dumps(list(values)).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """解析分页游标，返回排序键取值列表"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error, InvalidBSON):
+        raise InvalidCursorError(cursor)
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError(cursor)
+    return values
+
+
+def keyset_filter(field: str, value: Any, last_id: Any, op: str = "$lt") -> dict:
+    """构建按 (field, _id) 倒序排列时取下一页的查询条件，op 为 $gt 时取之前的记录"""
+    return {
+        "$or": [
+            {field: {op: value}},
+            {field: value, "_id": {op: last_id}},
+        ]
+    }
@@ -0,0 +1,267 @@
+"""
+按需性能分析与慢操作日志
+
+按需分析：配置 PROFILING_ENABLED=true 后，携带请求头 X-Profile 的请求在 cProfile 下执行。
+  X-Profile: 1      不返回原响应，改为返回按累计耗时排序的 pstats 文本报告
+                    （原响应的状态码见 X-Profile-Status）
+  X-Profile: store  正常返回响应，profile 保存到 PROFILING_DIR，文件名见 X-Profile-File，
+                    可用 python -m pstats 或 snakeviz 查看
+cProfile 作用于整个线程，分析期间同时处理的其他请求也会被计入；同一时间只分析一个请求。
+
+慢操作日志：注册到 AsyncIOMotorClient 的 CommandListener 记录耗时超过 SLOW_OP_THRESHOLD_MS 的命令，
+输出命令、集合、过滤条件和耗时，并在事件循环中异步执行 explain 补充获胜的执行计划。
+相同形状（命令、集合、过滤字段）的操作在 EXPLAIN_INTERVAL_SECONDS 内只 explain 一次。
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+from uuid import uuid4
+
+from bson import json_util
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+# 文本报告中输出的函数数量
+PROFILE_TOP = 60
+
+# 可以 explain 的命令及其过滤条件所在的字段
+EXPLAINABLE = {
+    "find": lambda cmd: cmd.get("filter", {}),
+    "aggregate": lambda cmd: cmd.get("pipeline", []),
+    "count": lambda cmd: cmd.get("query", {}),
+    "distinct": lambda cmd: cmd.get("query", {}),
+    "findAndModify": lambda cmd: cmd.get("query", {}),
+    "update": lambda cmd: (cmd.get("updates") or [{}])[0].get("q", {}),
+    "delete": lambda cmd: (cmd.get("deletes") or [{}])[0].get("q", {}),
+}
+
+# explain 不接受的会话、事务和读写关注字段
+_EXPLAIN_EXCLUDED_FIELDS = {
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit",
+    "startTransaction", "readConcern", "writeConcern",
+}
+
+EXPLAIN_INTERVAL_SECONDS = 60.0
+MAX_LOGGED_FILTER_CHARS = 1000
+
+
+class ProfilingMiddleware:
+    """对携带 X-Profile 请求头的请求执行 cProfile"""
+
+    def __init__(self, app, directory: str = ""):
+        self.app = app
+        self.directory = directory
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = dict(scope["headers"]).get(PROFILE_HEADER, b"").decode("latin-1").strip().lower()
+        if not mode or mode in ("0", "false"):
+            await self.app(scope, receive, send)
+            return
+        if mode == "store":
+            await self._store(scope, receive, send)
+        else:
+            await self._report(scope, receive, send)
+
+    async def _store(self, scope, receive, send):
+        if not self.directory:
+            await _send_text(send, 400, "PROFILING_DIR is not configured\n")
+            return
+        filename = f"{datetime.now():%Y%m%d-%H%M%S}-{scope['method']}-{_slug(scope['path'])}-{uuid4().hex[:8]}.prof"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", filename.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = await self._run(scope, receive, send_wrapper)
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, filename))
+
+    async def _report(self, scope, receive, send):
+        status_code = 500
+        response_bytes = 0
+
+        async def discard(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+
+        started = time.perf_counter()
+        profiler = await self._run(scope, receive, discard)
+        elapsed = time.perf_counter() - started
+
+        stream = io.StringIO()
+        stream.write(f"{scope['method']} {scope['path']} -> {status_code}, {response_bytes} bytes, {elapsed * 1000:.1f} ms\n\n")
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        await _send_text(send, 200, stream.getvalue(), [(b"x-profile-status", str(status_code).encode())])
+
+    async def _run(self, scope, receive, send) -> cProfile.Profile:
+        profiler = cProfile.Profile()
+        async with self._lock:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                profiler.disable()
+        return profiler
+
+
+def _slug(path: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in path.strip("/"))[:80] or "root"
+
+
+async def _send_text(send, status_code: int, text: str, headers: Optional[list] = None) -> None:
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            *(headers or []),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _shape(value: Any) -> Any:
+    """过滤条件的形状：保留字段和操作符，去掉具体取值"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shape(item) for item in value[:1]]
+    return None
+
+
+class SlowOperationListener(monitoring.CommandListener):
+    """记录耗时超过阈值的 MongoDB 命令，并异步 explain 其执行计划"""
+
+    def __init__(self, threshold_ms: float, explain: bool = True):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.client = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._commands: dict[tuple, tuple[str, dict]] = {}
+        self._explained: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop) -> None:
+        """指定执行 explain 使用的 Motor 客户端和事件循环"""
+        self.client = client
+        self.loop = loop
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return event.connection_id, event.request_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        command = event.command
+        if event.command_name not in EXPLAINABLE:
+            return
+        # 跟踪型游标和 change stream 的等待属于正常阻塞
+        if command.get("tailable") or command.get("awaitData"):
+            return
+        pipeline = command.get("pipeline") or []
+        if pipeline and "$changeStream" in pipeline[0]:
+            return
+        with self._lock:
+            self._commands[self._key(event)] = (event.database_name, command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event)
+
+    def _finish(self, event) -> None:
+        with self._lock:
+            entry = self._commands.pop(self._key(event), None)
+        if entry is None:
+            return
+        duration = event.duration_micros / 1_000_000
+        if duration < self.threshold:
+            return
+
+        database_name, command = entry
+        name = event.command_name
+        target = command.get(name)
+        collection = target if isinstance(target, str) else ""
+        query = EXPLAINABLE[name](command)
+        logger.warning(
+            "Slow MongoDB %s on %s.%s: %.1f ms, filter=%s",
+            name, database_name, collection, duration * 1000, _dumps(query),
+        )
+
+        if not self.explain or self.client is None or self.loop is None:
+            return
+        shape = f"{name}:{database_name}.{collection}:{_dumps(_shape(query))}"
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(shape, float("-inf")) < EXPLAIN_INTERVAL_SECONDS:
+                return
+            self._explained[shape] = now
+        explain_command = {k: v for k, v in command.items() if k not in _EXPLAIN_EXCLUDED_FIELDS}
+        asyncio.run_coroutine_threadsafe(
+            self._explain(database_name, collection, name, explain_command), self.loop
+        )
+
+    async def _explain(self, database_name: str, collection: str, name: str, command: dict) -> None:
+        try:
+            result = await self.client[database_name].command(
+                {"explain": command, "verbosity": "queryPlanner"}
+            )
+        except PyMongoError as e:
+            logger.warning("Explain of slow %s on %s.%s failed: %s", name, database_name, collection, e)
+            return
+        logger.warning(
+            "Slow MongoDB %s on %s.%s winning plan: %s",
+            name, database_name, collection, _dumps(winning_plan(result)),
+        )
+
+
+def winning_plan(explain_result: dict) -> Any:
+    """从 explain 结果中取出获胜的执行计划（兼容 find 与 aggregate 的输出格式）"""
+    planner = explain_result.get("queryPlanner")
+    if planner is None:
+        for stage in explain_result.get("stages", []):
+            cursor = stage.get("$cursor")
+            if cursor:
+                planner = cursor.get("queryPlanner")
+                break
+    if planner is None:
+        return explain_result
+    plan = planner.get("winningPlan", {})
+    # 使用 SBE 引擎时计划位于 queryPlan 下
+    return plan.get("queryPlan", plan)
+
+
+def _dumps(value: Any) -> str:
+    text = json_util.dumps(value, ensure_ascii=False)
+    if len(text) > MAX_LOGGED_FILTER_CHARS:
+        text = text[:MAX_LOGGED_FILTER_CHARS] + "..."
+    return text
+
+
+def slow_operation_listeners(threshold_ms: float, explain: bool) -> list:
+    """创建 MongoDB 客户端时注册的慢操作监听器，threshold_ms 为 0 时关闭"""
+    if threshold_ms <= 0:
+        return []
+    return [SlowOperationListener(threshold_ms, explain)]
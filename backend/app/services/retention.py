@@ -0,0 +1,123 @@
+"""
+数据保留后台任务
+
+周期任务按配置的间隔在每个进程中运行，执行前在 meta 集合中抢占租约，
+多 worker 部署时同一周期内只有一个进程执行，其余进程跳过。
+
+- history_compaction：按保留策略将较早的编辑历史压缩移入归档（见 app.services.history）
+- trash_sweep：将回收站中超过保留期限的卡片移入归档（见 app.services.trash）
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from app.models.meta import META_COLLECTION_NAME
+from app.services.history import compact_histories
+from app.services.trash import purge_expired_trash
+
+logger = logging.getLogger(__name__)
+
+# 本进程的租约持有者标识
+WORKER_ID = uuid4().hex
+
+
+async def acquire_lease(db: AsyncIOMotorDatabase, name: str, seconds: float) -> bool:
+    """抢占名为 name 的租约，租约未过期且由其他进程持有时返回 False"""
+    now = datetime.utcnow()
+    try:
+        await db[META_COLLECTION_NAME].find_one_and_update(
+            {"_id": f"lease:{name}", "$or": [{"until": {"$lte": now}}, {"holder": WORKER_ID}]},
+            {"$set": {"until": now + timedelta(seconds=seconds), "holder": WORKER_ID}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lease(db: AsyncIOMotorDatabase, name: str) -> None:
+    """提前释放本进程持有的租约"""
+    await db[META_COLLECTION_NAME].update_one(
+        {"_id": f"lease:{name}", "holder": WORKER_ID}, {"$set": {"until": datetime.utcnow()}}
+    )
+
+
+class PeriodicTask:
+    """按固定间隔执行的后台任务，各进程通过租约互斥"""
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        name: str,
+        interval_seconds: float,
+        job: Callable[[AsyncIOMotorDatabase], Awaitable[str]],
+    ):
+        self.db = db
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                if await acquire_lease(self.db, self.name, self.interval_seconds):
+                    summary = await self.job(self.db)
+                    logger.info("%s: %s", self.name, summary)
+            except Exception:
+                # 单次失败不影响后续周期
+                logger.exception("%s failed", self.name)
+
+
+# 启动时由 configure_retention 按配置创建
+periodic_tasks: list[PeriodicTask] = []
+
+
+async def configure_retention(
+    db: AsyncIOMotorDatabase,
+    compaction_interval_seconds: float,
+    history_hot_entries: int,
+    history_hot_days: float,
+    trash_sweep_interval_seconds: float,
+    trash_retention_days: float,
+) -> None:
+    """按配置启动数据保留后台任务，间隔为 0 的任务不启动"""
+    async def compact(db: AsyncIOMotorDatabase) -> str:
+        cards, entries = await compact_histories(db, history_hot_entries, history_hot_days)
+        return f"archived {entries} history entries of {cards} cards"
+
+    async def sweep(db: AsyncIOMotorDatabase) -> str:
+        purged = await purge_expired_trash(db, trash_retention_days)
+        return f"archived {purged} expired cards"
+
+    if compaction_interval_seconds > 0:
+        periodic_tasks.append(PeriodicTask(db, "history_compaction", compaction_interval_seconds, compact))
+    if trash_sweep_interval_seconds > 0:
+        periodic_tasks.append(PeriodicTask(db, "trash_sweep", trash_sweep_interval_seconds, sweep))
+    for task in periodic_tasks:
+        task.start()
+
+
+async def shutdown_retention() -> None:
+    """停止数据保留后台任务"""
+    for task in periodic_tasks:
+        await task.close()
+    periodic_tasks.clear()
@@ -0,0 +1,164 @@
+"""
+卡片全文检索
+
+MongoDB 默认的文本索引无法正确切分中文，这里自行维护一个 n-gram 倒排索引：
+中日韩文本切分为单字和二元组，其他文本按字母数字切词。查询词切分后要求全部命中，
+按标题命中数、待办命中数加权排序，再按更新时间倒序。
+
+卡片写入时由路由同步更新索引，历史数据可用 app.scripts.rebuild_search_index 重建。
+"""
+import re
+import unicodedata
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+from app.models.idea_card import COLLECTION_NAME
+from app.models.search_index import SEARCH_INDEX_COLLECTION_NAME
+
+# 中日韩字符（假名、汉字、兼容汉字、谚文）与其他字母数字
+_CJK = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+# 排序权重
+TITLE_WEIGHT = 2
+TODO_WEIGHT = 1
+
+# 建立索引时读取的卡片字段
+INDEX_SOURCE_PROJECTION = {"title": 1, "content": 1, "todos.text": 1, "is_deleted": 1, "update_time": 1}
+
+
+def _runs(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _TOKEN_RE.findall(text)
+
+
+def tokenize(text: str) -> set[str]:
+    """切分待索引文本：中日韩文本产生单字和二元组，其他文本产生单词"""
+    terms: set[str] = set()
+    for run in _runs(text):
+        if _CJK_RE.match(run):
+            terms.update(run)
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.add(run)
+    return terms
+
+
+def query_terms(query: str) -> list[str]:
+    """切分查询文本：中日韩文本只取二元组（单字查询取单字），其他文本取单词"""
+    terms: list[str] = []
+    for run in _runs(query):
+        if _CJK_RE.match(run) and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return list(dict.fromkeys(terms))
+
+
+def build_index_doc(card: dict) -> dict:
+    """由卡片文档构建索引文档"""
+    title_terms = tokenize(card.get("title", ""))
+    todo_terms = set()
+    for todo in card.get("todos") or []:
+        todo_terms |= tokenize(todo.get("text", ""))
+    terms = title_terms | todo_terms | tokenize(card.get("content", ""))
+    return {
+        "_id": card["_id"],
+        "is_deleted": card.get("is_deleted", False),
+        "update_time": card.get("update_time"),
+        "terms": sorted(terms),
+        "title_terms": sorted(title_terms),
+        "todo_terms": sorted(todo_terms),
+    }
+
+
+async def index_cards(db: AsyncIOMotorDatabase, cards: list[dict]) -> None:
+    """写入或覆盖卡片的索引文档（卡片文档需包含 title、content、todos、is_deleted、update_time）"""
+    if cards:
+        operations = [ReplaceOne({"_id": card["_id"]}, build_index_doc(card), upsert=True) for card in cards]
+        await db[SEARCH_INDEX_COLLECTION_NAME].bulk_write(operations, ordered=False)
+
+
+async def reindex_cards(db: AsyncIOMotorDatabase, card_ids: Iterable[ObjectId]) -> None:
+    """从卡片集合读取最新内容并重建索引"""
+    cursor = db[COLLECTION_NAME].find({"_id": {"$in": list(card_ids)}}, INDEX_SOURCE_PROJECTION)
+    await index_cards(db, [card async for card in cursor])
+
+
+async def mark_index_deleted(db: AsyncIOMotorDatabase, card_id: ObjectId, is_deleted: bool, update_time) -> None:
+    """同步卡片的删除状态，词项不变"""
+    await db[SEARCH_INDEX_COLLECTION_NAME].update_one(
+        {"_id": card_id}, {"$set": {"is_deleted": is_deleted, "update_time": update_time}}
+    )
+
+
+def _match_count(field: str, terms: list[str]) -> dict:
+    """统计数组字段中命中查询词项的个数（索引文档中的词项已去重）"""
+    return {"$size": {"$filter": {"input": field, "cond": {"$in": ["$$this", terms]}}}}
+
+
+async def search_cards(
+    db: AsyncIOMotorDatabase,
+    query: str,
+    include_deleted: bool,
+    limit: int,
+    after: Optional[list] = None,
+) -> tuple[list[dict], int]:
+    """
+    检索卡片，返回 ([{"_id", "score", "update_time"}], 命中总数)
+
+    结果按 (score, update_time, _id) 倒序，after 为上一页最后一条的这三个值。
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [], 0
+
+    match: dict = {"terms": {"$all": terms}}
+    if not include_deleted:
+        match["is_deleted"] = False
+
+    pipeline: list[dict] = [
+        {"$match": match},
+        {"$project": {
+            "update_time": 1,
+            "score": {"$add": [
+                {"$multiply": [TITLE_WEIGHT, _match_count("$title_terms", terms)]},
+                {"$multiply": [TODO_WEIGHT, _match_count("$todo_terms", terms)]},
+            ]},
+        }},
+    ]
+    if after:
+        score, update_time, last_id = after
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "update_time": {"$lt": update_time}},
+            {"score": score, "update_time": update_time, "_id": {"$lt": last_id}},
+        ]}})
+    pipeline += [
+        {"$sort": {"score": -1, "update_time": -1, "_id": -1}},
+        {"$limit": limit},
+    ]
+
+    hits = await db[SEARCH_INDEX_COLLECTION_NAME].aggregate(pipeline).to_list(length=limit)
+    total = await db[SEARCH_INDEX_COLLECTION_NAME].count_documents(match)
+    return hits, total
+
+
+async def rebuild_search_index(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """为全部卡片重建索引（可重复执行），返回处理的卡片数量"""
+    count = 0
+    batch: list[dict] = []
+    async for card in db[COLLECTION_NAME].find({}, INDEX_SOURCE_PROJECTION):
+        batch.append(card)
+        if len(batch) >= batch_size:
+            await index_cards(db, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        await index_cards(db, batch)
+        count += len(batch)
+    return count
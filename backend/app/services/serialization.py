@@ -0,0 +1,155 @@
+"""
+读接口的快速序列化
+
+读接口返回的数据全部来自本服务写入的集合，已在写入时校验过，读取时无需再经过 Pydantic 校验。
+按响应模型的字段定义预先生成整形函数：只保留模型字段、按别名输出、补全缺省值、递归处理嵌套模型，
+再由 orjson 直接编码为 JSON，输出与 FastAPI 按 response_model 序列化的结果一致。
+
+整形函数不做类型转换，ObjectId 在编码时转为字符串，时间按 ISO 8601 输出（UTC 时间以 Z 结尾）。
+
+列表、时间线和编辑历史接口支持 MessagePack：请求头 Accept 包含 application/msgpack 时
+由 msgpack 编码同一份整形结果，时间同样输出为 ISO 8601 字符串，结构与 JSON 完全一致。
+"""
+import types
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Literal, Optional, Union, get_args, get_origin
+
+import msgpack
+import orjson
+from bson import ObjectId
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+Shaper = Callable[[Any], Any]
+
+ResponseFormat = Literal["json", "msgpack"]
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# 部分客户端库使用的旧媒体类型
+_MSGPACK_ACCEPT = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+_MEDIA_TYPES = {"json": "application/json", "msgpack": MSGPACK_MEDIA_TYPE}
+
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _msgpack_default(value: Any) -> Any:
+    """与 orjson 输出一致：UTC 时间以 Z 结尾，无时区的时间原样输出"""
+    if isinstance(value, datetime):
+        if value.utcoffset() == timedelta(0):
+            return value.replace(tzinfo=None).isoformat() + "Z"
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return _default(value)
+
+
+def _shaper_for(annotation: Any) -> Shaper:
+    """按字段类型生成整形函数，不含嵌套模型的类型原样输出"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return compile_shaper(annotation)
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin in (Union, types.UnionType):
+        models = [arg for arg in args if isinstance(arg, type) and issubclass(arg, BaseModel)]
+        # 多个模型的联合无法在不校验的情况下区分，由调用方预先整形
+        if len(models) != 1:
+            return _identity
+        shape = compile_shaper(models[0])
+        return lambda value: None if value is None else shape(value)
+    if origin is list and args:
+        shape = _shaper_for(args[0])
+        if shape is _identity:
+            return _identity
+        return lambda values: [shape(value) for value in values]
+    return _identity
+
+
+_shapers: dict[type, Shaper] = {}
+
+
+def compile_shaper(model: type[BaseModel]) -> Shaper:
+    """
+    生成模型的整形函数，将文档转换为与 model_dump(by_alias=True) 结构一致的字典
+
+    缺少必填字段时抛出 KeyError；已经是模型实例的值按模型导出。
+    """
+    if model in _shapers:
+        return _shapers[model]
+
+    fields = []
+    for name, info in model.model_fields.items():
+        output_key = info.alias or name
+        # 文档中既可能是别名（_id）也可能是字段名
+        keys = (output_key, name) if output_key != name else (name,)
+        fields.append((output_key, keys, info.is_required(), info, _shaper_for(info.annotation)))
+
+    def shape(doc: Any) -> dict:
+        if isinstance(doc, BaseModel):
+            return doc.model_dump(by_alias=True)
+        out = {}
+        for output_key, keys, required, info, shape_value in fields:
+            for key in keys:
+                if key in doc:
+                    value = doc[key]
+                    break
+            else:
+                if required:
+                    raise KeyError(f"{model.__name__}.{output_key}")
+                value = info.get_default(call_default_factory=True)
+            out[output_key] = value if value is None else shape_value(value)
+        return out
+
+    _shapers[model] = shape
+    return shape
+
+
+def encode_json(content: Any) -> bytes:
+    """编码已整形的数据"""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+def encode_msgpack(content: Any) -> bytes:
+    """以 MessagePack 编码已整形的数据"""
+    return msgpack.packb(content, default=_msgpack_default)
+
+
+def encode(content: Any, fmt: ResponseFormat = "json") -> bytes:
+    """按响应格式编码已整形的数据"""
+    return encode_msgpack(content) if fmt == "msgpack" else encode_json(content)
+
+
+def negotiate_format(request: Request) -> ResponseFormat:
+    """Accept 明确包含 application/msgpack 时返回 msgpack，其余情况返回 json"""
+    accept = request.headers.get("accept", "")
+    for item in accept.split(","):
+        media_type, _, params = item.partition(";")
+        if media_type.strip().lower() in _MSGPACK_ACCEPT and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return "msgpack"
+    return "json"
+
+
+def json_response(body: bytes, etag: Optional[str] = None) -> Response:
+    """返回已编码的 JSON 响应"""
+    headers = {"ETag": etag} if etag else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def encoded_response(body: bytes, fmt: ResponseFormat, etag: Optional[str] = None) -> Response:
+    """返回按 Accept 协商格式编码的响应，响应随 Accept 变化"""
+    headers = {"Vary": "Accept"}
+    if etag:
+        headers["ETag"] = etag
+    return Response(content=body, media_type=_MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,78 @@
+"""
+增量同步
+
+卡片按 (change_seq, _id) 升序分页返回，同步令牌编码了已返回到的位置。
+读取前先记录当前变更序号 C，本次最多返回到 C 为止；令牌推进到 C 之后，
+序号不大于 C 的写入均已返回（原理见 app.services.changes）。
+变更序号尚未写回（None）的卡片是进行中的写入，每次都会附带返回。
+
+已删除的卡片以墓碑形式返回，只包含卡片ID。回收站中超过保留期限的卡片移出 idea_cards 后，
+其墓碑保留在 card_tombstones 中（保持原变更序号），与卡片按同一顺序归并返回。
+"""
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.models.card_archive import TOMBSTONE_COLLECTION_NAME
+from app.models.idea_card import CARD_SUMMARY_PROJECTION, COLLECTION_NAME
+from app.services.changes import current_change_seq
+from app.services.pagination import encode_cursor, keyset_filter
+
+# 令牌中表示“该序号内的全部卡片”的 _id 上界
+_MAX_OBJECT_ID = ObjectId("f" * 24)
+
+SYNC_PROJECTION = {**CARD_SUMMARY_PROJECTION, "change_seq": 1}
+
+
+async def find_changes(
+    db: AsyncIOMotorDatabase, since: Optional[list], limit: int
+) -> tuple[list[dict], str, bool]:
+    """
+    查询 since 之后变更的卡片，返回 (卡片文档, 新令牌, 是否还有更多)
+
+    since 为解码后的令牌 [change_seq, _id]，为 None 时从头开始全量同步。
+    """
+    upper = await current_change_seq(db)
+
+    query: dict = {"change_seq": {"$lte": upper}}
+    if since:
+        query = {"$and": [query, keyset_filter("change_seq", since[0], since[1], "$gt")]}
+
+    # 多取一条用于判断是否还有下一页
+    cursor = (
+        db[COLLECTION_NAME]
+        .find(query, SYNC_PROJECTION)
+        .sort([("change_seq", 1), ("_id", 1)])
+        .limit(limit + 1)
+    )
+    cards = await cursor.to_list(length=limit + 1)
+
+    # 归并已清除卡片的墓碑（清除过程中卡片可能同时存在于两个集合）
+    tombstones = (
+        db[TOMBSTONE_COLLECTION_NAME]
+        .find(query, {"change_seq": 1})
+        .sort([("change_seq", 1), ("_id", 1)])
+        .limit(limit + 1)
+    )
+    ids = {card["_id"] for card in cards}
+    async for tombstone in tombstones:
+        if tombstone["_id"] not in ids:
+            cards.append({**tombstone, "is_deleted": True})
+    cards.sort(key=lambda card: (card["change_seq"], card["_id"]))
+    cards = cards[:limit + 1]
+
+    has_more = len(cards) > limit
+    if has_more:
+        cards = cards[:limit]
+        token = encode_cursor(cards[-1]["change_seq"], cards[-1]["_id"])
+    else:
+        token = encode_cursor(upper, _MAX_OBJECT_ID)
+
+    # 进行中的写入：数据已可见但序号尚未写回
+    seen = {card["_id"] for card in cards}
+    async for card in db[COLLECTION_NAME].find({"change_seq": {"$exists": True, "$eq": None}}, SYNC_PROJECTION):
+        if card["_id"] not in seen:
+            cards.append(card)
+
+    return cards, token, has_more
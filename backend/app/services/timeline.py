@@ -0,0 +1,267 @@
+"""
+全局时间线事件日志
+
+卡片的写操作在落库的同时生成对应的时间线事件并追加到 timeline_events 集合，
+/api/timeline 只需在 event_time 索引上做范围查询，不再扫描全部卡片。
+"""
+import calendar
+from datetime import datetime
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.models.idea_card import COLLECTION_NAME
+from app.models.timeline_event import TIMELINE_COLLECTION_NAME
+from app.services.delta import diff_todos
+from app.services.history import load_histories
+
+
+def _time_key(value: datetime) -> int:
+    """将时间转换为毫秒时间戳（按 UTC 解释 naive 时间），用于拼接事件ID"""
+    return calendar.timegm(value.utctimetuple()) * 1000 + value.microsecond // 1000
+
+
+def build_event(
+    event_id: str,
+    event_type: str,
+    card_id: str,
+    card_title: str,
+    event_time: datetime,
+    description: str,
+    details: Optional[dict] = None,
+) -> dict:
+    """构建时间线事件文档"""
+    return {
+        "_id": event_id,
+        "event_type": event_type,
+        "card_id": card_id,
+        "card_title": card_title,
+        "event_time": event_time,
+        "description": description,
+        "details": details,
+    }
+
+
+def card_created_event(card_id: str, card_title: str, create_time: datetime) -> dict:
+    """卡片创建事件"""
+    return build_event(
+        f"{card_id}:card_created",
+        "card_created",
+        card_id,
+        card_title,
+        create_time,
+        f"新增「{card_title}」",
+    )
+
+
+def card_deleted_event(card_id: str, card_title: str, delete_time: datetime) -> dict:
+    """卡片删除事件"""
+    return build_event(
+        f"{card_id}:card_deleted:{_time_key(delete_time)}",
+        "card_deleted",
+        card_id,
+        card_title,
+        delete_time,
+        f"删除「{card_title}」",
+    )
+
+
+def card_recovered_event(card_id: str, card_title: str, recover_time: datetime) -> dict:
+    """卡片恢复事件"""
+    return build_event(
+        f"{card_id}:card_recovered:{_time_key(recover_time)}",
+        "card_recovered",
+        card_id,
+        card_title,
+        recover_time,
+        f"恢复「{card_title}」",
+    )
+
+
+def todo_op_events(
+    ops: list[dict],
+    card_id: str,
+    card_title: str,
+    event_time: datetime,
+    id_prefix: str,
+) -> list[dict]:
+    """根据待办事项的增删改操作生成事件"""
+    events = []
+
+    # 新增的 todo
+    for op in ops:
+        if op["op"] == "add":
+            todo = op["todo"]
+            tid = todo["todo_id"]
+            events.append(build_event(
+                f"{id_prefix}:todo_added:{tid}",
+                "todo_added",
+                card_id,
+                card_title,
+                event_time,
+                f"「{card_title}」新增待办: {todo.get('text', '')}",
+                {"todo_text": todo.get("text", ""), "todo_id": tid},
+            ))
+
+    # 删除的 todo
+    for op in ops:
+        if op["op"] == "remove":
+            todo = op["todo"]
+            tid = todo["todo_id"]
+            events.append(build_event(
+                f"{id_prefix}:todo_deleted:{tid}",
+                "todo_deleted",
+                card_id,
+                card_title,
+                event_time,
+                f"「{card_title}」删除待办: {todo.get('text', '')}",
+                {"todo_text": todo.get("text", ""), "todo_id": tid},
+            ))
+
+    # 修改的 todo (text 或 completed 状态变化)
+    for op in ops:
+        if op["op"] != "update":
+            continue
+        tid = op["todo_id"]
+        new_text = op.get("text", "")
+        old_text = op["old"].get("text", new_text)
+        changes = []
+        if "text" in op["old"] or "text" in op["new"]:
+            changes.append(f"内容: \"{old_text}\" → \"{new_text}\"")
+        if "completed" in op["old"] or "completed" in op["new"]:
+            status_str = "已完成" if op["new"].get("completed") else "未完成"
+            changes.append(f"状态: {status_str}")
+        if changes:
+            events.append(build_event(
+                f"{id_prefix}:todo_updated:{tid}",
+                "todo_updated",
+                card_id,
+                card_title,
+                event_time,
+                f"「{card_title}」更新待办: {new_text} ({', '.join(changes)})",
+                {
+                    "todo_text": new_text,
+                    "old_todo_text": old_text,
+                    "todo_id": tid,
+                    "changes": changes,
+                },
+            ))
+
+    return events
+
+
+def diff_todo_events(
+    old_todos: list,
+    new_todos: list,
+    card_id: str,
+    card_title: str,
+    event_time: datetime,
+    id_prefix: str,
+) -> list[dict]:
+    """比较新旧待办事项列表，生成增删改事件"""
+    old_todos = [t for t in old_todos if t.get("todo_id")]
+    new_todos = [t for t in new_todos if t.get("todo_id")]
+    return todo_op_events(diff_todos(old_todos, new_todos), card_id, card_title, event_time, id_prefix)
+
+
+def history_events(card_id: str, card_title: str, history_item: dict) -> list[dict]:
+    """从一条编辑历史中提取标题变更和待办事项变更事件"""
+    cc = history_item.get("change_content", {})
+    edit_time = history_item.get("edit_time")
+    history_id = history_item.get("history_id")
+    if not edit_time or not history_id:
+        return []
+
+    events = []
+
+    # 标题变更
+    if cc.get("title"):
+        old_title = cc["title"].get("old", "")
+        new_title = cc["title"].get("new", "")
+        events.append(build_event(
+            f"{history_id}:title_changed",
+            "title_changed",
+            card_id,
+            card_title,
+            edit_time,
+            f"标题修改: 「{old_title}」→「{new_title}」",
+            {"old_title": old_title, "new_title": new_title},
+        ))
+
+    # 待办事项变更（增量编码的记录直接使用其中的操作）
+    todos = cc.get("todos")
+    if todos and "ops" in todos:
+        events.extend(todo_op_events(todos["ops"], card_id, card_title, edit_time, history_id))
+    elif todos:
+        old_todos = todos.get("old", [])
+        new_todos = todos.get("new", [])
+        events.extend(diff_todo_events(old_todos, new_todos, card_id, card_title, edit_time, history_id))
+
+    return events
+
+
+def card_events(card: dict, history: list[dict]) -> list[dict]:
+    """根据卡片文档的当前状态及其编辑历史推导全部事件（用于回填）"""
+    card_id = str(card["_id"])
+    card_title = card.get("title", "未命名")
+    create_time = card.get("create_time")
+
+    events = []
+
+    # 1. 卡片创建事件
+    if create_time:
+        events.append(card_created_event(card_id, card_title, create_time))
+
+    # 2. 卡片删除事件 (is_deleted=True 且没有后续恢复)
+    if card.get("is_deleted", False):
+        delete_time = card.get("update_time", create_time)
+        if delete_time:
+            events.append(card_deleted_event(card_id, card_title, delete_time))
+
+    # 3. 从编辑历史提取标题变更和 todo 变更
+    for hist in history:
+        events.extend(history_events(card_id, card_title, hist))
+
+    return events
+
+
+async def record_events(db: AsyncIOMotorDatabase, events: list[dict]) -> None:
+    """追加时间线事件"""
+    if events:
+        await db[TIMELINE_COLLECTION_NAME].insert_many(events, ordered=False)
+
+
+async def upsert_card_events(db: AsyncIOMotorDatabase, cards: list[dict]) -> int:
+    """
+    为一批卡片幂等写入其全部事件，返回新写入的事件数量
+
+    事件ID由卡片ID/历史记录ID确定性派生，使用 $setOnInsert 写入，可重复执行。
+    尚未迁移的卡片直接读取内嵌的 edit_history。
+    """
+    histories = await load_histories(db, cards, include_archived=True)
+    operations = []
+    for card in cards:
+        history = histories[card["_id"]] + card.get("edit_history", [])
+        for event in card_events(card, history):
+            fields = {k: v for k, v in event.items() if k != "_id"}
+            operations.append(UpdateOne({"_id": event["_id"]}, {"$setOnInsert": fields}, upsert=True))
+    if not operations:
+        return 0
+    result = await db[TIMELINE_COLLECTION_NAME].bulk_write(operations, ordered=False)
+    return result.upserted_count
+
+
+async def backfill_timeline_events(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """从现有卡片及其编辑历史回填时间线事件（可重复执行），返回新写入的事件数量"""
+    inserted = 0
+    batch: list[dict] = []
+    async for card in db[COLLECTION_NAME].find({}):
+        batch.append(card)
+        if len(batch) >= batch_size:
+            inserted += await upsert_card_events(db, batch)
+            batch = []
+
+    if batch:
+        inserted += await upsert_card_events(db, batch)
+    return inserted
@@ -0,0 +1,79 @@
+"""
+回收站清理
+
+删除超过保留期限的卡片由 purge_expired_trash 移出 idea_cards（结构见 app.models.card_archive）：
+1. 编辑历史全部压缩移入 card_history_archive
+2. 卡片文档写入 idea_cards_archive，墓碑写入 card_tombstones
+3. 以删除时的 update_time 为条件从 idea_cards 删除；期间卡片被恢复则撤销卡片归档和墓碑
+   （已归档的编辑历史仍可透明读取，无需撤销）
+4. 删除检索索引文档，递增变更序号并推送 card_purged
+
+时间线事件和活动统计保留不变。早期删除的卡片没有 deleted_at 时以 update_time 作为删除时间。
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.models.card_archive import CARD_ARCHIVE_COLLECTION_NAME, TOMBSTONE_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME
+from app.models.search_index import SEARCH_INDEX_COLLECTION_NAME
+from app.services.changes import record_change
+from app.services.events import CARD_PURGED, card_change
+from app.services.history import compact_card_history
+
+
+def expired_trash_filter(cutoff: datetime) -> dict:
+    """删除时间早于 cutoff 的卡片；写入进行中（变更序号未写回）的卡片留待下一轮"""
+    return {
+        "is_deleted": True,
+        "change_seq": {"$ne": None},
+        "$or": [
+            {"deleted_at": {"$lt": cutoff}},
+            {"deleted_at": {"$exists": False}, "update_time": {"$lt": cutoff}},
+        ],
+    }
+
+
+async def archive_card(db: AsyncIOMotorDatabase, card: dict, now: datetime) -> bool:
+    """将一张已删除的卡片移入归档并保留同步墓碑，卡片已被恢复或修改时返回 False"""
+    card_id: ObjectId = card["_id"]
+    await compact_card_history(db, card_id, 0, 0, now)
+
+    deleted_at = card.get("deleted_at") or card.get("update_time")
+    await db[CARD_ARCHIVE_COLLECTION_NAME].replace_one(
+        {"_id": card_id}, {**card, "archived_at": now}, upsert=True
+    )
+    await db[TOMBSTONE_COLLECTION_NAME].replace_one(
+        {"_id": card_id},
+        {"change_seq": card["change_seq"], "deleted_at": deleted_at, "archived_at": now},
+        upsert=True,
+    )
+
+    result = await db[COLLECTION_NAME].delete_one(
+        {"_id": card_id, "is_deleted": True, "update_time": card["update_time"]}
+    )
+    if not result.deleted_count:
+        await db[TOMBSTONE_COLLECTION_NAME].delete_one({"_id": card_id})
+        await db[CARD_ARCHIVE_COLLECTION_NAME].delete_one({"_id": card_id})
+        return False
+
+    await db[SEARCH_INDEX_COLLECTION_NAME].delete_one({"_id": card_id})
+    return True
+
+
+async def purge_expired_trash(
+    db: AsyncIOMotorDatabase, retention_days: float, now: Optional[datetime] = None
+) -> int:
+    """将删除超过 retention_days 天的卡片移入归档，返回移出的卡片数量"""
+    now = now or datetime.utcnow()
+    cursor = db[COLLECTION_NAME].find(expired_trash_filter(now - timedelta(days=retention_days)))
+    purged = []
+    async for card in cursor:
+        if await archive_card(db, card, now):
+            purged.append(str(card["_id"]))
+    if purged:
+        # 回收站列表发生变化：递增变更序号使 ETag 与缓存失效，并推送 card_purged
+        await record_change(db, [card_change(CARD_PURGED, card_id) for card_id in purged])
+    return len(purged)
@@ -0,0 +1,53 @@
+from uuid import uuid4
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.config import get_settings
+
+
+@pytest.fixture
+def anyio_backend():
+    # Motor 只支持 asyncio
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def mongo_available() -> bool:
+    """MONGODB_URL 是否可以连接（整个测试会话只探测一次）"""
+    client = MongoClient(get_settings().mongodb_url, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+@pytest.fixture
+async def mongo_db(mongo_available):
+    """MONGODB_URL 上的临时数据库，测试结束后删除；无法连接时跳过"""
+    if not mongo_available:
+        pytest.skip("MONGODB_URL 无法连接")
+    client = AsyncIOMotorClient(get_settings().mongodb_url)
+    name = f"thoughtflow_test_{uuid4().hex[:8]}"
+    try:
+        yield client[name]
+    finally:
+        await client.drop_database(name)
+        client.close()
+
+
+@pytest.fixture
+async def client(mongo_db, monkeypatch):
+    """以 mongo_db 为数据库的 API 客户端（不执行 lifespan）"""
+    httpx = pytest.importorskip("httpx")
+    import app.database as database
+    from app.main import app
+
+    monkeypatch.setattr(database, "db", mongo_db)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
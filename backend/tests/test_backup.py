@@ -0,0 +1,48 @@
+import pytest
+
+from app.models.card_history import HISTORY_COLLECTION_NAME
+from app.services import backup
+
+pytestmark = pytest.mark.anyio
+
+
+async def _edit(client, card_id: str, content: str) -> dict:
+    card = (await client.get(f"/api/idea-card/{card_id}")).json()
+    response = await client.put(
+        f"/api/idea-card/{card_id}",
+        json={"title": card["title"], "content": content, "version": card["version"]},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_import_older_snapshot_over_newer_card(client, mongo_db):
+    response = await client.post("/api/idea-card", json={"title": "t", "content": "a"})
+    card_id = response.json()["_id"]
+    await _edit(client, card_id, "a b")
+    snapshot = (await client.get("/api/export")).content
+
+    await _edit(client, card_id, "a b c")
+    await _edit(client, card_id, "a b c d")
+    result = (await client.post("/api/import", content=snapshot)).json()
+    assert result["error_count"] == 0
+    await _edit(client, card_id, "a b e")
+
+    versions = [doc["version"] async for doc in mongo_db[HISTORY_COLLECTION_NAME].find({}).sort("version", 1)]
+    assert versions == [2, 3]
+    history = (await client.get(f"/api/idea-card/{card_id}/history")).json()["history"]
+    assert [item["change_content"]["content"] for item in history] == [
+        {"old": "a b", "new": "a b e"},
+        {"old": "a", "new": "a b"},
+    ]
+
+
+async def test_oversized_line_is_skipped(monkeypatch):
+    monkeypatch.setattr(backup, "MAX_LINE_BYTES", 8)
+
+    async def chunks():
+        for chunk in (b"ok\nfirst", b"-too-long", b"-still\nnext\n", b"0123456789\nlast"):
+            yield chunk
+
+    lines = [line async for line in backup.iter_lines(chunks())]
+    assert lines == [b"ok", None, b"next", None, b"last"]
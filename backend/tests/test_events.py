@@ -0,0 +1,35 @@
+from bson import ObjectId
+
+from app.services.events import CARD_DELETED, CARD_UPDATED, ChangeStreamSource
+
+
+def _update(card_id: ObjectId, updated: dict, removed: list[str] = ()) -> dict:
+    return {
+        "operationType": "update",
+        "documentKey": {"_id": card_id},
+        "updateDescription": {"updatedFields": updated, "removedFields": list(removed), "truncatedArrays": []},
+    }
+
+
+def test_change_seq_stamp_is_not_published():
+    card_id = ObjectId()
+    assert ChangeStreamSource.to_message(_update(card_id, {"change_seq": 42})) is None
+
+
+def test_data_write_is_published_once():
+    card_id = ObjectId()
+    message = ChangeStreamSource.to_message(_update(card_id, {"title": "new", "version": 2, "change_seq": None}))
+    assert message["type"] == CARD_UPDATED
+    assert message["card_id"] == str(card_id)
+
+
+def test_delete_is_reported_as_deleted():
+    card_id = ObjectId()
+    message = ChangeStreamSource.to_message(_update(card_id, {"is_deleted": True, "change_seq": None}))
+    assert message["type"] == CARD_DELETED
+
+
+def test_stamp_with_removed_fields_is_published():
+    card_id = ObjectId()
+    message = ChangeStreamSource.to_message(_update(card_id, {"change_seq": 7}, ["deleted_at"]))
+    assert message["type"] == CARD_UPDATED
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.models.card_history import HISTORY_COLLECTION_NAME
+from app.models.idea_card import COLLECTION_NAME
+from app.routers import idea_cards
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_history_without_etag_until_history_lands(client, mongo_db, monkeypatch):
+    monkeypatch.setattr(idea_cards, "HISTORY_SETTLE_DELAY", 0)
+    response = await client.post("/api/idea-card", json={"title": "t", "content": "a"})
+    card_id = response.json()["_id"]
+    response = await client.put(f"/api/idea-card/{card_id}", json={"title": "t", "content": "a b", "version": 1})
+    assert response.status_code == 200, response.text
+
+    # 卡片已更新、编辑历史尚未写入
+    await mongo_db[COLLECTION_NAME].update_one(
+        {"_id": ObjectId(card_id)}, {"$set": {"content": "a b c"}, "$inc": {"version": 1}}
+    )
+    for path in (f"/api/idea-card/{card_id}/history", f"/api/idea-card/{card_id}"):
+        response = await client.get(path)
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+
+    await mongo_db[HISTORY_COLLECTION_NAME].insert_one({
+        "card_id": ObjectId(card_id),
+        "version": 3,
+        "edit_time": datetime.utcnow(),
+        "change_content": {"content": {"old": "a b", "new": "a b c"}},
+    })
+    response = await client.get(f"/api/idea-card/{card_id}/history")
+    assert "-3-" in response.headers["etag"]
+    assert response.json()["history"][0]["change_content"]["content"] == {"old": "a b", "new": "a b c"}
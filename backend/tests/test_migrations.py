@@ -0,0 +1,24 @@
+import pytest
+
+from app.migrations import MIGRATIONS
+from app.services.migrations import apply_migrations, explain_checks
+
+pytestmark = pytest.mark.anyio
+
+# 各迁移声明的热点查询检查（不含已被后续迁移停用的）
+RETIRED = {name for migration in MIGRATIONS for name in migration.retire_checks}
+CHECKS = [
+    pytest.param(migration.version, check.name, id=f"v{migration.version}-{check.name}")
+    for migration in MIGRATIONS
+    for check in migration.checks
+    if check.name not in RETIRED
+]
+
+
+@pytest.mark.parametrize("version, check", CHECKS)
+async def test_hot_query_uses_index(mongo_db, version, check):
+    await apply_migrations(mongo_db)
+
+    [report] = [r for r in await explain_checks(mongo_db) if r.migration == version and r.check == check]
+    assert "COLLSCAN" not in report.stages
+    assert report.ok, f"{check}: stages={report.stages} indexes={report.indexes}"
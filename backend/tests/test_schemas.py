@@ -0,0 +1,10 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.idea_card import IdeaCardUpdate
+
+
+def test_update_requires_version():
+    with pytest.raises(ValidationError):
+        IdeaCardUpdate(title="t", content="c")
+    assert IdeaCardUpdate(title="t", content="c", version=0).version == 0
@@ -1,12 +1,20 @@
 import axios from 'axios';
 import type {
   IdeaCard,
+  TodoItem,
+  CreateTodoRequest,
+  UpdateTodoRequest,
   CreateCardRequest,
   UpdateCardRequest,
   CardListResponse,
   EditHistoryResponse,
   MessageResponse,
+  TimelineEvent,
   TimelineResponse,
+  SearchResponse,
+  SyncResponse,
+  BulkOperation,
+  BulkResponse,
 } from '../types';
 
 // 创建 axios 实例
@@ -28,6 +36,22 @@ api.interceptors.response.use(
   }
 );
 
+// 按游标逐页拉取卡片列表，直到没有下一页
+const fetchAllPages = async (url: string): Promise<CardListResponse> => {
+  const cards: IdeaCard[] = [];
+  let total = 0;
+  let after: string | null | undefined;
+  do {
+    const params: Record<string, string | number> = { limit: 500 };
+    if (after) params.after = after;
+    const response = await api.get<CardListResponse>(url, { params });
+    cards.push(...response.data.cards);
+    total = response.data.total;
+    after = response.data.next_cursor;
+  } while (after);
+  return { cards, total, next_cursor: null };
+};
+
 // 想法卡片 API
 export const ideaCardApi = {
   // 新建卡片
@@ -38,14 +62,12 @@ export const ideaCardApi = {
 
   // 获取所有正常卡片
   getAll: async (): Promise<CardListResponse> => {
-    const response = await api.get<CardListResponse>('/idea-cards');
-    return response.data;
+    return fetchAllPages('/idea-cards');
   },
 
   // 获取所有已删除卡片
   getDeleted: async (): Promise<CardListResponse> => {
-    const response = await api.get<CardListResponse>('/idea-cards/deleted');
-    return response.data;
+    return fetchAllPages('/idea-cards/deleted');
   },
 
   // 获取单张卡片
@@ -72,20 +94,105 @@ export const ideaCardApi = {
     return response.data;
   },
 
+  // 批量操作卡片（单个请求内混合创建、更新、删除、恢复）
+  bulk: async (operations: BulkOperation[], operator?: string): Promise<BulkResponse> => {
+    const response = await api.post<BulkResponse>('/idea-cards/bulk', { operations, operator });
+    return response.data;
+  },
+
+  // 新增待办事项
+  addTodo: async (cardId: string, data: CreateTodoRequest): Promise<TodoItem> => {
+    const response = await api.post<TodoItem>(`/idea-card/${cardId}/todos`, data);
+    return response.data;
+  },
+
+  // 更新单条待办事项（如切换完成状态）
+  updateTodo: async (cardId: string, todoId: string, data: UpdateTodoRequest): Promise<TodoItem> => {
+    const response = await api.patch<TodoItem>(`/idea-card/${cardId}/todos/${todoId}`, data);
+    return response.data;
+  },
+
+  // 删除单条待办事项
+  deleteTodo: async (cardId: string, todoId: string): Promise<TodoItem> => {
+    const response = await api.delete<TodoItem>(`/idea-card/${cardId}/todos/${todoId}`);
+    return response.data;
+  },
+
   // 获取编辑历史
   getHistory: async (cardId: string): Promise<EditHistoryResponse> => {
-    const response = await api.get<EditHistoryResponse>(`/idea-card/${cardId}/history`);
-    return response.data;
+    const history: EditHistoryResponse['history'] = [];
+    let before: string | null | undefined;
+    let response;
+    do {
+      const params: Record<string, string | number> = { limit: 200 };
+      if (before) params.before = before;
+      response = await api.get<EditHistoryResponse>(`/idea-card/${cardId}/history`, { params });
+      history.push(...response.data.history);
+      before = response.data.next_cursor;
+    } while (before);
+    return { ...response.data, history, next_cursor: null };
   },
 
-  // 获取全局时间线
-  getTimeline: async (startTime?: string, endTime?: string): Promise<TimelineResponse> => {
+  // 增量同步：返回 since 之后变更的卡片和已删除卡片ID
+  sync: async (since?: string): Promise<SyncResponse> => {
     const params: Record<string, string> = {};
-    if (startTime) params.start_time = startTime;
-    if (endTime) params.end_time = endTime;
+    if (since) params.since = since;
+    const response = await api.get<SyncResponse>('/sync', { params });
+    return response.data;
+  },
+
+  // 全文检索卡片
+  search: async (q: string, options: { includeDeleted?: boolean; limit?: number; after?: string } = {}): Promise<SearchResponse> => {
+    const params: Record<string, string | number | boolean> = { q };
+    if (options.includeDeleted) params.include_deleted = true;
+    if (options.limit) params.limit = options.limit;
+    if (options.after) params.after = options.after;
+    const response = await api.get<SearchResponse>('/search', { params });
+    return response.data;
+  },
+
+  // 获取全局时间线（按事件时间倒序分页，after 为上一页返回的 next_cursor）
+  getTimeline: async (
+    startTime?: string,
+    endTime?: string,
+    options: { limit?: number; after?: string; eventTypes?: TimelineEvent['event_type'][] } = {}
+  ): Promise<TimelineResponse> => {
+    const params = new URLSearchParams();
+    if (startTime) params.append('start_time', startTime);
+    if (endTime) params.append('end_time', endTime);
+    if (options.limit) params.append('limit', String(options.limit));
+    if (options.after) params.append('after', options.after);
+    options.eventTypes?.forEach(type => params.append('event_type', type));
     const response = await api.get<TimelineResponse>('/timeline', { params });
     return response.data;
   },
 };
 
+// 卡片变更推送中的事件类型
+const CHANGE_EVENTS = [
+  'card_created',
+  'card_updated',
+  'card_deleted',
+  'card_recovered',
+  'card_purged',
+  'todo_added',
+  'todo_updated',
+  'todo_deleted',
+  'resync',
+];
+
+// 订阅卡片变更（Server-Sent Events），返回取消订阅函数
+export const subscribeChanges = (onChange: (type: string) => void): (() => void) => {
+  const source = new EventSource('/api/events/stream');
+  const listeners = CHANGE_EVENTS.map((type) => {
+    const listener = () => onChange(type);
+    source.addEventListener(type, listener);
+    return [type, listener] as const;
+  });
+  return () => {
+    listeners.forEach(([type, listener]) => source.removeEventListener(type, listener));
+    source.close();
+  };
+};
+
 export default api;
@@ -3,6 +3,7 @@ import { Box, SimpleGrid, VStack, Text, Spinner, chakra } from '@chakra-ui/react
 import { motion, AnimatePresence } from 'framer-motion';
 import { useCardStore } from '../stores/cardStore';
 import { IdeaCardItem } from './IdeaCardItem';
+import { subscribeChanges } from '../api';
 
 const MotionBox = chakra(motion.div);
 
@@ -14,6 +15,19 @@ export function CardGrid() {
     fetchCards();
   }, [fetchCards]);
 
+  // 其他用户修改卡片后重新拉取（短时间内的多次变更合并为一次）
+  useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = subscribeChanges(() => {
+      clearTimeout(timer);
+      timer = setTimeout(() => fetchCards(), 300);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, [fetchCards]);
+
   // 加载状态
   if (isLoading && cards.length === 0) {
     return (
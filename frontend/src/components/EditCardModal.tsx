@@ -146,10 +146,7 @@ export function EditCardModal({ card, isOpen, onClose }: EditCardModalProps) {
       content: content.trim(),
       card_style: card.card_style,
       todos: todos,
-      old_title: card.title,
-      old_content: card.content,
-      old_card_style: card.card_style,
-      old_todos: card.todos,
+      version: card.version,
       operator: 'anonymous',
     };
 
@@ -163,10 +160,10 @@ export function EditCardModal({ card, isOpen, onClose }: EditCardModalProps) {
         isClosable: true,
       });
       handleClose();
-    } catch {
+    } catch (error) {
       toast({
         title: '保存失败',
-        description: '请稍后重试',
+        description: (error as Error).message || '请稍后重试',
         status: 'error',
         duration: 2000,
         isClosable: true,
@@ -33,6 +33,7 @@ import {
   FaCalendarAlt,
   FaFilter,
   FaTimesCircle,
+  FaUndo,
 } from 'react-icons/fa';
 import { useCardStore } from '../stores/cardStore';
 import type { TimelineEvent } from '../types';
@@ -64,6 +65,14 @@ const EVENT_CONFIG: Record<string, {
     label: '删除卡片',
     dotBg: 'linear-gradient(135deg, #FC8181, #E53E3E)',
   },
+  card_recovered: {
+    icon: FaUndo,
+    color: '#4FD1C5',
+    gradientFrom: '#4FD1C5',
+    gradientTo: '#319795',
+    label: '恢复卡片',
+    dotBg: 'linear-gradient(135deg, #4FD1C5, #319795)',
+  },
   title_changed: {
     icon: FaEdit,
     color: '#63B3ED',
@@ -144,6 +153,8 @@ export function GlobalTimelineModal() {
     setTimelineOpen,
     timelineData,
     fetchTimeline,
+    fetchMoreTimeline,
+    isLoadingMoreTimeline,
     isLoading,
   } = useCardStore();
 
@@ -245,7 +256,7 @@ export function GlobalTimelineModal() {
                 全局时间线
               </Text>
             </HStack>
-            {timelineData && (
+            {timelineData?.total != null && (
               <Text fontSize="sm" color="whiteAlpha.600">
                 共 {timelineData.total} 条记录
                 {isFiltered && ' (已筛选)'}
@@ -490,6 +501,21 @@ export function GlobalTimelineModal() {
                   </Box>
                 ))}
               </AnimatePresence>
+
+              {timelineData?.next_cursor && (
+                <Button
+                  size="sm"
+                  variant="ghost"
+                  color="whiteAlpha.700"
+                  borderRadius="10px"
+                  alignSelf="center"
+                  _hover={{ bg: 'whiteAlpha.100', color: 'white' }}
+                  isLoading={isLoadingMoreTimeline}
+                  onClick={() => fetchMoreTimeline()}
+                >
+                  加载更多
+                </Button>
+              )}
             </VStack>
           )}
         </ModalBody>
@@ -203,8 +203,8 @@ export function IdeaCardItem({ card, isDeleted = false }: IdeaCardItemProps) {
         {/* 时间信息 */}
         <HStack justify="space-between" fontSize="xs" opacity={0.6} pt={1}>
           <Text>创建: {formatTime(card.create_time)}</Text>
-          {card.edit_history.length > 0 && (
-            <Text>已编辑 {card.edit_history.length} 次</Text>
+          {card.edit_count > 0 && (
+            <Text>已编辑 {card.edit_count} 次</Text>
           )}
         </HStack>
       </VStack>
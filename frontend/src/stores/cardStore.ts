@@ -21,6 +21,8 @@ interface CardStore {
   deleteConfirmCardId: string | null;
   isTimelineOpen: boolean;
   timelineData: TimelineResponse | null;
+  timelineRange: { startTime?: string; endTime?: string };
+  isLoadingMoreTimeline: boolean;
   
   // 操作方法
   fetchCards: () => Promise<void>;
@@ -31,6 +33,7 @@ interface CardStore {
   recoverCard: (cardId: string) => Promise<void>;
   fetchHistory: (cardId: string) => Promise<void>;
   fetchTimeline: (startTime?: string, endTime?: string) => Promise<void>;
+  fetchMoreTimeline: () => Promise<void>;
   
   // UI 状态方法
   setEditingCardId: (cardId: string | null) => void;
@@ -62,6 +65,8 @@ export const useCardStore = create<CardStore>((set, get) => ({
   deleteConfirmCardId: null,
   isTimelineOpen: false,
   timelineData: null,
+  timelineRange: {},
+  isLoadingMoreTimeline: false,
   
   // 获取所有正常卡片
   fetchCards: async () => {
@@ -177,13 +182,33 @@ export const useCardStore = create<CardStore>((set, get) => ({
     set({ isLoading: true, error: null });
     try {
       const timeline = await ideaCardApi.getTimeline(startTime, endTime);
-      set({ timelineData: timeline, isLoading: false });
+      set({ timelineData: timeline, timelineRange: { startTime, endTime }, isLoading: false });
     } catch (error) {
       set({ error: (error as Error).message, isLoading: false });
       throw error;
     }
   },
   
+  // 加载时间线的下一页
+  fetchMoreTimeline: async () => {
+    const { timelineData, timelineRange, isLoadingMoreTimeline } = get();
+    if (!timelineData?.next_cursor || isLoadingMoreTimeline) return;
+    set({ isLoadingMoreTimeline: true, error: null });
+    try {
+      const page = await ideaCardApi.getTimeline(timelineRange.startTime, timelineRange.endTime, {
+        after: timelineData.next_cursor,
+      });
+      set({
+        // 总数只在第一页返回，沿用第一页的值
+        timelineData: { ...page, total: timelineData.total, events: [...timelineData.events, ...page.events] },
+        isLoadingMoreTimeline: false,
+      });
+    } catch (error) {
+      set({ error: (error as Error).message, isLoadingMoreTimeline: false });
+      throw error;
+    }
+  },
+  
   // UI 状态方法
   setEditingCardId: (cardId) => set({ editingCardId: cardId }),
   setEditModalCard: (card) => set({ editModalCard: card }),
@@ -40,9 +40,14 @@ export interface IdeaCard {
   todos: TodoItem[];
   card_style: CardStyle;
   is_deleted: boolean;
+  // 删除时间，超过回收站保留期限后卡片被移入归档
+  deleted_at?: string | null;
   create_time: string;
   update_time: string;
-  edit_history: EditHistoryItem[];
+  edit_count: number;
+  version: number;
+  // 列表接口默认返回摘要，不含编辑历史
+  edit_history?: EditHistoryItem[];
 }
 
 // 创建卡片请求
@@ -58,18 +63,74 @@ export interface UpdateCardRequest {
   content: string;
   card_style?: CardStyle;
   todos: TodoItem[];
-  old_title: string;
-  old_content: string;
-  old_card_style?: CardStyle;
-  old_todos: TodoItem[];
+  // 客户端持有的版本号（必填），与服务端不一致时返回 409
+  version: number;
   operator?: string;
   edit_note?: string;
 }
 
+// 新增待办事项请求
+export interface CreateTodoRequest {
+  todo_id?: string;
+  text: string;
+  operator?: string;
+}
+
+// 更新待办事项请求
+export interface UpdateTodoRequest {
+  text?: string;
+  completed?: boolean;
+  operator?: string;
+}
+
+// 批量操作
+export interface BulkOperation {
+  op: 'create' | 'update' | 'delete' | 'recover';
+  card_id?: string;
+  card?: CreateCardRequest;
+  update?: UpdateCardRequest;
+}
+
+export interface BulkItemResult {
+  index: number;
+  op: string;
+  card_id?: string | null;
+  success: boolean;
+  status_code: number;
+  message?: string | null;
+}
+
+export interface BulkResponse {
+  results: BulkItemResult[];
+  succeeded: number;
+  failed: number;
+}
+
 // 卡片列表响应
 export interface CardListResponse {
   cards: IdeaCard[];
   total: number;
+  next_cursor?: string | null;
+}
+
+// 增量同步
+export interface SyncResponse {
+  cards: IdeaCard[];
+  deleted: string[];
+  next_token: string;
+  has_more: boolean;
+}
+
+// 全文检索
+export interface SearchHit {
+  card: IdeaCard;
+  score: number;
+}
+
+export interface SearchResponse {
+  hits: SearchHit[];
+  total: number;
+  next_cursor?: string | null;
 }
 
 // 编辑历史响应
@@ -78,6 +139,7 @@ export interface EditHistoryResponse {
   card_title: string;
   total_edits: number;
   history: EditHistoryItem[];
+  next_cursor?: string | null;
 }
 
 // 消息响应
@@ -89,7 +151,7 @@ export interface MessageResponse {
 // 全局时间线事件
 export interface TimelineEvent {
   event_id: string;
-  event_type: 'card_created' | 'card_deleted' | 'title_changed' | 'todo_added' | 'todo_updated' | 'todo_deleted';
+  event_type: 'card_created' | 'card_deleted' | 'card_recovered' | 'title_changed' | 'todo_added' | 'todo_updated' | 'todo_deleted';
   card_id: string;
   card_title: string;
   event_time: string;
@@ -107,7 +169,9 @@ export interface TimelineEvent {
 // 全局时间线响应
 export interface TimelineResponse {
   events: TimelineEvent[];
-  total: number;
+  // 只在第一页返回
+  total?: number | null;
+  next_cursor?: string | null;
 }
 
 // 预设卡片样式
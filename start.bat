@@ -44,6 +44,9 @@ if not exist "venv\" (
     call venv\Scripts\activate.bat
 )
 
+echo 正在执行数据库迁移...
+python -m app.migrate up
+
 start "ThoughtFlow Backend" cmd /k "cd /d %cd% && venv\Scripts\python.exe -m uvicorn app.main:app --host 0.0.0.0 --port 13089 --reload"
 cd ..
 
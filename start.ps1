@@ -50,6 +50,9 @@ if (-not (Test-Path "venv")) {
     & "venv\Scripts\Activate.ps1"
 }
 
+Write-Host "正在执行数据库迁移..." -ForegroundColor Cyan
+python -m app.migrate up
+
 $backendJob = Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$PWD'; .\venv\Scripts\python.exe -m uvicorn app.main:app --host 0.0.0.0 --port 13089 --reload" -PassThru
 Write-Host "✓ 后端服务已启动 (进程 ID: $($backendJob.Id))" -ForegroundColor Green
 